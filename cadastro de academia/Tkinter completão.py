@@ -1,17 +1,28 @@
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import datetime
 from functools import partial
 
 # --- Importações do backend ---
 from backend import (
-    criar_tabelas, criar_admin_default, buscar_funcionario_login,
-    verificar_senha, listar_membros, inserir_membro, atualizar_membro,
-    excluir_membro, buscar_membro_id, listar_treinos, inserir_treino,
-    atualizar_treino, excluir_treino, buscar_treino_id, listar_pagamentos,
-    inserir_pagamento, listar_historico_atividades
+    atualizar_esquema, buscar_funcionario_login,
+    verificar_senha, inserir_membro, atualizar_membro,
+    excluir_membros, buscar_membro_id, inserir_treino,
+    atualizar_treino, excluir_treino, buscar_treino_id,
+    inserir_pagamento, fechar_conexoes,
+    listar_membros_pagina, listar_treinos_pagina, listar_pagamentos_pagina,
+    listar_historico_pagina, contar_historico_atividades, cursor_historico_posicao,
+    buscar_membros, resumo_receita, resumo_atividades_dia,
+    versao_alteracoes, alteracoes_desde, ids_inadimplentes, metricas
 )
+from componentes_tk import ExecutorBackend, PaginadorTreeview, TreeviewVirtual, BuscaIncremental
+
+# Intervalo (ms) entre as buscas de alterações feitas por outros terminais
+INTERVALO_ATUALIZACAO = 5000
+
+# Opções do formulário de pagamento; só "Pago" conta como quitado (backend.STATUS_QUITADOS)
+STATUS_PAGAMENTO = ("Pago", "Pendente", "Atrasado")
 
 class AcademiaApp:
     def __init__(self, root):
@@ -19,6 +30,11 @@ class AcademiaApp:
         self.root.title("Sistema da Academia")
         self.root.geometry("800x600")
         self.usuario_logado = None
+        # IDs da última cobrança (manutencao.py cobranca), destacados na lista de membros
+        self.inadimplentes = set()
+        # Chamadas ao banco rodam fora da thread do Tk; resultados voltam via root.after
+        self.executor = ExecutorBackend(root, ao_mudar_estado=self.indicar_carregamento)
+        self.root.bind("<Control-M>", lambda _: self.painel_metricas())
         self.tela_login()
 
     def tela_login(self):
@@ -40,8 +56,11 @@ class AcademiaApp:
     def verificar_login(self):
         login = self.entry_login.get()
         senha = self.entry_senha.get()
-        funcionario = buscar_funcionario_login(login)
-        if funcionario and verificar_senha(senha, funcionario[4]):
+        self.executor.executar(buscar_funcionario_login, login,
+                               ao_concluir=lambda funcionario: self.concluir_login(funcionario, senha))
+
+    def concluir_login(self, funcionario, senha):
+        if funcionario and verificar_senha(senha, funcionario.senha):
             self.usuario_logado = funcionario
             self.menu_principal()
         else:
@@ -50,7 +69,7 @@ class AcademiaApp:
     def menu_principal(self):
         self.limpar_tela()
 
-        tk.Label(self.root, text=f"Bem-vindo(a), {self.usuario_logado[1]}", font=("Arial", 14)).pack(pady=10)
+        tk.Label(self.root, text=f"Bem-vindo(a), {self.usuario_logado.nome}", font=("Arial", 14)).pack(pady=10)
 
         frame = tk.Frame(self.root)
         frame.pack(pady=20)
@@ -59,6 +78,7 @@ class AcademiaApp:
         tk.Button(frame, text="Gerenciar Treinos", width=20, command=self.tela_gerenciar_treinos).pack(pady=5)
         tk.Button(frame, text="Gerenciar Pagamentos", width=20, command=self.tela_gerenciar_pagamentos).pack(pady=5)
         tk.Button(frame, text="Histórico de Atividades", width=20, command=self.tela_historico_atividades).pack(pady=5)
+        tk.Button(frame, text="Painel", width=20, command=self.tela_painel).pack(pady=5)
         tk.Button(frame, text="Sair", width=20, command=self.root.quit).pack(pady=5)
 
     # ======================== Membros ========================
@@ -71,10 +91,27 @@ class AcademiaApp:
         frame_top = tk.Frame(self.root)
         frame_top.pack(pady=10)
 
+        self.busca_membros = BuscaIncremental(
+            frame_top, self.root, buscar_membros,
+            ao_resultado=self.exibir_busca_membros,
+            ao_limpar=lambda: self.paginador_membros.primeira(),
+            executor=self.executor)
+        self.busca_membros.pack(pady=5)
+
         self.tree_membros = ttk.Treeview(frame_top, columns=("ID", "Nome", "CPF", "Telefone"), show='headings')
         for col in ("ID", "Nome", "CPF", "Telefone"):
             self.tree_membros.heading(col, text=col)
+        self.tree_membros.tag_configure("inadimplente", background="#f8d7da")
         self.tree_membros.pack()
+        tk.Label(frame_top, text="Em vermelho: mensalidade em atraso", fg="gray").pack()
+
+        self.paginador_membros = PaginadorTreeview(
+            frame_top, self.tree_membros, listar_membros_pagina,
+            {"ID": "ID", "Nome": "Nome", "CPF": "CPF"}, ordem="Nome", executor=self.executor,
+            funcao_versao=versao_alteracoes, funcao_alteracoes=partial(alteracoes_desde, "Membros"),
+            intervalo_atualizacao=INTERVALO_ATUALIZACAO,
+            funcao_tags=lambda membro: ("inadimplente",) if membro.id in self.inadimplentes else ())
+        self.paginador_membros.pack(pady=5)
 
         self.carregar_membros()
 
@@ -83,14 +120,23 @@ class AcademiaApp:
 
         tk.Button(frame_bot, text="Cadastrar Novo", command=self.tela_cadastrar_membro).grid(row=0, column=0, padx=5)
         tk.Button(frame_bot, text="Atualizar Selecionado", command=self.tela_atualizar_membro).grid(row=0, column=1, padx=5)
-        tk.Button(frame_bot, text="Excluir Selecionado", command=self.excluir_membro).grid(row=0, column=2, padx=5)
+        tk.Button(frame_bot, text="Excluir Selecionados", command=self.excluir_membro).grid(row=0, column=2, padx=5)
         tk.Button(frame_bot, text="Voltar", command=self.menu_principal).grid(row=0, column=3, padx=5)
 
     def carregar_membros(self):
-        for item in self.tree_membros.get_children():
-            self.tree_membros.delete(item)
-        for membro in listar_membros():
-            self.tree_membros.insert('', 'end', values=membro)
+        # A lista de inadimplentes vem numa consulta só, não uma por linha
+        self.executor.executar(ids_inadimplentes, ao_concluir=self.marcar_inadimplentes)
+        if self.busca_membros.texto():
+            self.busca_membros.buscar()
+        else:
+            self.paginador_membros.atualizar()
+
+    def marcar_inadimplentes(self, ids):
+        self.inadimplentes = ids
+        self.paginador_membros.atualizar_tags()
+
+    def exibir_busca_membros(self, texto, membros):
+        self.paginador_membros.mostrar_linhas(membros, f"{len(membros)} resultado(s) para \"{texto}\"")
 
     def tela_cadastrar_membro(self):
         self.tela_formulario_membro("Cadastrar Membro", inserir_membro)
@@ -101,31 +147,36 @@ class AcademiaApp:
             messagebox.showwarning("Aviso", "Selecione um membro para atualizar.")
             return
         membro_id = self.tree_membros.item(selecionado[0])['values'][0]
-        membro = buscar_membro_id(membro_id)
-        self.tela_formulario_membro("Atualizar Membro", partial(atualizar_membro, membro_id), membro)
+        self.executor.executar(
+            buscar_membro_id, membro_id,
+            ao_concluir=lambda membro: self.tela_formulario_membro(
+                "Atualizar Membro", partial(atualizar_membro, membro_id), membro))
 
     def excluir_membro(self):
-        selecionado = self.tree_membros.selection()
-        if not selecionado:
+        selecionados = self.tree_membros.selection()
+        if not selecionados:
             messagebox.showwarning("Aviso", "Selecione um membro para excluir.")
             return
-        membro_id = self.tree_membros.item(selecionado[0])['values'][0]
-        if messagebox.askyesno("Confirmar", "Deseja realmente excluir este membro?"):
-            excluir_membro(membro_id)
-            self.carregar_membros()
+        ids = [self.tree_membros.item(iid)['values'][0] for iid in selecionados]
+        pergunta = "este membro" if len(ids) == 1 else f"estes {len(ids)} membros"
+        if messagebox.askyesno("Confirmar", f"Deseja realmente excluir {pergunta}? "
+                                            "Os treinos, pagamentos e atividades também serão excluídos."):
+            self.executor.executar(excluir_membros, ids, cancelavel=False,
+                                   ao_concluir=lambda _: self.carregar_membros())
 
     def tela_formulario_membro(self, titulo, funcao_salvar, dados=None):
         janela = tk.Toplevel(self.root)
         janela.title(titulo)
 
         labels = ["Nome", "CPF", "Telefone", "Endereço"]
+        valores = (dados.nome, dados.cpf, dados.telefone, dados.endereco) if dados else ()
         entradas = []
         for i, label in enumerate(labels):
             tk.Label(janela, text=label).grid(row=i, column=0)
             entrada = tk.Entry(janela)
             entrada.grid(row=i, column=1)
             if dados:
-                entrada.insert(0, dados[i+1])
+                entrada.insert(0, valores[i])
             entradas.append(entrada)
 
         def salvar():
@@ -135,11 +186,12 @@ class AcademiaApp:
             endereco = entradas[3].get()
             data_cadastro = datetime.date.today().isoformat()
             if dados:
-                funcao_salvar(nome, cpf, telefone, endereco)
+                args = (nome, cpf, telefone, endereco)
             else:
-                funcao_salvar(nome, cpf, telefone, endereco, data_cadastro)
+                args = (nome, cpf, telefone, endereco, data_cadastro)
             janela.destroy()
-            self.carregar_membros()
+            self.executor.executar(funcao_salvar, *args, cancelavel=False,
+                                   ao_concluir=lambda _: self.carregar_membros())
 
         tk.Button(janela, text="Salvar", command=salvar).grid(row=len(labels), columnspan=2, pady=10)
 
@@ -153,11 +205,20 @@ class AcademiaApp:
         frame_top = tk.Frame(self.root)
         frame_top.pack(pady=10)
 
-        self.tree_treinos = ttk.Treeview(frame_top, columns=("ID", "Nome do Treino", "Duração", "Descrição"), show='headings')
-        for col in ("ID", "Nome do Treino", "Duração", "Descrição"):
+        colunas = ("ID", "Membro", "Nome do Treino", "Descrição", "Duração", "Data Início")
+        self.tree_treinos = ttk.Treeview(frame_top, columns=colunas, show='headings')
+        for col in colunas:
             self.tree_treinos.heading(col, text=col)
         self.tree_treinos.pack()
 
+        self.paginador_treinos = PaginadorTreeview(
+            frame_top, self.tree_treinos, listar_treinos_pagina,
+            {"ID": "ID", "Data Início": "Data_Inicio"}, ordem="Data_Inicio", descendente=True,
+            executor=self.executor,
+            funcao_versao=versao_alteracoes, funcao_alteracoes=partial(alteracoes_desde, "Treinos"),
+            intervalo_atualizacao=INTERVALO_ATUALIZACAO)
+        self.paginador_treinos.pack(pady=5)
+
         self.carregar_treinos()
 
         frame_bot = tk.Frame(self.root)
@@ -169,10 +230,7 @@ class AcademiaApp:
         tk.Button(frame_bot, text="Voltar", command=self.menu_principal).grid(row=0, column=3, padx=5)
 
     def carregar_treinos(self):
-        for item in self.tree_treinos.get_children():
-            self.tree_treinos.delete(item)
-        for treino in listar_treinos():
-            self.tree_treinos.insert('', 'end', values=treino)
+        self.paginador_treinos.atualizar()
 
     def tela_cadastrar_treino(self):
         self.tela_formulario_treino("Cadastrar Treino", inserir_treino)
@@ -183,8 +241,10 @@ class AcademiaApp:
             messagebox.showwarning("Aviso", "Selecione um treino para atualizar.")
             return
         treino_id = self.tree_treinos.item(selecionado[0])['values'][0]
-        treino = buscar_treino_id(treino_id)
-        self.tela_formulario_treino("Atualizar Treino", partial(atualizar_treino, treino_id), treino)
+        self.executor.executar(
+            buscar_treino_id, treino_id,
+            ao_concluir=lambda treino: self.tela_formulario_treino(
+                "Atualizar Treino", partial(atualizar_treino, treino_id), treino))
 
     def excluir_treino(self):
         selecionado = self.tree_treinos.selection()
@@ -193,33 +253,41 @@ class AcademiaApp:
             return
         treino_id = self.tree_treinos.item(selecionado[0])['values'][0]
         if messagebox.askyesno("Confirmar", "Deseja realmente excluir este treino?"):
-            excluir_treino(treino_id)
-            self.carregar_treinos()
+            self.executor.executar(excluir_treino, treino_id, cancelavel=False,
+                                   ao_concluir=lambda _: self.carregar_treinos())
 
     def tela_formulario_treino(self, titulo, funcao_salvar, dados=None):
         janela = tk.Toplevel(self.root)
         janela.title(titulo)
 
-        labels = ["Nome do Treino", "Duração (min)", "Descrição"]
+        labels = ["ID do Membro", "Nome do Treino", "Duração (min)", "Descrição", "Data de Início"]
+        if dados:
+            valores = (dados.id_membro, dados.tipo, dados.duracao, dados.descricao, dados.data_inicio)
+        else:
+            valores = ("", "", "", "", datetime.date.today().isoformat())
         entradas = []
         for i, label in enumerate(labels):
             tk.Label(janela, text=label).grid(row=i, column=0)
             entrada = tk.Entry(janela)
             entrada.grid(row=i, column=1)
-            if dados:
-                entrada.insert(0, dados[i+1])
+            entrada.insert(0, "" if valores[i] is None else valores[i])
             entradas.append(entrada)
 
         def salvar():
-            nome = entradas[0].get()
-            duracao = entradas[1].get()
-            descricao = entradas[2].get()
-            if dados:
-                funcao_salvar(nome, duracao, descricao)
-            else:
-                funcao_salvar(nome, duracao, descricao)  # Adicione data ou outros parâmetros se necessário
+            nome = entradas[1].get()
+            descricao = entradas[3].get()
+            try:
+                id_membro = int(entradas[0].get())
+                duracao = int(entradas[2].get()) if entradas[2].get().strip() else None
+                data_inicio = datetime.date.fromisoformat(entradas[4].get().strip()).isoformat()
+            except ValueError:
+                messagebox.showwarning("Aviso", "Informe o ID do membro, a duração em minutos "
+                                                "e a data no formato AAAA-MM-DD.", parent=janela)
+                return
             janela.destroy()
-            self.carregar_treinos()
+            # inserir_treino e atualizar_treino (já com o ID do treino) recebem os mesmos campos
+            self.executor.executar(funcao_salvar, id_membro, nome, descricao, duracao, data_inicio,
+                                   cancelavel=False, ao_concluir=lambda _: self.carregar_treinos())
 
         tk.Button(janela, text="Salvar", command=salvar).grid(row=len(labels), columnspan=2, pady=10)
 
@@ -238,6 +306,14 @@ class AcademiaApp:
             self.tree_pagamentos.heading(col, text=col)
         self.tree_pagamentos.pack()
 
+        self.paginador_pagamentos = PaginadorTreeview(
+            frame_top, self.tree_pagamentos, listar_pagamentos_pagina,
+            {"ID": "ID", "Data": "Data_Pagamento"}, ordem="Data_Pagamento", descendente=True,
+            executor=self.executor,
+            funcao_versao=versao_alteracoes, funcao_alteracoes=partial(alteracoes_desde, "Pagamentos"),
+            intervalo_atualizacao=INTERVALO_ATUALIZACAO)
+        self.paginador_pagamentos.pack(pady=5)
+
         self.carregar_pagamentos()
 
         frame_bot = tk.Frame(self.root)
@@ -247,10 +323,7 @@ class AcademiaApp:
         tk.Button(frame_bot, text="Voltar", command=self.menu_principal).grid(row=0, column=1, padx=5)
 
     def carregar_pagamentos(self):
-        for item in self.tree_pagamentos.get_children():
-            self.tree_pagamentos.delete(item)
-        for pagamento in listar_pagamentos():
-            self.tree_pagamentos.insert('', 'end', values=pagamento)
+        self.paginador_pagamentos.atualizar()
 
     def tela_registrar_pagamento(self):
         self.tela_formulario_pagamento("Registrar Pagamento", inserir_pagamento)
@@ -259,23 +332,35 @@ class AcademiaApp:
         janela = tk.Toplevel(self.root)
         janela.title(titulo)
 
-        labels = ["ID do Membro", "Valor", "Data"]
+        labels = ["ID do Membro", "Valor", "Data", "Status"]
+        if dados:
+            valores = (dados.id_membro, dados.valor, dados.data_pagamento, dados.status)
+        else:
+            valores = ("", "", datetime.date.today().isoformat(), STATUS_PAGAMENTO[0])
         entradas = []
         for i, label in enumerate(labels):
             tk.Label(janela, text=label).grid(row=i, column=0)
-            entrada = tk.Entry(janela)
+            if label == "Status":
+                entrada = ttk.Combobox(janela, values=STATUS_PAGAMENTO)
+            else:
+                entrada = tk.Entry(janela)
             entrada.grid(row=i, column=1)
-            if dados:
-                entrada.insert(0, dados[i+1])
+            entrada.insert(0, "" if valores[i] is None else valores[i])
             entradas.append(entrada)
 
         def salvar():
-            id_membro = entradas[0].get()
-            valor = entradas[1].get()
-            data = entradas[2].get()  # Adicione validação para a data
-            funcao_salvar(id_membro, valor, data)  # Função para salvar pagamento
+            status = entradas[3].get().strip() or STATUS_PAGAMENTO[0]
+            try:
+                id_membro = int(entradas[0].get())
+                valor = float(entradas[1].get().replace(",", "."))
+                data = datetime.date.fromisoformat(entradas[2].get().strip()).isoformat()
+            except ValueError:
+                messagebox.showwarning("Aviso", "Informe o ID do membro, o valor e a data "
+                                                "no formato AAAA-MM-DD.", parent=janela)
+                return
             janela.destroy()
-            self.carregar_pagamentos()
+            self.executor.executar(funcao_salvar, id_membro, valor, data, status,
+                                   cancelavel=False, ao_concluir=lambda _: self.carregar_pagamentos())
 
         tk.Button(janela, text="Salvar", command=salvar).grid(row=len(labels), columnspan=2, pady=10)
 
@@ -289,10 +374,13 @@ class AcademiaApp:
         frame_top = tk.Frame(self.root)
         frame_top.pack(pady=10)
 
-        self.tree_historico = ttk.Treeview(frame_top, columns=("ID", "Membro", "Atividade", "Data", "Duração"), show='headings')
-        for col in ("ID", "Membro", "Atividade", "Data", "Duração"):
-            self.tree_historico.heading(col, text=col)
-        self.tree_historico.pack()
+        # Só a janela visível (mais uma margem) fica carregada; o resto vem sob demanda
+        self.lista_historico = TreeviewVirtual(
+            frame_top, ("ID", "Membro", "Atividade", "Data", "Duração"),
+            listar_historico_pagina, contar_historico_atividades, cursor_historico_posicao,
+            chave=lambda atividade: (atividade.data, atividade.id), executor=self.executor)
+        self.tree_historico = self.lista_historico.tree
+        self.lista_historico.pack()
 
         self.carregar_historico()
 
@@ -302,19 +390,99 @@ class AcademiaApp:
         tk.Button(frame_bot, text="Voltar", command=self.menu_principal).grid(row=0, column=0, padx=5)
 
     def carregar_historico(self):
-        for item in self.tree_historico.get_children():
-            self.tree_historico.delete(item)
-        for atividade in listar_historico_atividades():
-            self.tree_historico.insert('', 'end', values=atividade)
+        self.lista_historico.recarregar()
+
+    # ======================== Painel ========================
+
+    def tela_painel(self):
+        self.limpar_tela()
+
+        tk.Label(self.root, text="Painel", font=("Arial", 14)).pack(pady=10)
+
+        self.label_atividades_hoje = tk.Label(self.root)
+        self.label_atividades_hoje.pack(pady=5)
+
+        frame_top = tk.Frame(self.root)
+        frame_top.pack(pady=10)
+
+        tk.Label(frame_top, text="Receita dos últimos 12 meses").pack()
+        colunas = ("Mês", "Status", "Total", "Pagamentos")
+        self.tree_receita = ttk.Treeview(frame_top, columns=colunas, show='headings')
+        for col in colunas:
+            self.tree_receita.heading(col, text=col)
+        self.tree_receita.pack()
+
+        self.carregar_painel()
+
+        frame_bot = tk.Frame(self.root)
+        frame_bot.pack(pady=10)
+
+        tk.Button(frame_bot, text="Atualizar", command=self.carregar_painel).grid(row=0, column=0, padx=5)
+        tk.Button(frame_bot, text="Voltar", command=self.menu_principal).grid(row=0, column=1, padx=5)
+
+    def carregar_painel(self):
+        # Os números vêm das tabelas de resumo, sem reagregar Pagamentos/Historico_Atividades
+        hoje = datetime.date.today()
+        inicio = (hoje - datetime.timedelta(days=365)).strftime("%Y-%m")
+        self.executor.executar(resumo_receita, inicio, ao_concluir=self.exibir_receita)
+        self.executor.executar(resumo_atividades_dia, hoje.isoformat(), ao_concluir=self.exibir_atividades_hoje)
+
+    def exibir_receita(self, linhas):
+        self.tree_receita.delete(*self.tree_receita.get_children())
+        for resumo in linhas:
+            self.tree_receita.insert('', 'end', values=(resumo.mes, resumo.status, f"{resumo.total:.2f}", resumo.quantidade))
+
+    def exibir_atividades_hoje(self, totais):
+        self.label_atividades_hoje.config(
+            text=f"Hoje: {totais.membros} membro(s) ativo(s), {totais.quantidade} atividade(s), "
+                 f"{totais.minutos} minuto(s)")
+
+    def painel_metricas(self):
+        """Painel oculto (Ctrl+Shift+M) com as métricas do backend e as consultas lentas"""
+        janela = tk.Toplevel(self.root)
+        janela.title("Métricas do backend")
+        texto = tk.Text(janela, width=120, height=40, font=("Courier", 9))
+        texto.pack(fill=tk.BOTH, expand=True)
+
+        def atualizar():
+            texto.delete("1.0", tk.END)
+            texto.insert(tk.END, metricas.relatorio())
+
+        def zerar():
+            metricas.zerar()
+            atualizar()
+
+        def salvar():
+            caminho = filedialog.asksaveasfilename(parent=janela, defaultextension=".json",
+                                                   filetypes=[("JSON", "*.json")])
+            if caminho:
+                metricas.salvar(caminho)
+
+        frame = tk.Frame(janela)
+        frame.pack(pady=5)
+        tk.Button(frame, text="Atualizar", command=atualizar).grid(row=0, column=0, padx=5)
+        tk.Button(frame, text="Zerar", command=zerar).grid(row=0, column=1, padx=5)
+        tk.Button(frame, text="Salvar JSON", command=salvar).grid(row=0, column=2, padx=5)
+        atualizar()
 
     def limpar_tela(self):
+        # Resultados pendentes da tela anterior não devem chegar à nova
+        self.executor.cancelar_pendentes()
         for widget in self.root.winfo_children():
             widget.destroy()
+        self.label_status = tk.Label(self.root, anchor='w')
+        self.label_status.pack(side=tk.BOTTOM, fill=tk.X)
+        self.indicar_carregamento(self.executor.ocupado())
+
+    def indicar_carregamento(self, ocupado):
+        self.label_status.config(text="Carregando..." if ocupado else "")
+        self.root.config(cursor="watch" if ocupado else "")
 
 if __name__ == "__main__":
-    criar_tabelas()
-    criar_admin_default()
+    atualizar_esquema()
 
     root = tk.Tk()
     app = AcademiaApp(root)
     root.mainloop()
+    app.executor.encerrar()
+    fechar_conexoes()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Análises de volume de treinos e atividades com NumPy.
+
+Treinos (Duracao) e Historico_Atividades (Tempo_Execucao) são carregados em
+colunas NumPy (ID, membro, dia como inteiro desde 1970-01-01 e minutos) e
+as somas por membro e semana, médias móveis, tendências e percentis saem de
+operações vetorizadas sobre elas, sem laços em Python por linha.
+
+As colunas ficam em cache na instância de Analise; atualizar() acrescenta só
+o que chegou depois: as atividades com ID maior que a última lida e os
+treinos do registro de alterações (inclusive alterados e excluídos). Membros
+excluídos deixam atividades no cache até recarregar().
+
+Uso:
+    python analise.py semanal 42 --inicio 2024-01-01
+    python analise.py ranking --fonte treinos --inicio 2024-01-01 --fim 2024-03-31
+    python analise.py percentis --por membro
+    python analise.py tendencia --semanas 8
+"""
+
+import argparse
+import datetime
+import threading
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("analise.py precisa do NumPy (pip install numpy)") from None
+
+import backend
+from backend import SEM_DATA, TAMANHO_BLOCO
+
+FONTES = {"treinos": "Treinos", "atividades": "Historico_Atividades"}
+
+PERCENTIS = (25, 50, 75, 90)
+
+# 1970-01-01 foi uma quinta-feira: somando 3, as semanas começam na segunda
+_DESLOCAMENTO_SEMANA = 3
+_EPOCA = datetime.date(1970, 1, 1).toordinal()
+
+# Resultados: arrays NumPy de mesmo tamanho (datas como datetime64[D])
+VolumeSemanal = namedtuple("VolumeSemanal", "membro semana minutos")
+SerieDiaria = namedtuple("SerieDiaria", "dia minutos")
+Ranking = namedtuple("Ranking", "membro minutos percentil")
+Tendencia = namedtuple("Tendencia", "membro inclinacao media")
+
+
+def _dia(data):
+    """Número do dia (desde 1970-01-01) de uma data, texto AAAA-MM-DD[...] ou None"""
+    if data is None or isinstance(data, (int, np.integer)):
+        return data
+    if isinstance(data, str):
+        try:
+            data = datetime.date.fromisoformat(data[:10])
+        except ValueError:
+            return SEM_DATA
+    return data.toordinal() - _EPOCA
+
+
+def _datas(dias):
+    return np.asarray(dias, dtype="int64").astype("datetime64[D]")
+
+
+def _semana(dias):
+    """Dia da segunda-feira da semana de cada dia"""
+    return dias - (dias + _DESLOCAMENTO_SEMANA) % 7
+
+
+def somar_por(chave, valores):
+    """Chaves distintas (ordenadas) e a soma de `valores` em cada uma"""
+    distintas, indice = np.unique(chave, return_inverse=True)
+    return distintas, np.bincount(indice, weights=valores, minlength=len(distintas))
+
+
+def media_movel(valores, janela=7):
+    """
+    Média de cada posição com as `janela` - 1 anteriores (as primeiras usam o
+    que houver), por somas acumuladas.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    acumulado = np.concatenate(([0.0], np.cumsum(valores)))
+    fim = np.arange(1, len(valores) + 1)
+    inicio = np.maximum(fim - janela, 0)
+    return (acumulado[fim] - acumulado[inicio]) / (fim - inicio)
+
+
+def classificar(valores):
+    """Percentil de cada valor na própria distribuição (0-100, empates iguais)"""
+    valores = np.asarray(valores)
+    if not len(valores):
+        return np.empty(0)
+    ordenados = np.sort(valores)
+    return np.searchsorted(ordenados, valores, side="right") * 100.0 / len(valores)
+
+
+class Colunas:
+    """
+    Colunas de uma fonte em arrays do mesmo tamanho: `id`, `membro`, `dia` e
+    `minutos`. anexar() reserva espaço em dobro, então carregar aos blocos
+    não copia tudo a cada bloco.
+    """
+
+    TIPOS = (("id", np.int64), ("membro", np.int64), ("dia", np.int32), ("minutos", np.int32))
+
+    def __init__(self):
+        self._tamanho = 0
+        self._dados = {nome: np.empty(0, tipo) for nome, tipo in self.TIPOS}
+
+    def __len__(self):
+        return self._tamanho
+
+    def __getattr__(self, nome):
+        dados = self.__dict__.get("_dados", {})
+        if nome not in dados:
+            raise AttributeError(nome)
+        return dados[nome][:self._tamanho]
+
+    def anexar(self, bloco):
+        """Acrescenta linhas (id, membro, dia, minutos); as sem data válida são ignoradas"""
+        bloco = np.asarray(bloco, dtype=np.int64).reshape(-1, len(self.TIPOS))
+        bloco = bloco[bloco[:, 2] != SEM_DATA]
+        necessario = self._tamanho + len(bloco)
+        if necessario > len(self._dados["id"]):
+            capacidade = max(necessario, 2 * len(self._dados["id"]), 1024)
+            for nome, tipo in self.TIPOS:
+                novo = np.empty(capacidade, tipo)
+                novo[:self._tamanho] = self._dados[nome][:self._tamanho]
+                self._dados[nome] = novo
+        for posicao, (nome, _) in enumerate(self.TIPOS):
+            self._dados[nome][self._tamanho:necessario] = bloco[:, posicao]
+        self._tamanho = necessario
+
+    def remover(self, ids):
+        """Remove as linhas com esses IDs"""
+        if not len(ids) or not self._tamanho:
+            return
+        manter = ~np.isin(self.id, np.asarray(ids, dtype=np.int64))
+        restantes = int(manter.sum())
+        for nome, _ in self.TIPOS:
+            self._dados[nome][:restantes] = self._dados[nome][:self._tamanho][manter]
+        self._tamanho = restantes
+
+    def selecionar(self, membros=None, inicio=None, fim=None):
+        """(membro, dia, minutos) das linhas dos membros e do período (inclusivo)"""
+        filtro = np.ones(self._tamanho, dtype=bool)
+        if membros is not None:
+            filtro &= np.isin(self.membro, np.atleast_1d(membros))
+        if inicio is not None:
+            filtro &= self.dia >= _dia(inicio)
+        if fim is not None:
+            filtro &= self.dia <= _dia(fim)
+        return self.membro[filtro], self.dia[filtro], self.minutos[filtro]
+
+
+class Analise:
+    """
+    Colunas de treinos e atividades em cache e os cálculos sobre elas.
+
+    Com `arquivadas`, a primeira carga inclui os meses do histórico movidos
+    para os bancos de arquivo. Os métodos que recebem datas aceitam
+    datetime.date ou texto AAAA-MM-DD; `fonte` é "treinos" ou "atividades".
+    """
+
+    def __init__(self, arquivadas=False, tamanho_bloco=TAMANHO_BLOCO):
+        self.arquivadas = arquivadas
+        self.tamanho_bloco = tamanho_bloco
+        self._trava = threading.Lock()
+        self.recarregar()
+
+    def recarregar(self):
+        """Descarta o cache e lê as duas tabelas de novo"""
+        with self._trava:
+            self.colunas = {fonte: Colunas() for fonte in FONTES}
+            self._ultimo_id = 0
+            # Versão lida antes das linhas: o que mudar entre as duas leituras
+            # volta no próximo Delta e é reaplicado sem efeito colateral
+            self._versao_treinos = backend.versao_alteracoes("Treinos")
+            for bloco in backend.iterar_duracoes("Treinos", tamanho_bloco=self.tamanho_bloco):
+                self.colunas["treinos"].anexar(bloco)
+            self._carregar_atividades(self.arquivadas)
+
+    def _carregar_atividades(self, arquivadas):
+        novas = 0
+        for bloco in backend.iterar_duracoes("Historico_Atividades", self._ultimo_id, arquivadas,
+                                             self.tamanho_bloco):
+            self.colunas["atividades"].anexar(bloco)
+            self._ultimo_id = max(self._ultimo_id, bloco[-1][0])
+            novas += len(bloco)
+        return novas
+
+    def atualizar(self):
+        """
+        Traz para o cache o que mudou desde a última leitura e retorna
+        {fonte: linhas novas ou alteradas}.
+        """
+        with self._trava:
+            delta = backend.alteracoes_desde("Treinos", self._versao_treinos)
+            alterados = [t.id for t in delta.linhas]
+            # Relidas com a mesma conversão da carga inicial (Duracao "30 min" vira 30);
+            # as linhas antigas só saem depois que as novas estão prontas
+            novas = np.asarray(backend.ler_duracoes("Treinos", alterados) if alterados else [],
+                               dtype=np.int64).reshape(-1, len(Colunas.TIPOS))
+            treinos = self.colunas["treinos"]
+            treinos.remover(alterados + list(delta.excluidos))
+            treinos.anexar(novas)
+            self._versao_treinos = delta.versao
+            return {"treinos": len(delta.linhas), "atividades": self._carregar_atividades(False)}
+
+    def _selecionar(self, fonte, membros=None, inicio=None, fim=None):
+        if fonte not in FONTES:
+            raise ValueError(f"Fonte desconhecida: {fonte}")
+        return self.colunas[fonte].selecionar(membros, inicio, fim)
+
+    def volume_semanal(self, fonte="atividades", membros=None, inicio=None, fim=None):
+        """Minutos por membro e semana (segunda-feira), ordenados por membro e semana"""
+        membro, dia, minutos = self._selecionar(fonte, membros, inicio, fim)
+        semana = _semana(dia.astype(np.int64))
+        # Membro e semana combinados numa chave só; semanas a partir de 0
+        base = semana.min() if len(semana) else 0
+        largura = (semana.max() - base + 1) if len(semana) else 1
+        chaves, totais = somar_por(membro * largura + (semana - base), minutos)
+        return VolumeSemanal(chaves // largura, _datas(chaves % largura + base), totais.astype(np.int64))
+
+    def serie_diaria(self, fonte="atividades", membros=None, inicio=None, fim=None):
+        """Minutos de cada dia do período, incluindo os dias sem registro (com 0)"""
+        _, dia, minutos = self._selecionar(fonte, membros, inicio, fim)
+        primeiro = _dia(inicio) if inicio is not None else (int(dia.min()) if len(dia) else 0)
+        ultimo = _dia(fim) if fim is not None else (int(dia.max()) if len(dia) else -1)
+        totais = np.bincount(dia - primeiro, weights=minutos, minlength=max(ultimo - primeiro + 1, 0))
+        return SerieDiaria(_datas(np.arange(primeiro, ultimo + 1)), totais.astype(np.int64))
+
+    def media_movel(self, fonte="atividades", membros=None, inicio=None, fim=None, janela=7):
+        """SerieDiaria com a média móvel de `janela` dias no lugar dos minutos"""
+        serie = self.serie_diaria(fonte, membros, inicio, fim)
+        return SerieDiaria(serie.dia, media_movel(serie.minutos, janela))
+
+    def percentis(self, fonte="atividades", q=PERCENTIS, por="sessao", inicio=None, fim=None):
+        """
+        {percentil: minutos} das sessões (`por`="sessao") ou do total de cada
+        membro no período (`por`="membro").
+        """
+        membro, _, minutos = self._selecionar(fonte, inicio=inicio, fim=fim)
+        if por == "membro":
+            _, minutos = somar_por(membro, minutos)
+        elif por != "sessao":
+            raise ValueError("por deve ser 'sessao' ou 'membro'")
+        if not len(minutos):
+            return {p: None for p in q}
+        return dict(zip(q, np.percentile(minutos, q).tolist()))
+
+    def ranking(self, fonte="atividades", inicio=None, fim=None):
+        """Total de minutos de cada membro no período e o seu percentil, do maior para o menor"""
+        membro, _, minutos = self._selecionar(fonte, inicio=inicio, fim=fim)
+        membros, totais = somar_por(membro, minutos)
+        ordem = np.argsort(-totais, kind="stable")
+        return Ranking(membros[ordem], totais[ordem].astype(np.int64), classificar(totais)[ordem])
+
+    def tendencia(self, fonte="atividades", semanas=8, fim=None, membros=None):
+        """
+        Inclinação (minutos por semana) da reta de mínimos quadrados do volume
+        semanal de cada membro nas últimas `semanas` até `fim` (padrão hoje),
+        contando as semanas sem registro como 0, e a média semanal no período.
+        """
+        ultima = _semana(_dia(fim or datetime.date.today()))
+        primeira = ultima - 7 * (semanas - 1)
+        membro, dia, minutos = self._selecionar(fonte, membros, primeira, ultima + 6)
+        distintos, linha = np.unique(membro, return_inverse=True)
+        coluna = (_semana(dia.astype(np.int64)) - primeira) // 7
+        volumes = np.zeros((len(distintos), semanas))
+        np.add.at(volumes, (linha, coluna), minutos)
+        x = np.arange(semanas) - (semanas - 1) / 2
+        media = volumes.mean(axis=1)
+        inclinacao = (volumes - media[:, None]) @ x / (x @ x) if semanas > 1 else np.zeros(len(distintos))
+        return Tendencia(distintos, inclinacao, media)
+
+
+def main():
+    # Opções aceitas depois de qualquer comando
+    comuns = argparse.ArgumentParser(add_help=False)
+    comuns.add_argument("--banco", default=backend.DATABASE_NAME, help="arquivo do banco de dados")
+    comuns.add_argument("--fonte", choices=sorted(FONTES), default="atividades")
+    comuns.add_argument("--arquivadas", action="store_true", help="inclui os meses arquivados")
+    comuns.add_argument("--inicio", help="data inicial (AAAA-MM-DD, inclusiva)")
+    comuns.add_argument("--fim", help="data final (AAAA-MM-DD, inclusiva)")
+    parser = argparse.ArgumentParser(description="Análises de treinos e atividades")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    semanal = comandos.add_parser("semanal", parents=[comuns], help="volume semanal de um membro")
+    semanal.add_argument("membro", type=int)
+    comandos.add_parser("ranking", parents=[comuns], help="membros por total de minutos no período")
+    percentis = comandos.add_parser("percentis", parents=[comuns], help="percentis de minutos")
+    percentis.add_argument("--por", choices=("sessao", "membro"), default="sessao")
+    tendencia = comandos.add_parser("tendencia", parents=[comuns],
+                                    help="membros com maior alta ou queda de volume")
+    tendencia.add_argument("--semanas", type=int, default=8)
+    tendencia.add_argument("--limite", type=int, default=20)
+    args = parser.parse_args()
+
+    backend.configurar_banco(args.banco)
+    backend.atualizar_esquema()
+    analise = Analise(args.arquivadas)
+    if args.comando == "semanal":
+        volume = analise.volume_semanal(args.fonte, args.membro, args.inicio, args.fim)
+        for semana, minutos in zip(volume.semana, volume.minutos):
+            print(f"{semana}  {minutos:>8} min")
+    elif args.comando == "ranking":
+        ranking = analise.ranking(args.fonte, args.inicio, args.fim)
+        for membro, minutos, percentil in zip(*ranking):
+            print(f"{membro:>8}  {minutos:>10} min  p{percentil:5.1f}")
+    elif args.comando == "percentis":
+        for percentil, minutos in analise.percentis(args.fonte, por=args.por, inicio=args.inicio,
+                                                     fim=args.fim).items():
+            print(f"p{percentil:<3} {minutos if minutos is None else round(minutos, 1)} min")
+    else:
+        tendencia = analise.tendencia(args.fonte, args.semanas, args.fim)
+        ordem = np.argsort(-np.abs(tendencia.inclinacao), kind="stable")[:args.limite]
+        for i in ordem:
+            print(f"{tendencia.membro[i]:>8}  {tendencia.inclinacao[i]:+9.1f} min/semana  "
+                  f"média {tendencia.media[i]:8.1f} min")
+    backend.fechar_conexoes()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,30 +5,122 @@ import sqlite3
 import hashlib
 import datetime
 import getpass
-import sqlite3
+import json
+import os
+
+from cache import CacheLRU
+from conexao import GerenciadorConexoes, ContadorBloqueios, ESPERA_BLOQUEIO, repetir_em_bloqueio
+from metricas import Metricas, ARQUIVO_METRICAS
+from registros import (
+    Membro, MembroLista, Treino, Pagamento, Atividade, Funcionario,
+    ResumoReceita, ResumoAtividade, TotaisDia, Delta, Inadimplente
+)
+
+# Cada filial usa o seu arquivo; ACADEMIA_BANCO escolhe o do terminal
+DATABASE_NAME = os.environ.get("ACADEMIA_BANCO", "academia.db")
+
+# Quantidade padrão de linhas por página nas listagens paginadas
+TAMANHO_PAGINA = 50
+
+# Quantidade de registros gravados por transação nas cargas em lote
+TAMANHO_LOTE = 1000
+
+# Linhas buscadas por vez (fetchmany) nas leituras em fluxo
+TAMANHO_BLOCO = 5000
+# Tabelas com alterações registradas em Alteracoes (ver alteracoes_desde)
+TABELAS_VERSIONADAS = ("Membros", "Treinos", "Pagamentos")
+# Tabelas com linhas de um membro (ID_Membro), excluídas junto com ele
+TABELAS_DEPENDENTES = ("Treinos", "Pagamentos", "Historico_Atividades", "Inadimplentes")
+
+# Atividades de meses inteiros mais antigos que isso vão para os bancos de arquivo
+HORIZONTE_ARQUIVO_DIAS = 365
+
+# Membro sem pagamento quitado há mais que isso (ou desde o cadastro) está inadimplente
+CARENCIA_DIAS = 35
+# Status de pagamento que contam como mensalidade quitada
+STATUS_QUITADOS = ("Pago",)
 
-def listar_historico_atividades():
+# Chamadas, latência e SQL de cada função pública; consultas lentas com plano
+metricas = Metricas(arquivo=ARQUIVO_METRICAS)
+
+_gerenciador = GerenciadorConexoes(DATABASE_NAME, ao_abrir=metricas.instalar)
+
+# Funções que gravam são repetidas (com espera aleatória) quando outro terminal
+# mantém o banco bloqueado; `bloqueios` conta as repetições e desistências.
+# Quem agrupa chamadas em transacao() pode decorar a função que abre a
+# transação com repetir_se_ocupado para ter o mesmo comportamento.
+bloqueios = ContadorBloqueios()
+repetir_se_ocupado = repetir_em_bloqueio(lambda: _gerenciador.em_transacao(), contador=bloqueios)
+
+# Caches das buscas pontuais (ID do membro, login do funcionário). As funções
+# que alteram esses registros invalidam a entrada correspondente; leituras
+# feitas dentro de uma transação aberta não são guardadas.
+cache_membros = CacheLRU(tamanho=1024, ttl=300, em_transacao=lambda: _gerenciador.em_transacao())
+cache_funcionarios = CacheLRU(tamanho=64, ttl=60, em_transacao=lambda: _gerenciador.em_transacao())
+
+def configurar_banco(caminho, espera=ESPERA_BLOQUEIO):
     """
-    Lista todas as atividades registradas no histórico.
+    Aponta o backend para outro arquivo de banco, fechando as conexões atuais.
+    `espera` é quantos segundos aguardar por um bloqueio de outro terminal.
     """
-    conn = sqlite3.connect('academia.db')  # Substitua 'academia.db' pelo nome do seu banco de dados
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT id, membro, atividade, data, duracao FROM historico_atividades
-    ''')
-    atividades = cursor.fetchall()
-    conn.close()
-    return atividades
+    global DATABASE_NAME, _gerenciador
+    _gerenciador.fechar()
+    DATABASE_NAME = caminho
+    _gerenciador = GerenciadorConexoes(caminho, ao_abrir=metricas.instalar, espera=espera)
+    cache_membros.limpar()
+    cache_funcionarios.limpar()
 
-DATABASE_NAME = "academia.db"
+def banco_principal(caminho):
+    """Indica se `caminho` é o arquivo do banco configurado, mesmo por outro nome ou link"""
+    if os.path.realpath(caminho) == os.path.realpath(DATABASE_NAME):
+        return True
+    try:
+        return os.path.samefile(caminho, DATABASE_NAME)
+    except OSError:
+        return False
 
-def criar_conexao():
-    return sqlite3.connect(DATABASE_NAME)
+def obter_conexao():
+    """Retorna a conexão persistente da thread atual"""
+    return _gerenciador.conexao()
 
-def criar_tabelas():
-    conn = criar_conexao()
-    cursor = conn.cursor()
+def transacao(imediata=True):
+    """
+    Context manager de transação explícita.
+
+    Permite agrupar várias chamadas do backend em um único commit:
+
+        with transacao():
+            inserir_membro(...)
+            inserir_pagamento(...)
+
+    Por padrão a escrita é reservada já no início (BEGIN IMMEDIATE): com outro
+    terminal gravando, a transação espera a vez em vez de falhar no meio ao
+    tentar promover a leitura a escrita. Use imediata=False para só ler.
+    """
+    return _gerenciador.transacao(imediata)
+
+def fechar_conexoes():
+    """Fecha as conexões persistentes (ao encerrar o programa)"""
+    _gerenciador.fechar()
+
+def consultar(tipo, sql, parametros=()):
+    """Executa um SELECT e devolve a lista de registros do `tipo` informado"""
+    return list(map(tipo._make, obter_conexao().execute(sql, parametros)))
+
+def consultar_um(tipo, sql, parametros=()):
+    """Executa um SELECT e devolve o primeiro registro (ou None)"""
+    linha = obter_conexao().execute(sql, parametros).fetchone()
+    return tipo._make(linha) if linha is not None else None
 
+# --- Esquema e migrações ---
+#
+# A versão do esquema fica em PRAGMA user_version e cada migração leva o banco
+# da versão anterior à sua. Com o esquema em dia, abrir o banco custa só a
+# leitura do pragma. As migrações usam IF NOT EXISTS (e conferem o que já
+# existe antes de reconstruir dados), então bancos anteriores ao controle de
+# versão, em user_version 0, passam por todas sem erro.
+
+def _criar_tabelas_principais(cursor):
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS Membros (
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -84,8 +176,256 @@ def criar_tabelas():
         )
     """)
 
-    conn.commit()
-    conn.close()
+def _criar_indices(cursor):
+    # Índices das consultas de listagem (WHERE ID_Membro ... ORDER BY data, ID).
+    # Pagamentos e atividades têm linhas estreitas, então os índices cobrem
+    # todas as colunas; em Treinos a Descricao livre fica de fora.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_membros_nome ON Membros (Nome, ID, CPF, Telefone)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_treinos_membro_data ON Treinos (ID_Membro, Data_Inicio)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_treinos_data ON Treinos (Data_Inicio)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_pagamentos_membro_data
+        ON Pagamentos (ID_Membro, Data_Pagamento, ID, Valor, Status)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pagamentos_data ON Pagamentos (Data_Pagamento)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_atividades_membro_data
+        ON Historico_Atividades (ID_Membro, Data, ID, Atividade, Tempo_Execucao)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atividades_data ON Historico_Atividades (Data)")
+
+def _criar_busca_membros(cursor):
+    # Índice de texto (FTS5, trigramas) para a busca de membros por trechos
+    # de nome, CPF, telefone ou endereço. A tabela usa Membros como conteúdo
+    # externo e os gatilhos a mantêm sincronizada.
+    existia = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'Membros_Busca'").fetchone()
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS Membros_Busca USING fts5(
+            Nome, CPF, Telefone, Endereco,
+            content='Membros', content_rowid='ID', tokenize='trigram'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS membros_busca_ai AFTER INSERT ON Membros BEGIN
+            INSERT INTO Membros_Busca (rowid, Nome, CPF, Telefone, Endereco)
+            VALUES (new.ID, new.Nome, new.CPF, new.Telefone, new.Endereco);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS membros_busca_ad AFTER DELETE ON Membros BEGIN
+            INSERT INTO Membros_Busca (Membros_Busca, rowid, Nome, CPF, Telefone, Endereco)
+            VALUES ('delete', old.ID, old.Nome, old.CPF, old.Telefone, old.Endereco);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS membros_busca_au AFTER UPDATE ON Membros BEGIN
+            INSERT INTO Membros_Busca (Membros_Busca, rowid, Nome, CPF, Telefone, Endereco)
+            VALUES ('delete', old.ID, old.Nome, old.CPF, old.Telefone, old.Endereco);
+            INSERT INTO Membros_Busca (rowid, Nome, CPF, Telefone, Endereco)
+            VALUES (new.ID, new.Nome, new.CPF, new.Telefone, new.Endereco);
+        END
+    """)
+    if not existia:
+        # Bancos criados antes do índice: indexa os membros já cadastrados
+        cursor.execute("INSERT INTO Membros_Busca (Membros_Busca) VALUES ('rebuild')")
+
+def _criar_resumos(cursor):
+    """
+    Cria as tabelas de resumo (receita por mês/status e minutos de atividade
+    por membro/dia) e os gatilhos que as atualizam a cada gravação em
+    Pagamentos e Historico_Atividades.
+    """
+    existia = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'Resumo_Receita'").fetchone()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Resumo_Receita (
+            Mes TEXT NOT NULL,
+            Status TEXT NOT NULL,
+            Total REAL NOT NULL,
+            Quantidade INTEGER NOT NULL,
+            PRIMARY KEY (Mes, Status)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Resumo_Atividades (
+            ID_Membro INTEGER NOT NULL,
+            Data TEXT NOT NULL,
+            Minutos INTEGER NOT NULL,
+            Quantidade INTEGER NOT NULL,
+            PRIMARY KEY (ID_Membro, Data)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resumo_atividades_data ON Resumo_Atividades (Data)")
+
+    # Cada gatilho soma a linha nova e/ou subtrai a antiga do grupo correspondente;
+    # grupos que ficam sem linhas são removidos
+    receita = """
+        INSERT INTO Resumo_Receita (Mes, Status, Total, Quantidade)
+        VALUES (IFNULL(substr({r}.Data_Pagamento, 1, 7), ''), IFNULL({r}.Status, ''),
+                {s}IFNULL({r}.Valor, 0), {s}1)
+        ON CONFLICT (Mes, Status) DO UPDATE
+        SET Total = Total + excluded.Total, Quantidade = Quantidade + excluded.Quantidade;
+    """
+    receita_limpeza = """
+        DELETE FROM Resumo_Receita WHERE Quantidade = 0
+        AND Mes = IFNULL(substr(old.Data_Pagamento, 1, 7), '') AND Status = IFNULL(old.Status, '');
+    """
+    atividades = """
+        INSERT INTO Resumo_Atividades (ID_Membro, Data, Minutos, Quantidade)
+        VALUES ({r}.ID_Membro, IFNULL(substr({r}.Data, 1, 10), ''),
+                {s}IFNULL({r}.Tempo_Execucao, 0), {s}1)
+        ON CONFLICT (ID_Membro, Data) DO UPDATE
+        SET Minutos = Minutos + excluded.Minutos, Quantidade = Quantidade + excluded.Quantidade;
+    """
+    atividades_limpeza = """
+        DELETE FROM Resumo_Atividades WHERE Quantidade = 0
+        AND ID_Membro = old.ID_Membro AND Data = IFNULL(substr(old.Data, 1, 10), '');
+    """
+    for nome, tabela, modelo, limpeza in (
+            ("resumo_receita", "Pagamentos", receita, receita_limpeza),
+            ("resumo_atividades", "Historico_Atividades", atividades, atividades_limpeza)):
+        novo = modelo.format(r="new", s="")
+        antigo = modelo.format(r="old", s="-") + limpeza
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {nome}_ai AFTER INSERT ON {tabela} BEGIN {novo} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {nome}_ad AFTER DELETE ON {tabela} BEGIN {antigo} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {nome}_au AFTER UPDATE ON {tabela} BEGIN {antigo} {novo} END")
+
+    if not existia:
+        _recalcular_resumos(cursor)
+
+def _criar_registro_alteracoes(cursor):
+    """
+    Cria o registro de alterações usado pela atualização incremental das telas.
+
+    Cada inserção, atualização ou exclusão em TABELAS_VERSIONADAS grava
+    (Tabela, ID_Registro) com uma versão nova e crescente. Só a última alteração
+    de cada registro é mantida (INSERT OR REPLACE), então a tabela não passa do
+    número de registros já alterados.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Alteracoes (
+            Versao INTEGER PRIMARY KEY AUTOINCREMENT,
+            Tabela TEXT NOT NULL,
+            ID_Registro INTEGER NOT NULL,
+            Excluido INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_alteracoes_registro ON Alteracoes (Tabela, ID_Registro)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_alteracoes_versao
+        ON Alteracoes (Tabela, Versao, ID_Registro, Excluido)
+    """)
+    registrar = "INSERT OR REPLACE INTO Alteracoes (Tabela, ID_Registro, Excluido) VALUES ('{t}', {r}.ID, {e});"
+    for tabela in TABELAS_VERSIONADAS:
+        nome = f"alteracoes_{tabela.lower()}"
+        for sufixo, evento, r, e in (("ai", "INSERT", "new", 0), ("au", "UPDATE", "new", 0),
+                                     ("ad", "DELETE", "old", 1)):
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {nome}_{sufixo} AFTER {evento} ON {tabela} "
+                           f"BEGIN {registrar.format(t=tabela, r=r, e=e)} END")
+
+def _recalcular_resumos(cursor):
+    cursor.execute("DELETE FROM Resumo_Receita")
+    cursor.execute("""
+        INSERT INTO Resumo_Receita (Mes, Status, Total, Quantidade)
+        SELECT IFNULL(substr(Data_Pagamento, 1, 7), ''), IFNULL(Status, ''),
+               SUM(IFNULL(Valor, 0)), COUNT(*)
+        FROM Pagamentos GROUP BY 1, 2
+    """)
+    cursor.execute("DELETE FROM Resumo_Atividades")
+    cursor.execute("""
+        INSERT INTO Resumo_Atividades (ID_Membro, Data, Minutos, Quantidade)
+        SELECT ID_Membro, IFNULL(substr(Data, 1, 10), ''), SUM(IFNULL(Tempo_Execucao, 0)), COUNT(*)
+        FROM Historico_Atividades GROUP BY 1, 2
+    """)
+
+def _criar_catalogo_arquivo(cursor):
+    """Catálogo dos meses do histórico de atividades movidos para bancos de arquivo"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Atividades_Arquivadas (
+            Mes TEXT PRIMARY KEY,
+            Arquivo TEXT NOT NULL,
+            Linhas INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+def _criar_admin_padrao(cursor):
+    """Usuário admin padrão, se não existir"""
+    if not cursor.execute("SELECT 1 FROM Funcionarios WHERE Login = 'admin'").fetchone():
+        print("Criando usuário administrador padrão (login: admin, senha: admin)")
+        cursor.execute("""
+            INSERT INTO Funcionarios (Nome, Cargo, Login, Senha)
+            VALUES ('Administrador', 'Administrador', 'admin', ?)
+        """, (hash_senha("admin"),))
+
+def _criar_inadimplentes(cursor):
+    """Lista de inadimplentes materializada por atualizar_inadimplentes()"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Inadimplentes (
+            ID_Membro INTEGER PRIMARY KEY,
+            Ultimo_Pagamento TEXT,
+            Referencia TEXT,
+            Dias_Atraso INTEGER,
+            Calculado_Em TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_inadimplentes_atraso ON Inadimplentes (Dias_Atraso, Referencia)")
+
+def _criar_indices_membro_id(cursor):
+    # Listagens de um membro em ordem de ID: o índice (ID_Membro) guarda o
+    # rowid em ordem, então a página sai sem ordenação temporária
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_treinos_membro ON Treinos (ID_Membro)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pagamentos_membro ON Pagamentos (ID_Membro)")
+
+# (versão, descrição, função que recebe o cursor). Novas migrações entram no
+# fim com o próximo número; as já publicadas não devem ser alteradas.
+MIGRACOES = (
+    (1, "tabelas principais", _criar_tabelas_principais),
+    (2, "índices das listagens", _criar_indices),
+    (3, "busca de membros (FTS5)", _criar_busca_membros),
+    (4, "tabelas de resumo", _criar_resumos),
+    (5, "registro de alterações", _criar_registro_alteracoes),
+    (6, "catálogo de atividades arquivadas", _criar_catalogo_arquivo),
+    (7, "administrador padrão", _criar_admin_padrao),
+    (8, "lista de inadimplentes", _criar_inadimplentes),
+    (9, "índices por membro em ordem de ID", _criar_indices_membro_id),
+)
+VERSAO_ESQUEMA = MIGRACOES[-1][0]
+
+def versao_esquema():
+    return obter_conexao().execute("PRAGMA user_version").fetchone()[0]
+
+def migracoes_pendentes():
+    """Lista de (versão, descrição) das migrações ainda não aplicadas ao banco"""
+    versao = versao_esquema()
+    return [(numero, descricao) for numero, descricao, _ in MIGRACOES if numero > versao]
+
+@metricas.instrumentar
+@repetir_se_ocupado
+def atualizar_esquema():
+    """
+    Aplica as migrações pendentes numa única transação e retorna a lista de
+    (versão, descrição) aplicadas (vazia se o banco já estava em dia).
+    """
+    if versao_esquema() >= VERSAO_ESQUEMA:
+        return []
+    aplicadas = []
+    with transacao() as conn:
+        # Relido já com a escrita reservada: outro terminal pode ter migrado antes
+        versao = conn.execute("PRAGMA user_version").fetchone()[0]
+        cursor = conn.cursor()
+        for numero, descricao, migracao in MIGRACOES:
+            if numero > versao:
+                migracao(cursor)
+                aplicadas.append((numero, descricao))
+        if aplicadas:
+            cursor.execute(f"PRAGMA user_version = {VERSAO_ESQUEMA}")
+    cache_funcionarios.limpar()
+    return aplicadas
+
+def criar_tabelas():
+    """Mantida por compatibilidade: o mesmo que atualizar_esquema()"""
+    return atualizar_esquema()
 
 def hash_senha(senha):
     """Gera hash SHA-256 da senha"""
@@ -97,173 +437,883 @@ def verificar_senha(senha_digitada, senha_hash):
 
 # --- Funções CRUD ---
 
+@metricas.instrumentar
+@repetir_se_ocupado
 def inserir_membro(nome, cpf, telefone, endereco, data_cadastro):
-    conn = criar_conexao()
-    cursor = conn.cursor()
     try:
-        cursor.execute("""
-            INSERT INTO Membros (Nome, CPF, Telefone, Endereco, Data_Cadastro)
-            VALUES (?, ?, ?, ?, ?)
-        """, (nome, cpf, telefone, endereco, data_cadastro))
-        conn.commit()
+        with transacao() as conn:
+            id_membro = conn.execute("""
+                INSERT INTO Membros (Nome, CPF, Telefone, Endereco, Data_Cadastro)
+                VALUES (?, ?, ?, ?, ?)
+            """, (nome, cpf, telefone, endereco, data_cadastro)).lastrowid
         print("Membro cadastrado com sucesso!")
+        return id_membro
     except sqlite3.IntegrityError:
         print("Erro: CPF já cadastrado.")
-    finally:
-        conn.close()
 
+@metricas.instrumentar
 def listar_membros():
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute("SELECT ID, Nome, CPF, Telefone FROM Membros ORDER BY Nome")
-    membros = cursor.fetchall()
-    conn.close()
-    return membros
+    return consultar(MembroLista, f"SELECT {MembroLista.SELECT} FROM Membros ORDER BY Nome")
 
+@metricas.instrumentar
 def buscar_membro_id(id_membro):
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM Membros WHERE ID = ?", (id_membro,))
-    membro = cursor.fetchone()
-    conn.close()
-    return membro
+    return cache_membros.obter(id_membro, lambda: consultar_um(
+        Membro, f"SELECT {Membro.SELECT} FROM Membros WHERE ID = ?", (id_membro,)))
 
+@metricas.instrumentar
+def buscar_membros(texto, limite=20):
+    """
+    Busca membros por trechos de nome, CPF, telefone ou endereço, ordenando
+    pela relevância (bm25). Cada palavra deve aparecer em algum campo; como o
+    índice é de trigramas, palavras com menos de 3 letras fazem o texto inteiro
+    ser buscado como um trecho só, e textos com menos de 3 letras viram um
+    prefixo do nome.
+    """
+    texto = " ".join(texto.split())
+    if len(texto) < 3:
+        return consultar(MembroLista, f"""
+            SELECT {MembroLista.SELECT} FROM Membros
+            WHERE Nome >= ? AND Nome < ? ORDER BY Nome, ID LIMIT ?
+        """, (texto, texto + "\uffff", limite))
+    termos = texto.split()
+    if any(len(t) < 3 for t in termos):
+        termos = [texto]
+    consulta = " ".join('"' + t.replace('"', '""') + '"' for t in termos)
+    colunas = ", ".join("m." + c for c in MembroLista.COLUNAS)
+    return consultar(MembroLista, f"""
+        SELECT {colunas}
+        FROM Membros_Busca JOIN Membros m ON m.ID = Membros_Busca.rowid
+        WHERE Membros_Busca MATCH ? ORDER BY rank LIMIT ?
+    """, (consulta, limite))
+
+@metricas.instrumentar
+@repetir_se_ocupado
 def atualizar_membro(id_membro, nome, cpf, telefone, endereco):
-    conn = criar_conexao()
-    cursor = conn.cursor()
     try:
-        cursor.execute("""
-            UPDATE Membros SET Nome = ?, CPF = ?, Telefone = ?, Endereco = ?
-            WHERE ID = ?
-        """, (nome, cpf, telefone, endereco, id_membro))
-        conn.commit()
+        with transacao() as conn:
+            conn.execute("""
+                UPDATE Membros SET Nome = ?, CPF = ?, Telefone = ?, Endereco = ?
+                WHERE ID = ?
+            """, (nome, cpf, telefone, endereco, id_membro))
+        cache_membros.invalidar(id_membro)
         print("Membro atualizado com sucesso!")
+        return True
     except sqlite3.IntegrityError:
         print("Erro: CPF já cadastrado em outro membro.")
-    finally:
-        conn.close()
+        return False
 
+@metricas.instrumentar
+@repetir_se_ocupado
 def excluir_membro(id_membro):
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM Membros WHERE ID = ?", (id_membro,))
-    conn.commit()
-    conn.close()
+    """Exclui o membro com os seus treinos, pagamentos e atividades"""
+    _excluir_em_cascata("SELECT ?", (id_membro,))
     print("Membro excluído com sucesso!")
 
+@metricas.instrumentar
+@repetir_se_ocupado
+def excluir_membros(ids=None, condicao=None, parametros=()):
+    """
+    Exclui vários membros, com tudo o que depende deles, numa única transação
+    e retorna {tabela: linhas excluídas}. Os membros vêm de `ids` ou de
+    `condicao`, um trecho de WHERE sobre Membros com `parametros`, ex.:
+    excluir_membros(condicao="Data_Cadastro < ?", parametros=("2020-01-01",)).
+    As atividades já arquivadas continuam nos bancos de arquivo.
+    """
+    if (ids is None) == (condicao is None):
+        raise ValueError("Informe ids ou condicao.")
+    if ids is not None:
+        return _excluir_em_cascata("SELECT value FROM json_each(?)", (json.dumps(list(ids)),))
+    return _excluir_em_cascata(f"SELECT ID FROM Membros WHERE {condicao}", parametros)
+
+def _excluir_em_cascata(selecao, parametros):
+    # As chaves estrangeiras das tabelas não têm ON DELETE CASCADE (e o SQLite
+    # não permite acrescentá-lo sem recriar as tabelas), então os dependentes
+    # saem com um DELETE por tabela. Os IDs são fixados antes numa tabela
+    # temporária: um filtro sobre pagamentos, por exemplo, mudaria no meio.
+    with transacao() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS Exclusao_Membros (ID INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.Exclusao_Membros")
+        conn.execute(f"INSERT OR IGNORE INTO temp.Exclusao_Membros {selecao}", parametros)
+        ids = [id_membro for (id_membro,) in conn.execute("SELECT ID FROM temp.Exclusao_Membros")]
+        excluidas = {}
+        for tabela in TABELAS_DEPENDENTES:
+            excluidas[tabela] = conn.execute(
+                f"DELETE FROM {tabela} WHERE ID_Membro IN temp.Exclusao_Membros").rowcount
+        excluidas["Membros"] = conn.execute(
+            "DELETE FROM Membros WHERE ID IN temp.Exclusao_Membros").rowcount
+        conn.execute("DELETE FROM temp.Exclusao_Membros")
+    for id_membro in ids:
+        cache_membros.invalidar(id_membro)
+    return excluidas
+
+@metricas.instrumentar
+@repetir_se_ocupado
+def limpar_orfaos(remover=True):
+    """
+    Conta as linhas de TABELAS_DEPENDENTES cujo membro não existe mais e, com
+    `remover`, as exclui numa transação. Retorna {tabela: linhas órfãs}.
+    """
+    # Os membros ausentes saem de uma leitura só do índice por ID_Membro, e
+    # apenas as linhas deles são visitadas na tabela
+    orfas = "FROM {0} WHERE ID_Membro IN (SELECT DISTINCT ID_Membro FROM {0} AS d " \
+            "WHERE NOT EXISTS (SELECT 1 FROM Membros m WHERE m.ID = d.ID_Membro))"
+    encontradas = {}
+    with transacao(imediata=remover) as conn:
+        for tabela in TABELAS_DEPENDENTES:
+            if remover:
+                encontradas[tabela] = conn.execute("DELETE " + orfas.format(tabela)).rowcount
+            else:
+                encontradas[tabela] = conn.execute("SELECT COUNT(*) " + orfas.format(tabela)).fetchone()[0]
+    return encontradas
+
+@metricas.instrumentar
+@repetir_se_ocupado
 def inserir_treino(id_membro, tipo, descricao, duracao, data_inicio):
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO Treinos (ID_Membro, Tipo, Descricao, Duracao, Data_Inicio)
-        VALUES (?, ?, ?, ?, ?)
-    """, (id_membro, tipo, descricao, duracao, data_inicio))
-    conn.commit()
-    conn.close()
+    with transacao() as conn:
+        id_treino = conn.execute("""
+            INSERT INTO Treinos (ID_Membro, Tipo, Descricao, Duracao, Data_Inicio)
+            VALUES (?, ?, ?, ?, ?)
+        """, (id_membro, tipo, descricao, duracao, data_inicio)).lastrowid
     print("Treino cadastrado com sucesso!")
+    return id_treino
 
+@metricas.instrumentar
 def listar_treinos(id_membro=None):
-    conn = criar_conexao()
-    cursor = conn.cursor()
     if id_membro:
-        cursor.execute("SELECT * FROM Treinos WHERE ID_Membro = ? ORDER BY Data_Inicio DESC", (id_membro,))
-    else:
-        cursor.execute("SELECT * FROM Treinos ORDER BY Data_Inicio DESC")
-    treinos = cursor.fetchall()
-    conn.close()
-    return treinos
+        return consultar(Treino, f"SELECT {Treino.SELECT} FROM Treinos WHERE ID_Membro = ? ORDER BY Data_Inicio DESC", (id_membro,))
+    return consultar(Treino, f"SELECT {Treino.SELECT} FROM Treinos ORDER BY Data_Inicio DESC")
 
+@metricas.instrumentar
 def buscar_treino_id(id_treino):
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM Treinos WHERE ID = ?", (id_treino,))
-    treino = cursor.fetchone()
-    conn.close()
-    return treino
+    return consultar_um(Treino, f"SELECT {Treino.SELECT} FROM Treinos WHERE ID = ?", (id_treino,))
 
+@metricas.instrumentar
+@repetir_se_ocupado
 def atualizar_treino(id_treino, id_membro, tipo, descricao, duracao, data_inicio):
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE Treinos SET ID_Membro = ?, Tipo = ?, Descricao = ?, Duracao = ?, Data_Inicio = ?
-        WHERE ID = ?
-    """, (id_membro, tipo, descricao, duracao, data_inicio, id_treino))
-    conn.commit()
-    conn.close()
+    with transacao() as conn:
+        conn.execute("""
+            UPDATE Treinos SET ID_Membro = ?, Tipo = ?, Descricao = ?, Duracao = ?, Data_Inicio = ?
+            WHERE ID = ?
+        """, (id_membro, tipo, descricao, duracao, data_inicio, id_treino))
     print("Treino atualizado com sucesso!")
 
+@metricas.instrumentar
+@repetir_se_ocupado
 def excluir_treino(id_treino):
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM Treinos WHERE ID = ?", (id_treino,))
-    conn.commit()
-    conn.close()
+    with transacao() as conn:
+        conn.execute("DELETE FROM Treinos WHERE ID = ?", (id_treino,))
     print("Treino excluído com sucesso!")
 
+@metricas.instrumentar
+@repetir_se_ocupado
 def inserir_pagamento(id_membro, valor, data_pagamento, status):
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO Pagamentos (ID_Membro, Valor, Data_Pagamento, Status)
-        VALUES (?, ?, ?, ?)
-    """, (id_membro, valor, data_pagamento, status))
-    conn.commit()
-    conn.close()
+    with transacao() as conn:
+        id_pagamento = conn.execute("""
+            INSERT INTO Pagamentos (ID_Membro, Valor, Data_Pagamento, Status)
+            VALUES (?, ?, ?, ?)
+        """, (id_membro, valor, data_pagamento, status)).lastrowid
     print("Pagamento registrado com sucesso!")
+    return id_pagamento
 
+@metricas.instrumentar
 def listar_pagamentos(id_membro=None):
-    conn = criar_conexao()
-    cursor = conn.cursor()
     if id_membro:
-        cursor.execute("SELECT * FROM Pagamentos WHERE ID_Membro = ? ORDER BY Data_Pagamento DESC", (id_membro,))
-    else:
-        cursor.execute("SELECT * FROM Pagamentos ORDER BY Data_Pagamento DESC")
-    pagamentos = cursor.fetchall()
-    conn.close()
-    return pagamentos
+        return consultar(Pagamento, f"SELECT {Pagamento.SELECT} FROM Pagamentos WHERE ID_Membro = ? ORDER BY Data_Pagamento DESC", (id_membro,))
+    return consultar(Pagamento, f"SELECT {Pagamento.SELECT} FROM Pagamentos ORDER BY Data_Pagamento DESC")
 
+@metricas.instrumentar
+@repetir_se_ocupado
 def inserir_atividade(id_membro, atividade, data, tempo_execucao):
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO Historico_Atividades (ID_Membro, Atividade, Data, Tempo_Execucao)
-        VALUES (?, ?, ?, ?)
-    """, (id_membro, atividade, data, tempo_execucao))
-    conn.commit()
-    conn.close()
+    with transacao() as conn:
+        id_atividade = conn.execute("""
+            INSERT INTO Historico_Atividades (ID_Membro, Atividade, Data, Tempo_Execucao)
+            VALUES (?, ?, ?, ?)
+        """, (id_membro, atividade, data, tempo_execucao)).lastrowid
     print("Atividade registrada com sucesso!")
+    return id_atividade
 
-def listar_atividades(id_membro):
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM Historico_Atividades WHERE ID_Membro = ? ORDER BY Data DESC", (id_membro,))
-    atividades = cursor.fetchall()
-    conn.close()
-    return atividades
+@metricas.instrumentar
+def listar_atividades(id_membro, data_inicio=None, data_fim=None):
+    """
+    Atividades do membro, mais recentes primeiro. Sem datas, só as que ainda
+    não foram arquivadas; com um intervalo, inclui os meses arquivados nele.
+    """
+    return _consultar_atividades("ID_Membro = ?", [id_membro], data_inicio, data_fim)
 
+@metricas.instrumentar
+def listar_historico_atividades(data_inicio=None, data_fim=None):
+    """
+    Lista as atividades registradas no histórico (ver listar_atividades
+    quanto ao intervalo de datas e aos meses arquivados).
+    """
+    return _consultar_atividades(None, [], data_inicio, data_fim)
+
+# --- Listagens paginadas (keyset) ---
+
+class Pagina:
+    """
+    Uma página de uma listagem paginada.
+
+    `cursor_inicio` e `cursor_fim` são as chaves (valor_ordem, ID) da primeira
+    e da última linha; passe-os em `antes`/`apos` para obter a página vizinha.
+    """
+
+    def __init__(self, linhas, cursor_inicio, cursor_fim, tem_anterior, tem_proxima):
+        self.linhas = linhas
+        self.cursor_inicio = cursor_inicio
+        self.cursor_fim = cursor_fim
+        self.tem_anterior = tem_anterior
+        self.tem_proxima = tem_proxima
+
+# Tipo de registro de cada listagem paginada e colunas de ordenação permitidas (todas indexadas)
+TIPOS_PAGINACAO = {
+    "Membros": MembroLista,
+    "Treinos": Treino,
+    "Pagamentos": Pagamento,
+    "Historico_Atividades": Atividade,
+}
+
+ORDENACOES = {
+    "Membros": ("Nome", "CPF", "ID"),
+    "Treinos": ("Data_Inicio", "ID"),
+    "Pagamentos": ("Data_Pagamento", "ID"),
+    "Historico_Atividades": ("Data", "ID"),
+}
+
+def _paginar(tabela, ordem, descendente, apos, antes, limite, id_membro=None):
+    """
+    Busca uma página de `tabela` ordenada por (ordem, ID) a partir de um cursor.
+
+    Em vez de OFFSET, a consulta continua a partir da chave da última linha
+    vista, então o custo de cada página independe da posição na tabela.
+
+    NULL ordena antes de qualquer valor, mas (NULL, ID) > (?, ?) não é
+    verdadeiro nem falso: as linhas sem valor na coluna de ordenação são
+    buscadas num trecho à parte (IS NULL / IS NOT NULL), que completa a página.
+    """
+    if ordem not in ORDENACOES[tabela]:
+        raise ValueError(f"Ordenação inválida para {tabela}: {ordem}")
+    tipo = TIPOS_PAGINACAO[tabela]
+    chave = "ID" if ordem == "ID" else f"{ordem}, ID"
+    para_tras = antes is not None
+    decrescente = descendente != para_tras
+    filtro, parametros = [], []
+    if id_membro:
+        filtro.append("ID_Membro = ?")
+        parametros.append(id_membro)
+    cursor = antes if para_tras else apos
+    operador = "<" if decrescente else ">"
+    # Trechos (condições, parâmetros) consultados em ordem até encher a página
+    if cursor is None:
+        trechos = [([], [])]
+    elif ordem == "ID":
+        trechos = [([f"ID {operador} ?"], [cursor[1]])]
+    elif cursor[0] is None:
+        trechos = [([f"{ordem} IS NULL", f"ID {operador} ?"], [cursor[1]])]
+        if not decrescente:
+            trechos.append(([f"{ordem} IS NOT NULL"], []))
+    else:
+        trechos = [([f"({chave}) {operador} (?, ?)"], list(cursor))]
+        if decrescente:
+            trechos.append(([f"{ordem} IS NULL"], []))
+    direcao = "DESC" if decrescente else "ASC"
+    linhas = []
+    for condicoes, valores in trechos:
+        if len(linhas) > limite:
+            break
+        sql = f"SELECT {tipo.SELECT} FROM {tabela}"
+        if filtro or condicoes:
+            sql += " WHERE " + " AND ".join(filtro + condicoes)
+        sql += " ORDER BY " + ", ".join(f"{c} {direcao}" for c in chave.split(", "))
+        sql += " LIMIT ?"
+        linhas += consultar(tipo, sql, parametros + valores + [limite + 1 - len(linhas)])
+
+    mais = len(linhas) > limite
+    linhas = linhas[:limite]
+    if para_tras:
+        linhas.reverse()
+        tem_anterior, tem_proxima = mais, True
+    else:
+        tem_anterior, tem_proxima = apos is not None, mais
+
+    posicao = tipo.COLUNAS.index(ordem)
+    def cursor_de(linha):
+        return (linha[posicao], linha.id)
+    inicio = cursor_de(linhas[0]) if linhas else None
+    fim = cursor_de(linhas[-1]) if linhas else None
+    return Pagina(linhas, inicio, fim, tem_anterior, tem_proxima)
+
+@metricas.instrumentar
+def listar_membros_pagina(apos=None, antes=None, limite=TAMANHO_PAGINA, ordem="Nome", descendente=False):
+    return _paginar("Membros", ordem, descendente, apos, antes, limite)
+
+@metricas.instrumentar
+def listar_treinos_pagina(id_membro=None, apos=None, antes=None, limite=TAMANHO_PAGINA,
+                          ordem="Data_Inicio", descendente=True):
+    return _paginar("Treinos", ordem, descendente, apos, antes, limite, id_membro)
+
+@metricas.instrumentar
+def listar_pagamentos_pagina(id_membro=None, apos=None, antes=None, limite=TAMANHO_PAGINA,
+                             ordem="Data_Pagamento", descendente=True):
+    return _paginar("Pagamentos", ordem, descendente, apos, antes, limite, id_membro)
+
+@metricas.instrumentar
+def listar_historico_pagina(apos=None, antes=None, limite=TAMANHO_PAGINA, ordem="Data", descendente=True):
+    return _paginar("Historico_Atividades", ordem, descendente, apos, antes, limite)
+
+@metricas.instrumentar
+def contar_historico_atividades():
+    return obter_conexao().execute("SELECT COUNT(*) FROM Historico_Atividades").fetchone()[0]
+
+@metricas.instrumentar
+def cursor_historico_posicao(posicao):
+    """
+    Retorna a chave (Data, ID) da linha na posição informada do histórico
+    (mais recentes primeiro), para saltar direto a ela sem trazer as anteriores.
+
+    O OFFSET ainda percorre as entradas anteriores do índice (Data, ID), então
+    o custo cresce com a posição; só os saltos da barra de rolagem usam esta
+    função, a rolagem normal continua pelas chaves.
+    """
+    linha = obter_conexao().execute("""
+        SELECT Data, ID FROM Historico_Atividades
+        ORDER BY Data DESC, ID DESC LIMIT 1 OFFSET ?
+    """, (posicao,)).fetchone()
+    return tuple(linha) if linha else None
+
+@metricas.instrumentar
+def versao_alteracoes(tabela=None):
+    """Versão mais recente do registro de alterações, geral ou de uma tabela (0 se nada mudou)"""
+    if tabela is None:
+        return obter_conexao().execute("SELECT IFNULL(MAX(Versao), 0) FROM Alteracoes").fetchone()[0]
+    return obter_conexao().execute(
+        "SELECT IFNULL(MAX(Versao), 0) FROM Alteracoes WHERE Tabela = ?", (tabela,)).fetchone()[0]
+
+@metricas.instrumentar
+def alteracoes_desde(tabela, versao):
+    """
+    Retorna um Delta com o que mudou em `tabela` depois de `versao`: as linhas
+    inseridas ou alteradas (no tipo da listagem paginada) e os IDs excluídos.
+    A versão do Delta serve de ponto de partida para a próxima chamada.
+    """
+    if tabela not in TABELAS_VERSIONADAS:
+        raise ValueError(f"Tabela sem registro de alterações: {tabela}")
+    tipo = TIPOS_PAGINACAO[tabela]
+    # Registro e linhas lidos na mesma transação, para enxergarem o mesmo estado
+    with transacao(imediata=False) as conn:
+        registros = conn.execute("""
+            SELECT Versao, ID_Registro, Excluido FROM Alteracoes
+            WHERE Tabela = ? AND Versao > ? ORDER BY Versao
+        """, (tabela, versao)).fetchall()
+        if not registros:
+            return Delta(versao, [], [])
+        excluidos = [id_registro for _, id_registro, excluido in registros if excluido]
+        alterados = [id_registro for _, id_registro, excluido in registros if not excluido]
+        linhas = []
+        if alterados:
+            linhas = consultar(tipo, f"""
+                SELECT {tipo.SELECT} FROM {tabela}
+                WHERE ID IN (SELECT value FROM json_each(?))
+            """, (json.dumps(alterados),))
+    return Delta(registros[-1][0], linhas, excluidos)
+
+@metricas.instrumentar
+@repetir_se_ocupado
 def inserir_funcionario(nome, cargo, login, senha):
-    conn = criar_conexao()
-    cursor = conn.cursor()
     try:
         senha_hash = hash_senha(senha)
-        cursor.execute("""
-            INSERT INTO Funcionarios (Nome, Cargo, Login, Senha)
-            VALUES (?, ?, ?, ?)
-        """, (nome, cargo, login, senha_hash))
-        conn.commit()
+        with transacao() as conn:
+            conn.execute("""
+                INSERT INTO Funcionarios (Nome, Cargo, Login, Senha)
+                VALUES (?, ?, ?, ?)
+            """, (nome, cargo, login, senha_hash))
+        cache_funcionarios.invalidar(login)
         print("Funcionário cadastrado com sucesso!")
     except sqlite3.IntegrityError:
         print("Erro: Login já utilizado.")
-    finally:
-        conn.close()
 
+@metricas.instrumentar
 def buscar_funcionario_login(login):
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM Funcionarios WHERE Login = ?", (login,))
-    funcionario = cursor.fetchone()
-    conn.close()
-    return funcionario
+    return cache_funcionarios.obter(login, lambda: consultar_um(
+        Funcionario, f"SELECT {Funcionario.SELECT} FROM Funcionarios WHERE Login = ?", (login,)))
+
+def estatisticas_cache():
+    """Contadores de acertos, falhas e despejos dos caches de busca"""
+    return {
+        "membros": cache_membros.estatisticas(),
+        "funcionarios": cache_funcionarios.estatisticas(),
+    }
+
+# --- Resumos (receita e atividades) ---
+
+@metricas.instrumentar
+@repetir_se_ocupado
+def reconstruir_resumos():
+    """
+    Recalcula as tabelas de resumo a partir das tabelas de origem (reparo).
+    As atividades arquivadas são somadas depois, um mês por transação.
+    """
+    with transacao() as conn:
+        _recalcular_resumos(conn.cursor())
+    for mes, arquivo, _ in listar_meses_arquivados():
+        nome = _anexar_mes(mes, arquivo)
+        with transacao() as conn:
+            conn.execute(_SOMAR_RESUMO_ATIVIDADES.format(origem=f"{nome}.Historico_Atividades", filtro=""))
+
+@metricas.instrumentar
+def resumo_receita(mes_inicio="", mes_fim="\uffff"):
+    """
+    Receita por mês (AAAA-MM) e status no intervalo, lida das tabelas de resumo:
+    lista de ResumoReceita, mais recentes primeiro.
+    """
+    return consultar(ResumoReceita, f"""
+        SELECT {ResumoReceita.SELECT} FROM Resumo_Receita
+        WHERE Mes BETWEEN ? AND ? ORDER BY Mes DESC, Status DESC
+    """, (mes_inicio, mes_fim))
+
+@metricas.instrumentar
+def resumo_atividades_membro(id_membro, data_inicio="", data_fim="\uffff"):
+    """Minutos e quantidade de atividades do membro por dia (lista de ResumoAtividade)"""
+    return consultar(ResumoAtividade, f"""
+        SELECT {ResumoAtividade.SELECT} FROM Resumo_Atividades
+        WHERE ID_Membro = ? AND Data BETWEEN ? AND ? ORDER BY Data DESC
+    """, (id_membro, data_inicio, data_fim))
+
+@metricas.instrumentar
+def resumo_atividades_dia(data):
+    """Totais do dia: TotaisDia(membros ativos, minutos, quantidade de atividades)"""
+    return consultar_um(TotaisDia, """
+        SELECT COUNT(*), IFNULL(SUM(Minutos), 0), IFNULL(SUM(Quantidade), 0)
+        FROM Resumo_Atividades WHERE Data = ?
+    """, (data,))
+
+# --- Arquivo do histórico de atividades ---
+#
+# Meses antigos de Historico_Atividades ficam em bancos separados, um por mês
+# (<banco>_arquivo/atividades_AAAA_MM.db), anexados sob demanda. A tabela
+# principal e seus índices guardam só o período recente; as listagens paginadas
+# e contagens enxergam apenas ele, e listar_atividades/listar_historico_atividades
+# incluem os arquivos quando recebem um intervalo de datas. Os resumos de
+# atividades continuam cobrindo todo o histórico.
+
+# Soma (ou readiciona) as atividades de `origem` em Resumo_Atividades
+_SOMAR_RESUMO_ATIVIDADES = """
+    INSERT INTO Resumo_Atividades (ID_Membro, Data, Minutos, Quantidade)
+    SELECT ID_Membro, IFNULL(substr(Data, 1, 10), ''), SUM(IFNULL(Tempo_Execucao, 0)), COUNT(*)
+    FROM {origem} WHERE true {filtro} GROUP BY 1, 2
+    ON CONFLICT (ID_Membro, Data) DO UPDATE
+    SET Minutos = Minutos + excluded.Minutos, Quantidade = Quantidade + excluded.Quantidade
+"""
+
+def diretorio_arquivo():
+    """Diretório dos bancos de arquivo, ao lado do banco principal"""
+    base, _ = os.path.splitext(os.path.abspath(DATABASE_NAME))
+    return base + "_arquivo"
+
+def _anexar_mes(mes, arquivo):
+    """Anexa o banco de arquivo do mês (AAAA-MM) e retorna o nome do esquema"""
+    nome = "arq_" + mes.replace("-", "_")
+    _gerenciador.anexar(os.path.join(diretorio_arquivo(), arquivo), nome)
+    return nome
+
+def listar_meses_arquivados():
+    """Lista de (mês, arquivo, linhas) dos meses já arquivados"""
+    return obter_conexao().execute(
+        "SELECT Mes, Arquivo, Linhas FROM Atividades_Arquivadas ORDER BY Mes").fetchall()
+
+def _consultar_atividades(condicao, parametros, data_inicio, data_fim):
+    """
+    Atividades que atendem `condicao`, mais recentes primeiro. Com intervalo de
+    datas (limites inclusivos, AAAA-MM-DD), os meses arquivados que o tocam
+    são consultados em seguida e combinados com a tabela principal.
+    """
+    condicoes = [condicao] if condicao else []
+    if data_inicio is None and data_fim is None:
+        sql = f"SELECT {Atividade.SELECT} FROM Historico_Atividades"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        return consultar(Atividade, sql + " ORDER BY Data DESC", parametros)
+
+    inicio = data_inicio or ""
+    fim = (data_fim or "") + "\uffff"
+    condicoes.append("Data BETWEEN ? AND ?")
+    parametros = parametros + [inicio, fim]
+    sql = f"SELECT {Atividade.SELECT} FROM {{}}Historico_Atividades WHERE " + " AND ".join(condicoes)
+    linhas = consultar(Atividade, sql.format("") + " ORDER BY Data DESC", parametros)
+    meses = obter_conexao().execute(
+        "SELECT Mes, Arquivo FROM Atividades_Arquivadas WHERE Mes BETWEEN substr(?, 1, 7) AND ? ORDER BY Mes",
+        (inicio, fim)).fetchall()
+    if not meses:
+        return linhas
+    # Um mês sendo rearquivado pode ter a mesma linha nos dois lados por um instante
+    vistos = {linha.id for linha in linhas}
+    for mes, arquivo in meses:
+        nome = _anexar_mes(mes, arquivo)
+        linhas.extend(linha for linha in consultar(Atividade, sql.format(nome + "."), parametros)
+                      if linha.id not in vistos)
+    linhas.sort(key=lambda atividade: (atividade.data, atividade.id), reverse=True)
+    return linhas
+
+@metricas.instrumentar
+@repetir_se_ocupado
+def arquivar_atividades(horizonte_dias=HORIZONTE_ARQUIVO_DIAS, hoje=None):
+    """
+    Move para os bancos de arquivo as atividades dos meses inteiros anteriores
+    a `horizonte_dias` atrás e retorna {mês: linhas movidas}.
+
+    Cada mês é copiado numa transação e só então removido da tabela principal
+    (com o registro no catálogo) em outra, de modo que uma interrupção no meio
+    nunca perde linhas: basta rodar de novo.
+    """
+    hoje = hoje or datetime.date.today()
+    corte = (hoje - datetime.timedelta(days=horizonte_dias)).replace(day=1).isoformat()
+    meses = [mes for (mes,) in obter_conexao().execute("""
+        SELECT DISTINCT substr(Data, 1, 7) FROM Historico_Atividades
+        WHERE Data < ? AND Data GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*' ORDER BY 1
+    """, (corte,))]
+    if meses:
+        os.makedirs(diretorio_arquivo(), exist_ok=True)
+
+    movidas = {}
+    for mes in meses:
+        arquivo = f"atividades_{mes.replace('-', '_')}.db"
+        nome = _anexar_mes(mes, arquivo)
+        periodo = (mes, mes + "\uffff")
+        with transacao() as conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {nome}.Historico_Atividades (
+                    ID INTEGER PRIMARY KEY,
+                    ID_Membro INTEGER NOT NULL,
+                    Atividade TEXT,
+                    Data TEXT,
+                    Tempo_Execucao INTEGER
+                )
+            """)
+            conn.execute(f"""
+                CREATE INDEX IF NOT EXISTS {nome}.idx_atividades_membro_data
+                ON Historico_Atividades (ID_Membro, Data, ID, Atividade, Tempo_Execucao)
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {nome}.idx_atividades_data ON Historico_Atividades (Data)")
+            conn.execute(f"""
+                INSERT OR REPLACE INTO {nome}.Historico_Atividades ({Atividade.SELECT})
+                SELECT {Atividade.SELECT} FROM main.Historico_Atividades WHERE Data >= ? AND Data < ?
+            """, periodo)
+
+        # Remove só as linhas idênticas à cópia arquivada. Os gatilhos de resumo
+        # subtrairiam essas atividades; elas são somadas antes para compensar.
+        copiadas = f"""
+            AND Data >= ? AND Data < ? AND EXISTS (
+                SELECT 1 FROM {nome}.Historico_Atividades a
+                WHERE a.ID = h.ID AND a.ID_Membro = h.ID_Membro AND a.Atividade IS h.Atividade
+                AND a.Data IS h.Data AND a.Tempo_Execucao IS h.Tempo_Execucao)
+        """
+        with transacao() as conn:
+            conn.execute(_SOMAR_RESUMO_ATIVIDADES.format(
+                origem="main.Historico_Atividades h", filtro=copiadas), periodo)
+            movidas[mes] = conn.execute(
+                f"DELETE FROM main.Historico_Atividades AS h WHERE true {copiadas}", periodo).rowcount
+            conn.execute(f"""
+                INSERT INTO Atividades_Arquivadas (Mes, Arquivo, Linhas)
+                VALUES (?, ?, (SELECT COUNT(*) FROM {nome}.Historico_Atividades))
+                ON CONFLICT (Mes) DO UPDATE SET Arquivo = excluded.Arquivo, Linhas = excluded.Linhas
+            """, (mes, arquivo))
+    return movidas
+
+# --- Inadimplência ---
+#
+# Um membro está inadimplente quando o último pagamento quitado (STATUS_QUITADOS)
+# ou, sem nenhum, a data de cadastro é anterior a hoje - carência. A consulta é
+# uma só: percorre Membros pelo índice de nome e busca o último pagamento de cada
+# um no índice (ID_Membro, Data_Pagamento, ..., Status), sem ler a tabela.
+# A cobrança (manutencao.py cobranca, agendada) grava o resultado em
+# Inadimplentes, que as telas leem de uma vez.
+
+_SQL_INADIMPLENTES = """
+    SELECT ID, Nome, CPF, Telefone, Ultimo_Pagamento, Referencia,
+           CAST(julianday(:hoje) - julianday(Referencia) AS INTEGER) AS Dias_Atraso
+    FROM (
+        SELECT ID, Nome, CPF, Telefone, Ultimo_Pagamento,
+               COALESCE(Ultimo_Pagamento, Data_Cadastro) AS Referencia
+        FROM (
+            SELECT m.ID, m.Nome, m.CPF, m.Telefone, m.Data_Cadastro,
+                   (SELECT MAX(p.Data_Pagamento) FROM Pagamentos p
+                    WHERE p.ID_Membro = m.ID
+                    AND p.Status IN (SELECT value FROM json_each(:quitados))) AS Ultimo_Pagamento
+            FROM Membros m ORDER BY m.Nome, m.ID
+        )
+    )
+    WHERE Referencia IS NULL OR Referencia < :corte
+"""
+
+def _parametros_inadimplencia(carencia_dias, hoje):
+    hoje = hoje or datetime.date.today()
+    return {
+        "hoje": hoje.isoformat(),
+        "corte": (hoje - datetime.timedelta(days=carencia_dias)).isoformat(),
+        "quitados": json.dumps(STATUS_QUITADOS),
+    }
+
+@metricas.instrumentar
+def buscar_inadimplentes(carencia_dias=CARENCIA_DIAS, hoje=None):
+    """
+    Calcula na hora os membros inadimplentes (lista de Inadimplente, por nome).
+    `dias_atraso` conta desde o último pagamento quitado ou, sem nenhum, desde
+    o cadastro (None se o membro não tem nenhum dos dois).
+    """
+    return consultar(Inadimplente, _SQL_INADIMPLENTES, _parametros_inadimplencia(carencia_dias, hoje))
+
+@metricas.instrumentar
+@repetir_se_ocupado
+def atualizar_inadimplentes(carencia_dias=CARENCIA_DIAS, hoje=None):
+    """
+    Recalcula a lista materializada de inadimplentes numa transação e retorna
+    quantos foram encontrados. Feita para rodar agendada (manutencao.py cobranca).
+    """
+    parametros = _parametros_inadimplencia(carencia_dias, hoje)
+    parametros["agora"] = datetime.datetime.now().isoformat(" ", "seconds")
+    with transacao() as conn:
+        conn.execute("DELETE FROM Inadimplentes")
+        return conn.execute(f"""
+            INSERT INTO Inadimplentes (ID_Membro, Ultimo_Pagamento, Referencia, Dias_Atraso, Calculado_Em)
+            SELECT ID, Ultimo_Pagamento, Referencia, Dias_Atraso, :agora FROM ({_SQL_INADIMPLENTES})
+        """, parametros).rowcount
+
+# Membros da lista materializada que não quitaram nada depois dela ser calculada
+_INADIMPLENTES_PENDENTES = """
+    FROM Inadimplentes i JOIN Membros m ON m.ID = i.ID_Membro
+    WHERE NOT EXISTS (
+        SELECT 1 FROM Pagamentos p
+        WHERE p.ID_Membro = i.ID_Membro AND p.Data_Pagamento > IFNULL(i.Referencia, '')
+        AND p.Status IN (SELECT value FROM json_each(?)))
+"""
+
+@metricas.instrumentar
+def listar_inadimplentes():
+    """
+    Inadimplentes da última cobrança (lista de Inadimplente), mais atrasados
+    primeiro. Quem pagou depois do cálculo já sai da lista.
+    """
+    return consultar(Inadimplente, f"""
+        SELECT m.ID, m.Nome, m.CPF, m.Telefone, i.Ultimo_Pagamento, i.Referencia, i.Dias_Atraso
+        {_INADIMPLENTES_PENDENTES} ORDER BY i.Dias_Atraso DESC, i.Referencia DESC
+    """, (json.dumps(STATUS_QUITADOS),))
+
+@metricas.instrumentar
+def ids_inadimplentes():
+    """IDs dos inadimplentes da última cobrança (set), para marcar as listagens"""
+    return {id_membro for (id_membro,) in obter_conexao().execute(
+        f"SELECT i.ID_Membro {_INADIMPLENTES_PENDENTES}", (json.dumps(STATUS_QUITADOS),))}
+
+# --- Leituras em fluxo (exportações) ---
+#
+# Geradores que percorrem uma tabela inteira em memória constante: o cursor
+# busca TAMANHO_BLOCO linhas por vez e o SELECT continua aberto (com a mesma
+# visão do banco) até o fim da iteração. Ordem cronológica, por (data, ID).
+
+def _iterar(tipo, sql, parametros, tamanho_bloco):
+    cursor = obter_conexao().execute(sql, parametros)
+    try:
+        while True:
+            bloco = cursor.fetchmany(tamanho_bloco)
+            if not bloco:
+                return
+            yield from map(tipo._make, bloco)
+    finally:
+        cursor.close()
+
+def _filtros(coluna_data, id_membro, data_inicio, data_fim):
+    """Cláusula WHERE (ou "") e parâmetros dos filtros de membro e período"""
+    condicoes, parametros = [], []
+    if id_membro:
+        condicoes.append("ID_Membro = ?")
+        parametros.append(id_membro)
+    if data_inicio is not None or data_fim is not None:
+        # Limites inclusivos; o fim também aceita datas com hora (AAAA-MM-DD HH:MM)
+        condicoes.append(f"{coluna_data} BETWEEN ? AND ?")
+        parametros += [data_inicio or "", (data_fim or "") + "\uffff"]
+    return (" WHERE " + " AND ".join(condicoes) if condicoes else ""), parametros
+
+def iterar_pagamentos(id_membro=None, data_inicio=None, data_fim=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Gera os pagamentos (Pagamento) do membro e/ou período, sem carregar a lista"""
+    onde, parametros = _filtros("Data_Pagamento", id_membro, data_inicio, data_fim)
+    return _iterar(Pagamento, f"SELECT {Pagamento.SELECT} FROM Pagamentos{onde} ORDER BY Data_Pagamento, ID",
+                   parametros, tamanho_bloco)
+
+def iterar_treinos(id_membro=None, data_inicio=None, data_fim=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Gera os treinos (Treino) do membro e/ou período, sem carregar a lista"""
+    onde, parametros = _filtros("Data_Inicio", id_membro, data_inicio, data_fim)
+    return _iterar(Treino, f"SELECT {Treino.SELECT} FROM Treinos{onde} ORDER BY Data_Inicio, ID",
+                   parametros, tamanho_bloco)
+
+def iterar_atividades(id_membro=None, data_inicio=None, data_fim=None, tamanho_bloco=TAMANHO_BLOCO,
+                      arquivadas=True):
+    """
+    Gera as atividades (Atividade) do membro e/ou período. Com `arquivadas`,
+    percorre antes os meses arquivados do período (todos, sem período) e
+    depois a tabela principal.
+    """
+    onde, parametros = _filtros("Data", id_membro, data_inicio, data_fim)
+    sql = f"SELECT {Atividade.SELECT} FROM {{}}Historico_Atividades{onde} ORDER BY Data, ID"
+    if arquivadas:
+        meses = obter_conexao().execute(
+            "SELECT Mes, Arquivo FROM Atividades_Arquivadas WHERE Mes BETWEEN substr(?, 1, 7) AND ? ORDER BY Mes",
+            (data_inicio or "", (data_fim or "") + "\uffff")).fetchall()
+        for mes, arquivo in meses:
+            nome = _anexar_mes(mes, arquivo)
+            yield from _iterar(Atividade, sql.format(nome + "."), parametros, tamanho_bloco)
+    yield from _iterar(Atividade, sql.format(""), parametros, tamanho_bloco)
+
+# Colunas numéricas das análises (analise.py): (ID, ID_Membro, dia, minutos),
+# com o dia contado desde 1970-01-01 e SEM_DATA quando a data é inválida
+SEM_DATA = -2**31
+_COLUNAS_DURACAO = {
+    "Treinos": ("Data_Inicio", "Duracao"),
+    "Historico_Atividades": ("Data", "Tempo_Execucao"),
+}
+
+def _colunas_duracao(tabela):
+    """Lista do SELECT com (ID, ID_Membro, dia, minutos); texto como "30 min" vira 30"""
+    data, minutos = _COLUNAS_DURACAO[tabela]
+    return f"""ID, ID_Membro,
+        IFNULL(CAST(julianday(substr({data}, 1, 10)) - 2440587.5 AS INTEGER), {SEM_DATA}),
+        IFNULL(CAST({minutos} AS INTEGER), 0)"""
+
+@metricas.instrumentar
+def ler_duracoes(tabela, ids):
+    """As mesmas colunas de iterar_duracoes para as linhas com esses IDs"""
+    return obter_conexao().execute(
+        f"SELECT {_colunas_duracao(tabela)} FROM {tabela} WHERE ID IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(ids)),)).fetchall()
+
+def iterar_duracoes(tabela, apos_id=0, arquivadas=False, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Gera em blocos (listas de até `tamanho_bloco` tuplas) as colunas
+    (ID, ID_Membro, dia, minutos) de Treinos ou Historico_Atividades com ID
+    maior que `apos_id`, em ordem de ID. Com `arquivadas`, o histórico
+    começa pelos meses arquivados.
+    """
+    sql = f"SELECT {_colunas_duracao(tabela)} FROM {{}}{tabela} WHERE ID > ? ORDER BY ID"
+    meses = []
+    if arquivadas and tabela == "Historico_Atividades":
+        meses = [(mes, arquivo) for mes, arquivo, _ in listar_meses_arquivados()]
+    for mes, arquivo in meses + [(None, None)]:
+        # Cada mês é anexado só na hora de ser lido: acima de LIMITE_ANEXOS
+        # os anexos mais antigos são desanexados
+        origem = _anexar_mes(mes, arquivo) + "." if mes else ""
+        cursor = obter_conexao().execute(sql.format(origem), (apos_id,))
+        try:
+            while True:
+                bloco = cursor.fetchmany(tamanho_bloco)
+                if not bloco:
+                    break
+                yield bloco
+        finally:
+            cursor.close()
+
+# --- Cargas em lote ---
+
+def _em_lotes(registros, tamanho):
+    """Agrupa um iterável em listas de até `tamanho` itens sem materializá-lo"""
+    lote = []
+    for registro in registros:
+        lote.append(registro)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+@metricas.instrumentar
+def inserir_membros_lote(membros, tamanho_lote=TAMANHO_LOTE):
+    """
+    Insere membros em lote a partir de tuplas
+    (nome, cpf, telefone, endereco, data_cadastro).
+
+    Cada lote é gravado com executemany em uma única transação. Registros
+    sem nome/CPF ou com CPF já cadastrado (no banco ou no próprio lote) não
+    interrompem a carga: voltam na lista de rejeitados como (membro, motivo).
+    Retorna (quantidade_inserida, rejeitados).
+    """
+    inseridos = 0
+    rejeitados = []
+    for lote in _em_lotes(membros, tamanho_lote):
+        gravados, recusados = _gravar_lote_membros(lote)
+        inseridos += gravados
+        rejeitados += recusados
+    return inseridos, rejeitados
+
+@repetir_se_ocupado
+def _gravar_lote_membros(lote):
+    with transacao() as conn:
+        cpfs = json.dumps([m[1] for m in lote])
+        vistos = {row[0] for row in conn.execute(
+            "SELECT CPF FROM Membros WHERE CPF IN (SELECT value FROM json_each(?))", (cpfs,))}
+        validos = []
+        rejeitados = []
+        for membro in lote:
+            if not membro[0] or not membro[1]:
+                rejeitados.append((membro, "Nome e CPF são obrigatórios"))
+            elif membro[1] in vistos:
+                rejeitados.append((membro, "CPF já cadastrado"))
+            else:
+                vistos.add(membro[1])
+                validos.append(membro)
+        conn.executemany("""
+            INSERT INTO Membros (Nome, CPF, Telefone, Endereco, Data_Cadastro)
+            VALUES (?, ?, ?, ?, ?)
+        """, validos)
+    return len(validos), rejeitados
+
+@repetir_se_ocupado
+def _gravar_lote(sql, lote):
+    """Grava um lote numa transação (repetida inteira se o banco estiver bloqueado)"""
+    with transacao() as conn:
+        conn.executemany(sql, lote)
+
+@metricas.instrumentar
+def inserir_treinos_lote(treinos, tamanho_lote=TAMANHO_LOTE):
+    """
+    Insere treinos em lote a partir de tuplas
+    (id_membro, tipo, descricao, duracao, data_inicio). Retorna a quantidade inserida.
+    """
+    inseridos = 0
+    for lote in _em_lotes(treinos, tamanho_lote):
+        _gravar_lote("""
+            INSERT INTO Treinos (ID_Membro, Tipo, Descricao, Duracao, Data_Inicio)
+            VALUES (?, ?, ?, ?, ?)
+        """, lote)
+        inseridos += len(lote)
+    return inseridos
+
+@metricas.instrumentar
+def inserir_pagamentos_lote(pagamentos, tamanho_lote=TAMANHO_LOTE):
+    """
+    Insere pagamentos em lote a partir de tuplas
+    (id_membro, valor, data_pagamento, status). Retorna a quantidade inserida.
+    """
+    inseridos = 0
+    for lote in _em_lotes(pagamentos, tamanho_lote):
+        _gravar_lote("""
+            INSERT INTO Pagamentos (ID_Membro, Valor, Data_Pagamento, Status)
+            VALUES (?, ?, ?, ?)
+        """, lote)
+        inseridos += len(lote)
+    return inseridos
+
+@metricas.instrumentar
+def inserir_atividades_lote(atividades, tamanho_lote=TAMANHO_LOTE):
+    """
+    Insere atividades em lote a partir de tuplas
+    (id_membro, atividade, data, tempo_execucao). Retorna a quantidade inserida.
+    """
+    inseridos = 0
+    for lote in _em_lotes(atividades, tamanho_lote):
+        _gravar_lote("""
+            INSERT INTO Historico_Atividades (ID_Membro, Atividade, Data, Tempo_Execucao)
+            VALUES (?, ?, ?, ?)
+        """, lote)
+        inseridos += len(lote)
+    return inseridos
 
 # --- Telas e menus interativos CLI ---
 
@@ -272,8 +1322,8 @@ def tela_login():
     login = input("Login: ").strip()
     senha = getpass.getpass("Senha: ")
     funcionario = buscar_funcionario_login(login)
-    if funcionario and verificar_senha(senha, funcionario[4]):
-        print(f"Bem-vindo(a) {funcionario[1]}!\n")
+    if funcionario and verificar_senha(senha, funcionario.senha):
+        print(f"Bem-vindo(a) {funcionario.nome}!\n")
         return True
     print("Login inválido.\n")
     return False
@@ -301,7 +1351,7 @@ def menu_membros():
             if membros:
                 print("\nID | Nome | CPF | Telefone")
                 for m in membros:
-                    print(f"{m[0]} | {m[1]} | {m[2]} | {m[3]}")
+                    print(f"{m.id} | {m.nome} | {m.cpf} | {m.telefone}")
             else:
                 print("Nenhum membro cadastrado.")
         elif escolha == '2':
@@ -313,11 +1363,11 @@ def menu_membros():
                 if not membro:
                     print("Membro não encontrado!")
                     continue
-                print(f"Atualizando: {membro[1]} (CPF: {membro[2]})")
-                nome = input(f"Nome [{membro[1]}]: ").strip() or membro[1]
-                cpf = input(f"CPF [{membro[2]}]: ").strip() or membro[2]
-                telefone = input(f"Telefone [{membro[3]}]: ").strip() or membro[3]
-                endereco = input(f"Endereço [{membro[4]}]: ").strip() or membro[4]
+                print(f"Atualizando: {membro.nome} (CPF: {membro.cpf})")
+                nome = input(f"Nome [{membro.nome}]: ").strip() or membro.nome
+                cpf = input(f"CPF [{membro.cpf}]: ").strip() or membro.cpf
+                telefone = input(f"Telefone [{membro.telefone}]: ").strip() or membro.telefone
+                endereco = input(f"Endereço [{membro.endereco}]: ").strip() or membro.endereco
                 atualizar_membro(id_m, nome, cpf, telefone, endereco)
             except ValueError:
                 print("ID inválido.")
@@ -352,7 +1402,7 @@ def tela_gerenciamento_treinos():
                 if treinos:
                     print("\nID | ID_Membro | Tipo | Descrição | Duração(min) | Data Início")
                     for t in treinos:
-                        print(f"{t[0]} | {t[1]} | {t[2]} | {t[3]} | {t[4]} | {t[5]}")
+                        print(f"{t.id} | {t.id_membro} | {t.tipo} | {t.descricao} | {t.duracao} | {t.data_inicio}")
                 else:
                     print("Nenhum treino encontrado.")
             except ValueError:
@@ -374,11 +1424,11 @@ def tela_gerenciamento_treinos():
                 if not treino:
                     print("Treino não encontrado.")
                     continue
-                id_m = int(input(f"ID Membro [{treino[1]}]: ") or treino[1])
-                tipo = input(f"Tipo [{treino[2]}]: ") or treino[2]
-                desc = input(f"Descrição [{treino[3]}]: ") or treino[3]
-                dur = int(input(f"Duração (min) [{treino[4]}]: ") or treino[4])
-                data_inicio = input(f"Data Início [{treino[5]}]: ") or treino[5]
+                id_m = int(input(f"ID Membro [{treino.id_membro}]: ") or treino.id_membro)
+                tipo = input(f"Tipo [{treino.tipo}]: ") or treino.tipo
+                desc = input(f"Descrição [{treino.descricao}]: ") or treino.descricao
+                dur = int(input(f"Duração (min) [{treino.duracao}]: ") or treino.duracao)
+                data_inicio = input(f"Data Início [{treino.data_inicio}]: ") or treino.data_inicio
                 atualizar_treino(id_t, id_m, tipo, desc, dur, data_inicio)
             except ValueError:
                 print("Entrada inválida.")
@@ -411,7 +1461,7 @@ def tela_registro_pagamentos():
                 if pagamentos:
                     print("\nID | ID_Membro | Valor | Data Pagamento | Status")
                     for p in pagamentos:
-                        print(f"{p[0]} | {p[1]} | {p[2]:.2f} | {p[3]} | {p[4]}")
+                        print(f"{p.id} | {p.id_membro} | {p.valor:.2f} | {p.data_pagamento} | {p.status}")
                 else:
                     print("Nenhum pagamento encontrado.")
             except ValueError:
@@ -438,7 +1488,7 @@ def tela_historico_atividades():
         if atividades:
             print("\nID | Atividade | Data | Tempo Execução (min)")
             for a in atividades:
-                print(f"{a[0]} | {a[2]} | {a[3]} | {a[4]}")
+                print(f"{a.id} | {a.atividade} | {a.data} | {a.tempo_execucao}")
         else:
             print("Nenhuma atividade encontrada para esse membro.")
     except ValueError:
@@ -467,21 +1517,21 @@ def menu_principal():
         else:
             print("Opção inválida.")
 
+@repetir_se_ocupado
 def criar_admin_default():
-    """Cria usuário admin padrão se não existir"""
-    admin = buscar_funcionario_login("admin")
-    if not admin:
-        print("Criando usuário administrador padrão (login: admin, senha: admin)")
-        inserir_funcionario("Administrador", "Administrador", "admin", "admin")
+    """Cria usuário admin padrão se não existir (já feito pelas migrações)"""
+    with transacao() as conn:
+        _criar_admin_padrao(conn.cursor())
+    cache_funcionarios.invalidar("admin")
 
 def main():
-    criar_tabelas()
-    criar_admin_default()
+    atualizar_esquema()
 
     if tela_login():
         menu_principal()
     else:
         print("Não foi possível realizar login. Encerrando.")
+    fechar_conexoes()
 
 if __name__ == "__main__":
     main()
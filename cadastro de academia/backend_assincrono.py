@@ -0,0 +1,141 @@
+# coding: utf-8
+
+"""
+Fachada asyncio sobre o backend, para quiosques e daemons de notificação.
+
+Cada função pública do backend tem aqui uma versão `async` com os mesmos
+argumentos. As leituras rodam em paralelo num pool de threads limitado (cada
+thread com a sua conexão; em WAL elas não bloqueiam umas às outras) e as
+gravações numa única thread, na ordem em que foram pedidas.
+
+Cancelar uma chamada que ainda não começou simplesmente a descarta; uma leitura
+já em execução é interrompida no SQLite (conn.interrupt). Gravações já iniciadas
+vão até o fim, como no ExecutorBackend da interface.
+
+Uso:
+    async with BackendAssincrono() as db:
+        membros, pagamentos = await asyncio.gather(
+            db.listar_membros_pagina(), db.listar_pagamentos(id_membro))
+        await db.inserir_atividade(id_membro, "Catraca", agora, 0)
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import backend
+
+LEITURAS = (
+    "listar_membros", "buscar_membro_id", "buscar_membros",
+    "listar_treinos", "buscar_treino_id", "listar_pagamentos",
+    "listar_atividades", "listar_historico_atividades",
+    "listar_membros_pagina", "listar_treinos_pagina", "listar_pagamentos_pagina",
+    "listar_historico_pagina", "contar_historico_atividades", "cursor_historico_posicao",
+    "versao_alteracoes", "alteracoes_desde", "buscar_funcionario_login",
+    "resumo_receita", "resumo_atividades_membro", "resumo_atividades_dia",
+    "buscar_inadimplentes", "listar_inadimplentes", "ids_inadimplentes",
+    "listar_meses_arquivados",
+)
+ESCRITAS = (
+    "inserir_membro", "atualizar_membro", "excluir_membro", "excluir_membros",
+    "inserir_treino", "atualizar_treino", "excluir_treino",
+    "inserir_pagamento", "inserir_atividade", "inserir_funcionario",
+    "reconstruir_resumos", "inserir_membros_lote", "inserir_treinos_lote",
+    "inserir_pagamentos_lote", "inserir_atividades_lote", "atualizar_inadimplentes",
+    "limpar_orfaos", "arquivar_atividades",
+)
+
+
+class _Tarefa:
+    """Conexão em uso por uma chamada, para poder interrompê-la"""
+
+    __slots__ = ("conn", "cancelada")
+
+    def __init__(self):
+        self.conn = None
+        self.cancelada = False
+
+
+class BackendAssincrono:
+    """
+    Executa as funções do backend fora do event loop.
+
+    `leitores` limita as threads de leitura e `limite_pendentes` o total de
+    chamadas em andamento ou na fila; acima disso quem chama espera uma vaga.
+    """
+
+    def __init__(self, leitores=4, limite_pendentes=100):
+        self._leitores = ThreadPoolExecutor(max_workers=leitores, thread_name_prefix="leitura")
+        self._escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="escrita")
+        self._vagas = asyncio.Semaphore(limite_pendentes)
+        self._trava = threading.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.encerrar()
+
+    async def encerrar(self):
+        """Espera as chamadas em andamento e libera as threads"""
+        loop = asyncio.get_running_loop()
+        for pool in (self._leitores, self._escritor):
+            await loop.run_in_executor(None, pool.shutdown)
+
+    def _rodar(self, tarefa, funcao, args, kwargs):
+        conn = backend.obter_conexao()
+        with self._trava:
+            if tarefa.cancelada:
+                return None
+            tarefa.conn = conn
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            with self._trava:
+                tarefa.conn = None
+
+    def _interromper(self, tarefa):
+        with self._trava:
+            tarefa.cancelada = True
+            if tarefa.conn is not None:
+                tarefa.conn.interrupt()
+
+    async def _executar(self, pool, funcao, args, kwargs, interrompivel):
+        async with self._vagas:
+            tarefa = _Tarefa()
+            futuro = asyncio.get_running_loop().run_in_executor(
+                pool, self._rodar, tarefa, funcao, args, kwargs)
+            try:
+                return await futuro
+            except asyncio.CancelledError:
+                if interrompivel:
+                    self._interromper(tarefa)
+                raise
+
+
+def _leitura(nome):
+    funcao = getattr(backend, nome)
+
+    async def chamada(self, *args, **kwargs):
+        return await self._executar(self._leitores, funcao, args, kwargs, interrompivel=True)
+
+    chamada.__name__ = chamada.__qualname__ = nome
+    chamada.__doc__ = f"Versão assíncrona de backend.{nome} (leitura em paralelo)"
+    return chamada
+
+
+def _escrita(nome):
+    funcao = getattr(backend, nome)
+
+    async def chamada(self, *args, **kwargs):
+        return await self._executar(self._escritor, funcao, args, kwargs, interrompivel=False)
+
+    chamada.__name__ = chamada.__qualname__ = nome
+    chamada.__doc__ = f"Versão assíncrona de backend.{nome} (gravações em fila única)"
+    return chamada
+
+
+for _nome in LEITURAS:
+    setattr(BackendAssincrono, _nome, _leitura(_nome))
+for _nome in ESCRITAS:
+    setattr(BackendAssincrono, _nome, _escrita(_nome))
@@ -0,0 +1,120 @@
+# coding: utf-8
+
+"""
+Cache LRU com expiração usado na frente das buscas pontuais do backend.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """
+    Cache limitado a `tamanho` entradas, descartando a menos usada recentemente.
+
+    Entradas com mais de `ttl` segundos são tratadas como ausentes, o que limita
+    quanto tempo uma alteração feita por outro processo pode ficar invisível.
+    Os contadores (acertos, falhas, despejos...) ajudam a dimensionar o cache.
+
+    Uma leitura concorrente com invalidar() ou limpar() não é guardada: o valor
+    carregado pode ser anterior à alteração. Com `em_transacao()` verdadeiro o
+    resultado também não é guardado, pois a transação ainda pode ser desfeita.
+    """
+
+    def __init__(self, tamanho=1024, ttl=300.0, em_transacao=None):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self.em_transacao = em_transacao
+        self._dados = OrderedDict()
+        # Chaves sendo carregadas: chave -> [leitores, geração]. invalidar()
+        # avança a geração; quem carregou numa geração anterior não guarda.
+        self._cargas = {}
+        self._trava = threading.Lock()
+        self.zerar_contadores()
+
+    def zerar_contadores(self):
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+        self.expiracoes = 0
+        self.invalidacoes = 0
+
+    def configurar(self, tamanho=None, ttl=None):
+        with self._trava:
+            if tamanho is not None:
+                self.tamanho = tamanho
+            if ttl is not None:
+                self.ttl = ttl
+            self._despejar()
+
+    def obter(self, chave, carregar):
+        """
+        Devolve o valor em cache para `chave` ou chama `carregar()` e guarda o
+        resultado. Resultados None não são guardados (o registro pode ser criado depois).
+        """
+        agora = time.monotonic()
+        with self._trava:
+            entrada = self._dados.get(chave)
+            if entrada is not None:
+                valor, validade = entrada
+                if validade > agora:
+                    self._dados.move_to_end(chave)
+                    self.acertos += 1
+                    return valor
+                del self._dados[chave]
+                self.expiracoes += 1
+            self.falhas += 1
+            carga = self._cargas.setdefault(chave, [0, 0])
+            carga[0] += 1
+            geracao = carga[1]
+        guardar = False
+        try:
+            valor = carregar()
+            guardar = valor is not None and not (self.em_transacao and self.em_transacao())
+        finally:
+            # Conferir a geração e guardar sob a mesma trava que libera a carga:
+            # um invalidar() depois disso já não encontra a carga, mas também
+            # já encontra o valor guardado para remover
+            with self._trava:
+                carga[0] -= 1
+                if not carga[0]:
+                    del self._cargas[chave]
+                if guardar and carga[1] == geracao:
+                    self._dados[chave] = (valor, time.monotonic() + self.ttl)
+                    self._dados.move_to_end(chave)
+                    self._despejar()
+        return valor
+
+    def _despejar(self):
+        while len(self._dados) > self.tamanho:
+            self._dados.popitem(last=False)
+            self.despejos += 1
+
+    def invalidar(self, chave):
+        with self._trava:
+            if chave in self._cargas:
+                self._cargas[chave][1] += 1
+            if self._dados.pop(chave, None) is not None:
+                self.invalidacoes += 1
+
+    def limpar(self):
+        with self._trava:
+            for carga in self._cargas.values():
+                carga[1] += 1
+            self._dados.clear()
+
+    def estatisticas(self):
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                "tamanho": self.tamanho,
+                "ttl": self.ttl,
+                "entradas": len(self._dados),
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+                "despejos": self.despejos,
+                "expiracoes": self.expiracoes,
+                "invalidacoes": self.invalidacoes,
+            }
@@ -0,0 +1,581 @@
+# coding: utf-8
+
+"""
+Componentes Tkinter reutilizados pelas telas do AcademiaApp.
+"""
+
+import queue
+import sys
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from tkinter import ttk, messagebox
+
+
+class ExecutorBackend:
+    """
+    Executa chamadas do backend fora da thread do Tk.
+
+    As funções rodam numa thread de trabalho (uma só por padrão, o que mantém
+    a ordem das gravações) e os resultados voltam por uma fila consumida com
+    `root.after`, de modo que os callbacks sempre rodam na thread da interface.
+
+    Cada tarefa pertence à "geração" da tela em que foi criada. Ao trocar de tela,
+    `cancelar_pendentes()` cancela as leituras que ainda não começaram e descarta
+    os resultados atrasados; gravações (`cancelavel=False`) sempre são executadas
+    e, se falharem, o erro é mostrado mesmo depois da troca de tela.
+    """
+
+    def __init__(self, root, trabalhadores=1, intervalo=50, ao_mudar_estado=None):
+        self.root = root
+        self.intervalo = intervalo
+        self.ao_mudar_estado = ao_mudar_estado
+        self._pool = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="backend")
+        self._resultados = queue.Queue()
+        self._pendentes = {}
+        self._geracao = 0
+        self._agendado = False
+
+    def executar(self, funcao, *args, ao_concluir=None, ao_falhar=None, cancelavel=True, **kwargs):
+        """Agenda `funcao(*args, **kwargs)`; `ao_concluir(resultado)` roda na thread do Tk"""
+        futuro = self._pool.submit(funcao, *args, **kwargs)
+        self._pendentes[futuro] = (self._geracao, ao_concluir, ao_falhar, cancelavel)
+        futuro.add_done_callback(self._resultados.put)
+        if len(self._pendentes) == 1:
+            self._notificar(True)
+        self._agendar()
+        return futuro
+
+    def cancelar_pendentes(self):
+        """Invalida as tarefas da tela atual (chamado ao trocar de tela)"""
+        self._geracao += 1
+        for futuro, (_, _, _, cancelavel) in list(self._pendentes.items()):
+            if cancelavel:
+                futuro.cancel()
+
+    def ocupado(self):
+        return bool(self._pendentes)
+
+    def encerrar(self):
+        """Espera as tarefas em andamento (inclusive gravações) e libera a thread"""
+        self.cancelar_pendentes()
+        self._pool.shutdown(wait=True)
+
+    def _agendar(self):
+        if not self._agendado:
+            self._agendado = True
+            self.root.after(self.intervalo, self._processar)
+
+    def _processar(self):
+        self._agendado = False
+        try:
+            while True:
+                try:
+                    futuro = self._resultados.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    self._entregar(futuro, *self._pendentes.pop(futuro))
+                except Exception:
+                    # Um callback com erro não impede a entrega dos demais
+                    self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            if self._pendentes:
+                self._agendar()
+            else:
+                self._notificar(False)
+
+    def _entregar(self, futuro, geracao, ao_concluir, ao_falhar, cancelavel):
+        if futuro.cancelled():
+            return
+        erro = futuro.exception()
+        atrasada = geracao != self._geracao
+        if erro is not None:
+            # Falha de gravação é mostrada mesmo depois de trocar de tela
+            if atrasada and cancelavel:
+                return
+            if ao_falhar:
+                ao_falhar(erro)
+            else:
+                messagebox.showerror("Erro", f"Falha ao acessar o banco de dados:\n{erro}")
+        elif ao_concluir and not atrasada:
+            ao_concluir(futuro.result())
+
+    def _notificar(self, ocupado):
+        if self.ao_mudar_estado:
+            self.ao_mudar_estado(ocupado)
+
+
+class PaginadorTreeview:
+    """
+    Liga uma ttk.Treeview a uma listagem paginada do backend.
+
+    `funcao_pagina(apos=..., antes=..., limite=..., ordem=..., descendente=...)`
+    deve devolver um backend.Pagina. Os botões Anterior/Próxima navegam pelos
+    cursores da página atual e um clique no cabeçalho de uma coluna listada em
+    `colunas_ordenacao` (coluna da Treeview -> coluna do banco) reordena no banco.
+    Com um `executor`, as buscas rodam fora da thread do Tk.
+
+    Os itens da Treeview usam o ID do registro como iid. Com `funcao_versao()` e
+    `funcao_alteracoes(versao)` (que devolve um backend.Delta), `atualizar()`
+    busca só o que mudou desde a última leitura e mexe apenas nos itens afetados,
+    preservando seleção e rolagem; `intervalo_atualizacao` (ms) repete isso
+    periodicamente enquanto a tela estiver aberta.
+
+    `funcao_tags(linha)`, se informada, devolve as tags de cada item (para
+    destacá-lo com tree.tag_configure); `atualizar_tags()` a reaplica nos itens
+    exibidos sem buscar nada no banco.
+    """
+
+    def __init__(self, master, tree, funcao_pagina, colunas_ordenacao, ordem, descendente=False, limite=50,
+                 executor=None, funcao_versao=None, funcao_alteracoes=None, intervalo_atualizacao=None,
+                 funcao_tags=None):
+        self.tree = tree
+        self.funcao_tags = funcao_tags
+        self.executor = executor
+        self.funcao_pagina = funcao_pagina
+        self.funcao_versao = funcao_versao
+        self.funcao_alteracoes = funcao_alteracoes
+        self.colunas_ordenacao = colunas_ordenacao
+        self.ordem = ordem
+        self.descendente = descendente
+        self.limite = limite
+        self.pagina = None
+        self.versao = None
+        self.numero = 1
+        self._ultima_busca = {}
+        self._linhas = {}
+        self._em_busca = False
+        self._agendamento = None
+
+        self.frame = tk.Frame(master)
+        self.botao_anterior = tk.Button(self.frame, text="< Anterior", command=self.anterior)
+        self.botao_proxima = tk.Button(self.frame, text="Próxima >", command=self.proxima)
+        self.label = tk.Label(self.frame)
+        self.botao_anterior.grid(row=0, column=0, padx=5)
+        self.label.grid(row=0, column=1, padx=5)
+        self.botao_proxima.grid(row=0, column=2, padx=5)
+
+        for coluna in colunas_ordenacao:
+            tree.heading(coluna, command=lambda c=coluna: self.ordenar(c))
+
+        if intervalo_atualizacao and funcao_alteracoes:
+            self.frame.bind("<Destroy>", lambda _: self._parar_atualizacao())
+            self._agendar_atualizacao(intervalo_atualizacao)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def _carregar(self, apos=None, antes=None):
+        busca = dict(apos=apos, antes=antes, limite=self.limite,
+                     ordem=self.ordem, descendente=self.descendente)
+        self._ultima_busca = busca
+        if self.executor:
+            self.label.config(text="Carregando...")
+            self.executor.executar(self._buscar_pagina, busca, ao_concluir=self._exibir)
+        else:
+            self._exibir(self._buscar_pagina(busca))
+
+    def _buscar_pagina(self, busca):
+        # A versão é lida antes da página: o que mudar entre as duas leituras
+        # volta no próximo Delta e é reaplicado sem efeito colateral
+        versao = self.funcao_versao() if self.funcao_versao else None
+        return versao, self.funcao_pagina(**busca)
+
+    def _exibir(self, resultado):
+        self.versao, self.pagina = resultado
+        self._em_busca = False
+        self._sincronizar(self.pagina.linhas)
+        self.label.config(text=f"Página {self.numero}")
+        self.botao_anterior.config(state=tk.NORMAL if self.pagina.tem_anterior else tk.DISABLED)
+        self.botao_proxima.config(state=tk.NORMAL if self.pagina.tem_proxima else tk.DISABLED)
+
+    def _sincronizar(self, linhas):
+        """Deixa a Treeview com `linhas`, nessa ordem, mexendo só nos itens que mudaram"""
+        novas = {str(linha.id): linha for linha in linhas}
+        sobrando = [iid for iid in self._linhas if iid not in novas]
+        if sobrando:
+            self.tree.delete(*sobrando)
+        ordem_atual = [iid for iid in self.tree.get_children() if iid in novas]
+        for posicao, (iid, linha) in enumerate(novas.items()):
+            if iid not in self._linhas:
+                self.tree.insert('', posicao, iid=iid, values=linha, tags=self._tags(linha))
+                ordem_atual.insert(posicao, iid)
+                continue
+            if self._linhas[iid] != linha:
+                self.tree.item(iid, values=linha, tags=self._tags(linha))
+            if ordem_atual[posicao] != iid:
+                self.tree.move(iid, '', posicao)
+                ordem_atual.remove(iid)
+                ordem_atual.insert(posicao, iid)
+        self._linhas = novas
+
+    def _tags(self, linha):
+        return self.funcao_tags(linha) if self.funcao_tags else ()
+
+    def atualizar_tags(self):
+        """Recalcula as tags dos itens exibidos (ex.: depois de mudar o que se destaca)"""
+        for iid, linha in self._linhas.items():
+            self.tree.item(iid, tags=self._tags(linha))
+
+    def mostrar_linhas(self, linhas, texto):
+        """Exibe linhas vindas de fora da paginação (ex.: resultado de busca)"""
+        self._em_busca = True
+        self._sincronizar(linhas)
+        self.label.config(text=texto)
+        self.botao_anterior.config(state=tk.DISABLED)
+        self.botao_proxima.config(state=tk.DISABLED)
+
+    def primeira(self):
+        self.numero = 1
+        self._carregar()
+
+    def recarregar(self):
+        """Repete a última busca, mantendo o usuário na mesma página"""
+        if not self._ultima_busca:
+            return self.primeira()
+        self._carregar(self._ultima_busca["apos"], self._ultima_busca["antes"])
+
+    def atualizar(self):
+        """Aplica só as alterações feitas desde a última leitura (ou recarrega, sem versões)"""
+        if self.funcao_alteracoes is None or self.versao is None:
+            if not self._em_busca:
+                self.recarregar()
+            return
+        if self.executor:
+            self.executor.executar(self.funcao_alteracoes, self.versao, ao_concluir=self.aplicar_alteracoes)
+        else:
+            self.aplicar_alteracoes(self.funcao_alteracoes(self.versao))
+
+    def aplicar_alteracoes(self, delta):
+        """
+        Atualiza, insere ou remove os itens afetados por um backend.Delta.
+
+        Linhas novas só entram se sua chave de ordenação cair dentro da página
+        exibida; no resultado de uma busca, só os itens já exibidos mudam.
+        """
+        if self.versao is None or delta.versao <= self.versao:
+            return
+        self.versao = delta.versao
+        linhas = dict(self._linhas)
+        for id_registro in delta.excluidos:
+            linhas.pop(str(id_registro), None)
+        for linha in delta.linhas:
+            iid = str(linha.id)
+            if self._em_busca:
+                if iid in linhas:
+                    linhas[iid] = linha
+            elif self._cabe_na_pagina(linha):
+                linhas[iid] = linha
+            else:
+                linhas.pop(iid, None)
+        linhas = list(linhas.values())
+        if not self._em_busca:
+            linhas.sort(key=self._chave, reverse=self.descendente)
+        self._sincronizar(linhas)
+
+    def _chave(self, linha):
+        # Mesma chave (ordem, ID) dos cursores do backend; NULL ordena antes de tudo
+        valor = getattr(linha, self.ordem.lower())
+        return ("" if valor is None else valor, linha.id)
+
+    def _cabe_na_pagina(self, linha):
+        pagina = self.pagina
+        if pagina is None:
+            return False
+        if not pagina.linhas:
+            return not pagina.tem_anterior and not pagina.tem_proxima
+        chave = self._chave(linha)
+        inicio = self._chave(pagina.linhas[0])
+        fim = self._chave(pagina.linhas[-1])
+        if self.descendente:
+            antes, depois = chave > inicio, chave < fim
+        else:
+            antes, depois = chave < inicio, chave > fim
+        return not (antes and pagina.tem_anterior) and not (depois and pagina.tem_proxima)
+
+    def _agendar_atualizacao(self, intervalo):
+        def repetir():
+            # Não empilha leituras enquanto o executor ainda está trabalhando
+            if not (self.executor and self.executor.ocupado()):
+                self.atualizar()
+            self._agendar_atualizacao(intervalo)
+        self._agendamento = self.frame.after(intervalo, repetir)
+
+    def _parar_atualizacao(self):
+        if self._agendamento is not None:
+            self.frame.after_cancel(self._agendamento)
+            self._agendamento = None
+
+    def proxima(self):
+        if self.pagina and self.pagina.tem_proxima and self.pagina.cursor_fim:
+            self.numero += 1
+            self._carregar(apos=self.pagina.cursor_fim)
+
+    def anterior(self):
+        if self.pagina and self.pagina.tem_anterior and self.pagina.cursor_inicio:
+            self.numero = max(1, self.numero - 1)
+            if self.numero == 1:
+                self._carregar()
+            else:
+                self._carregar(antes=self.pagina.cursor_inicio)
+
+    def ordenar(self, coluna):
+        """Ordena pela coluna clicada; um segundo clique inverte a direção"""
+        ordem = self.colunas_ordenacao[coluna]
+        if ordem == self.ordem:
+            self.descendente = not self.descendente
+        else:
+            self.ordem, self.descendente = ordem, False
+        self.primeira()
+
+
+class BuscaIncremental:
+    """
+    Campo de busca que consulta o backend enquanto o usuário digita.
+
+    Cada tecla reinicia um atraso de `atraso` ms; só quando a digitação pausa
+    `funcao_busca(texto, limite)` é chamada. Respostas de textos já superados
+    são descartadas. Com o campo vazio, `ao_limpar()` volta à listagem normal.
+    """
+
+    def __init__(self, master, root, funcao_busca, ao_resultado, ao_limpar,
+                 executor=None, atraso=250, limite=50):
+        self.root = root
+        self.funcao_busca = funcao_busca
+        self.ao_resultado = ao_resultado
+        self.ao_limpar = ao_limpar
+        self.executor = executor
+        self.atraso = atraso
+        self.limite = limite
+        self._agendamento = None
+        self._sequencia = 0
+
+        self.frame = tk.Frame(master)
+        tk.Label(self.frame, text="Buscar").pack(side=tk.LEFT)
+        self.variavel = tk.StringVar(self.frame)
+        self.entry = tk.Entry(self.frame, textvariable=self.variavel, width=40)
+        self.entry.pack(side=tk.LEFT, padx=5)
+        self.variavel.trace_add("write", lambda *_: self._agendar())
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def texto(self):
+        return self.variavel.get().strip()
+
+    def _agendar(self):
+        if self._agendamento is not None:
+            self.root.after_cancel(self._agendamento)
+        self._agendamento = self.root.after(self.atraso, self.buscar)
+
+    def buscar(self):
+        """Executa a busca do texto atual imediatamente"""
+        self._agendamento = None
+        self._sequencia += 1
+        texto = self.texto()
+        if not texto:
+            self.ao_limpar()
+            return
+        sequencia = self._sequencia
+        if self.executor:
+            self.executor.executar(self.funcao_busca, texto, self.limite,
+                                   ao_concluir=lambda linhas: self._receber(sequencia, texto, linhas))
+        else:
+            self._receber(sequencia, texto, self.funcao_busca(texto, self.limite))
+
+    def _receber(self, sequencia, texto, linhas):
+        if sequencia == self._sequencia:
+            self.ao_resultado(texto, linhas)
+
+
+class TreeviewVirtual:
+    """
+    Treeview que exibe uma listagem arbitrariamente grande mantendo em memória
+    só a janela visível mais uma margem de pré-carga de cada lado.
+
+    A Treeview tem sempre `altura` itens, cujos valores são trocados conforme o
+    usuário rola; as linhas vêm do backend sob demanda:
+
+    - `funcao_pagina(apos=..., antes=..., limite=...)` devolve um backend.Pagina;
+    - `funcao_total()` devolve o total de linhas (tamanho da barra de rolagem);
+    - `funcao_cursor(posicao)` devolve a chave da linha numa posição absoluta,
+      usada quando o usuário arrasta a barra para longe da janela carregada.
+      Posição absoluta exige contar as linhas anteriores (OFFSET), então cada
+      salto custa proporcional à posição; a rolagem a partir do buffer segue
+      pelas chaves e não depende dela;
+    - `chave(linha)` extrai de uma linha o cursor (valor_ordem, ID).
+
+    Com um `executor`, as buscas rodam fora da thread do Tk (uma por vez) e as
+    linhas ainda não carregadas aparecem vazias até a resposta chegar.
+    """
+
+    def __init__(self, master, colunas, funcao_pagina, funcao_total, funcao_cursor, chave,
+                 altura=20, margem=None, executor=None):
+        self.funcao_pagina = funcao_pagina
+        self.funcao_total = funcao_total
+        self.funcao_cursor = funcao_cursor
+        self.chave = chave
+        self.altura = altura
+        self.margem = margem or altura * 2
+        self.executor = executor
+        self.total = 0
+        self.posicao = 0
+        self.buffer = []
+        self.buffer_inicio = 0
+        self._buscando = False
+
+        self.frame = tk.Frame(master)
+        self.tree = ttk.Treeview(self.frame, columns=colunas, show='headings', height=altura)
+        for col in colunas:
+            self.tree.heading(col, text=col)
+        self.scrollbar = tk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self._comando_scrollbar)
+        self.tree.pack(side=tk.LEFT)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<MouseWheel>", lambda e: self.rolar(-1 if e.delta > 0 else 1) or "break")
+        self.tree.bind("<Button-4>", lambda e: self.rolar(-1) or "break")
+        self.tree.bind("<Button-5>", lambda e: self.rolar(1) or "break")
+        self.tree.bind("<Prior>", lambda e: self.rolar(-self.altura) or "break")
+        self.tree.bind("<Next>", lambda e: self.rolar(self.altura) or "break")
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def recarregar(self):
+        """Relê o total e a janela atual (após gravações no banco)"""
+        self._executar(("total",))
+
+    def rolar(self, linhas):
+        self.ir_para(self.posicao + linhas)
+
+    def ir_para(self, posicao):
+        self.posicao = max(0, min(posicao, self.total - self.altura))
+        self._exibir()
+        self._buscar_faltantes()
+
+    def _comando_scrollbar(self, acao, valor, unidade=None):
+        if acao == "moveto":
+            self.ir_para(int(float(valor) * self.total))
+        elif acao == "scroll":
+            passo = self.altura if unidade == "pages" else 1
+            self.rolar(int(valor) * passo)
+
+    def _janela(self):
+        inicio = max(0, self.posicao - self.margem)
+        fim = min(self.total, self.posicao + self.altura + self.margem)
+        return inicio, fim
+
+    def _proximo_pedido(self):
+        """
+        Decide qual trecho falta para cobrir a janela visível mais a margem.
+
+        Perto das bordas do buffer, pede só o trecho que falta a partir da chave
+        da linha da borda; saltos maiores (barra de rolagem) recarregam o buffer.
+        """
+        inicio, fim = self._janela()
+        buffer_fim = self.buffer_inicio + len(self.buffer)
+        if fim <= inicio:
+            return None
+        if not self.buffer or inicio > buffer_fim or fim < self.buffer_inicio:
+            return ("salto", inicio, fim - inicio)
+        if fim > buffer_fim and self.posicao + self.altura + self.margem // 2 > buffer_fim:
+            return ("apos", self.chave(self.buffer[-1]), fim - buffer_fim)
+        if inicio < self.buffer_inicio and self.posicao - self.margem // 2 < self.buffer_inicio:
+            return ("antes", self.chave(self.buffer[0]), self.buffer_inicio - inicio)
+        return None
+
+    def _buscar(self, pedido):
+        """Executa um pedido no backend (pode rodar na thread de trabalho)"""
+        tipo = pedido[0]
+        if tipo == "total":
+            return self.funcao_total()
+        if tipo == "salto":
+            _, inicio, limite = pedido
+            apos = self.funcao_cursor(inicio - 1) if inicio > 0 else None
+            return self.funcao_pagina(apos=apos, limite=limite).linhas
+        if tipo == "apos":
+            return self.funcao_pagina(apos=pedido[1], limite=pedido[2]).linhas
+        return self.funcao_pagina(antes=pedido[1], limite=pedido[2]).linhas
+
+    def _aplicar(self, pedido, resultado):
+        tipo = pedido[0]
+        if tipo == "total":
+            self.total = resultado
+            self.buffer = []
+            self.posicao = max(0, min(self.posicao, self.total - self.altura))
+        elif tipo == "salto":
+            self.buffer = list(resultado)
+            self.buffer_inicio = pedido[1]
+            if len(resultado) < pedido[2]:
+                self.total = self.buffer_inicio + len(resultado)
+        elif tipo == "apos":
+            self.buffer.extend(resultado)
+            if len(resultado) < pedido[2]:
+                self.total = self.buffer_inicio + len(self.buffer)
+        else:
+            self.buffer[:0] = resultado
+            self.buffer_inicio -= len(resultado)
+            if len(resultado) < pedido[2] and self.buffer_inicio:
+                # O início da lista chegou antes do esperado (linhas excluídas
+                # acima): a primeira linha do buffer é a posição 0 e as posições
+                # e o total andam junto, mantendo as mesmas linhas na tela
+                deslocamento = self.buffer_inicio
+                self.buffer_inicio = 0
+                self.posicao = max(0, self.posicao - deslocamento)
+                self.total = max(len(self.buffer), self.total - deslocamento)
+        self.posicao = max(0, min(self.posicao, self.total - self.altura))
+
+        # Descarta o que saiu da janela + margem, mantendo a memória constante
+        inicio, fim = self._janela()
+        if self.buffer_inicio < inicio:
+            del self.buffer[:inicio - self.buffer_inicio]
+            self.buffer_inicio = inicio
+        del self.buffer[max(0, fim - self.buffer_inicio):]
+
+    def _executar(self, pedido):
+        if self.executor:
+            self._buscando = True
+            self.executor.executar(self._buscar, pedido, ao_concluir=partial(self._receber, pedido),
+                                   ao_falhar=self._falhou)
+        else:
+            self._aplicar(pedido, self._buscar(pedido))
+            self._exibir()
+            self._buscar_faltantes()
+
+    def _receber(self, pedido, resultado):
+        self._buscando = False
+        self._aplicar(pedido, resultado)
+        self._exibir()
+        self._buscar_faltantes()
+
+    def _falhou(self, erro):
+        self._buscando = False
+        messagebox.showerror("Erro", f"Falha ao carregar o histórico:\n{erro}")
+
+    def _buscar_faltantes(self):
+        if not self._buscando:
+            pedido = self._proximo_pedido()
+            if pedido:
+                self._executar(pedido)
+
+    def _exibir(self):
+        deslocamento = self.posicao - self.buffer_inicio
+        visiveis = self.buffer[max(0, deslocamento):max(0, deslocamento + self.altura)]
+        if deslocamento < 0:
+            visiveis = [()] * min(-deslocamento, self.altura) + visiveis
+        quantidade = min(self.altura, max(0, self.total - self.posicao))
+        visiveis = (visiveis + [()] * quantidade)[:quantidade]
+        itens = self.tree.get_children()
+        for i, linha in enumerate(visiveis):
+            if i < len(itens):
+                self.tree.item(itens[i], values=linha)
+            else:
+                self.tree.insert('', 'end', values=linha)
+        if len(itens) > len(visiveis):
+            self.tree.delete(*itens[len(visiveis):])
+        if self.total:
+            self.scrollbar.set(self.posicao / self.total,
+                               min(1.0, (self.posicao + self.altura) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
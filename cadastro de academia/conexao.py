@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+import functools
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Pragmas aplicados uma única vez em cada conexão aberta pelo gerenciador.
+# O WAL exige que todos os processos estejam na mesma máquina (memória
+# compartilhada); com o banco numa pasta de rede use ACADEMIA_JOURNAL_MODE=DELETE.
+PRAGMAS_PADRAO = {
+    "journal_mode": os.environ.get("ACADEMIA_JOURNAL_MODE", "WAL"),
+    "synchronous": "NORMAL",
+    "cache_size": -20000,        # ~20 MB de cache de páginas
+    "mmap_size": 268435456,      # 256 MB mapeados em memória
+    "temp_store": "MEMORY",
+}
+
+# Quantidade de comandos preparados mantidos em cache por conexão
+CACHE_COMANDOS = 256
+
+# Segundos que o SQLite espera por um bloqueio de outra conexão antes de desistir
+ESPERA_BLOQUEIO = float(os.environ.get("ACADEMIA_ESPERA_BLOQUEIO", 5))
+# Novas tentativas de uma transação que ainda assim falhou por bloqueio, e a
+# espera base (segundos) entre elas, dobrada a cada tentativa
+TENTATIVAS_BLOQUEIO = 5
+ESPERA_BASE_BLOQUEIO = 0.05
+
+# Códigos primários SQLITE_BUSY e SQLITE_LOCKED
+_CODIGOS_BLOQUEIO = (5, 6)
+
+# Bancos anexados (ATTACH) mantidos por conexão; o SQLite aceita no máximo 10
+LIMITE_ANEXOS = 8
+
+
+class GerenciadorConexoes:
+    """
+    Mantém uma conexão persistente por thread com o banco de dados.
+
+    As conexões são abertas sob demanda, configuradas com os pragmas
+    informados e reaproveitadas em todas as chamadas do backend.
+    `ao_abrir(conn)`, se informado, é chamado para cada conexão nova. Com
+    `uri`, o caminho (e os de anexar) pode ser uma URI "file:...?mode=ro".
+    """
+
+    def __init__(self, caminho, pragmas=None, cache_comandos=CACHE_COMANDOS, ao_abrir=None,
+                 limite_anexos=LIMITE_ANEXOS, espera=ESPERA_BLOQUEIO, uri=False):
+        self.caminho = caminho
+        self.uri = uri
+        self.espera = espera
+        self.pragmas = dict(PRAGMAS_PADRAO if pragmas is None else pragmas)
+        self.cache_comandos = cache_comandos
+        self.ao_abrir = ao_abrir
+        self.limite_anexos = limite_anexos
+        self._local = threading.local()
+        self._conexoes = []
+        self._trava = threading.Lock()
+
+    def _abrir(self):
+        conn = sqlite3.connect(
+            self.caminho,
+            isolation_level=None,  # transações controladas por transacao()
+            timeout=self.espera,
+            check_same_thread=False,
+            cached_statements=self.cache_comandos,
+            uri=self.uri,
+        )
+        for nome, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nome} = {valor}")
+        if self.ao_abrir:
+            self.ao_abrir(conn)
+        with self._trava:
+            self._conexoes.append(conn)
+        return conn
+
+    def conexao(self):
+        """Retorna a conexão da thread atual, abrindo-a se necessário"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._abrir()
+            self._local.conn = conn
+            self._local.profundidade = 0
+            self._local.anexos = OrderedDict()
+        return conn
+
+    def anexar(self, caminho, nome):
+        """
+        Anexa o banco `caminho` como `nome` na conexão da thread atual, se ainda
+        não estiver anexado, e retorna a conexão. Acima de `limite_anexos` o
+        anexo usado há mais tempo é desanexado. Como o próprio ATTACH, anexar
+        um banco novo só é possível fora de transação.
+        """
+        conn = self.conexao()
+        anexos = self._local.anexos
+        if nome in anexos:
+            anexos.move_to_end(nome)
+            return conn
+        while len(anexos) >= self.limite_anexos:
+            antigo, _ = anexos.popitem(last=False)
+            conn.execute(f"DETACH DATABASE {antigo}")
+        conn.execute(f"ATTACH DATABASE ? AS {nome}", (caminho,))
+        anexos[nome] = caminho
+        return conn
+
+    def desanexar(self, nome):
+        """Desanexa `nome` da conexão da thread atual, se estiver anexado"""
+        conn = self.conexao()
+        if self._local.anexos.pop(nome, None) is not None:
+            conn.execute(f"DETACH DATABASE {nome}")
+
+    @contextmanager
+    def transacao(self, imediata=False):
+        """
+        Abre uma transação explícita na conexão da thread atual.
+
+        Blocos aninhados viram SAVEPOINTs, de modo que várias chamadas do
+        backend podem compartilhar um único commit. `imediata` usa BEGIN
+        IMMEDIATE, que reserva a escrita já no início (só vale no nível externo).
+        """
+        conn = self.conexao()
+        nivel = self._local.profundidade
+        if nivel == 0:
+            conn.execute("BEGIN IMMEDIATE" if imediata else "BEGIN")
+        else:
+            conn.execute(f"SAVEPOINT sp_{nivel}")
+        self._local.profundidade = nivel + 1
+        try:
+            yield conn
+        except BaseException:
+            if nivel == 0:
+                conn.execute("ROLLBACK")
+            else:
+                conn.execute(f"ROLLBACK TO sp_{nivel}")
+                conn.execute(f"RELEASE sp_{nivel}")
+            raise
+        else:
+            if nivel == 0:
+                try:
+                    conn.execute("COMMIT")
+                except BaseException:
+                    # Um COMMIT que falha (ex.: bloqueado) deixa a transação aberta
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+            else:
+                conn.execute(f"RELEASE sp_{nivel}")
+        finally:
+            self._local.profundidade = nivel
+
+    def em_transacao(self):
+        """Indica se a thread atual está dentro de transacao()"""
+        return getattr(self._local, "profundidade", 0) > 0
+
+    def fechar(self):
+        """Fecha todas as conexões abertas pelo gerenciador"""
+        with self._trava:
+            conexoes, self._conexoes = self._conexoes, []
+        for conn in conexoes:
+            conn.close()
+        self._local = threading.local()
+
+
+def bloqueio_transitorio(erro):
+    """Indica se o erro é um bloqueio de outra conexão, que pode passar repetindo"""
+    if not isinstance(erro, sqlite3.OperationalError):
+        return False
+    codigo = getattr(erro, "sqlite_errorcode", None)
+    if codigo is not None:
+        return codigo & 0xFF in _CODIGOS_BLOQUEIO
+    mensagem = str(erro)
+    return "locked" in mensagem or "busy" in mensagem
+
+
+class ContadorBloqueios:
+    """Quantas vezes as transações foram repetidas ou desistiram por bloqueio"""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.repeticoes = 0
+        self.desistencias = 0
+
+    def contar(self, desistiu):
+        with self._trava:
+            if desistiu:
+                self.desistencias += 1
+            else:
+                self.repeticoes += 1
+
+
+def repetir_em_bloqueio(em_transacao, tentativas=TENTATIVAS_BLOQUEIO, espera_base=ESPERA_BASE_BLOQUEIO,
+                        contador=None):
+    """
+    Decorador que reexecuta a função quando ela falha por bloqueio do banco,
+    esperando um tempo aleatório entre 0 e espera_base * 2^tentativa (o sorteio
+    evita que os terminais que colidiram tentem de novo ao mesmo tempo).
+
+    A função deve gravar só dentro das próprias transações. Se `em_transacao()`
+    indicar uma transação externa, o erro sobe sem repetição: o que foi feito
+    antes dela também foi desfeito e só quem a abriu pode refazer tudo.
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def chamada(*args, **kwargs):
+            tentativa = 0
+            while True:
+                try:
+                    return funcao(*args, **kwargs)
+                except sqlite3.OperationalError as erro:
+                    if not bloqueio_transitorio(erro) or em_transacao():
+                        raise
+                    desistiu = tentativa >= tentativas
+                    if contador is not None:
+                        contador.contar(desistiu)
+                    if desistiu:
+                        raise
+                time.sleep(random.uniform(0, espera_base * 2 ** tentativa))
+                tentativa += 1
+        return chamada
+    return decorador
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Gerador de dados sintéticos e medição de desempenho das funções do backend.
+
+O banco é criado num diretório temporário (nunca o academia.db) e preenchido
+a partir de uma semente fixa: duas execuções com os mesmos parâmetros medem o
+mesmo banco e as mesmas chamadas. Os tempos são gravados em JSON, para comparar
+o resultado de commits diferentes.
+
+Uso:
+    python desempenho.py --escala media --saida antes.json
+    python desempenho.py --escala media --saida depois.json --comparar antes.json
+    python desempenho.py --escala completa --banco /tmp/grande.db   # gera uma vez e reaproveita
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+import backend
+
+# Volumes de cada escala: membros, treinos, pagamentos e atividades
+ESCALAS = {
+    "pequena": dict(membros=1_000, treinos=10_000, pagamentos=10_000, atividades=100_000),
+    "media": dict(membros=10_000, treinos=100_000, pagamentos=100_000, atividades=1_000_000),
+    "completa": dict(membros=100_000, treinos=1_000_000, pagamentos=1_000_000, atividades=10_000_000),
+}
+TAMANHO_LOTE_GERACAO = 10_000
+# Funções que leem a tabela inteira rodam no máximo esta quantidade de vezes
+REPETICOES_PESADAS = 3
+
+NOMES = ("Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela",
+         "João", "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Thiago",
+         "Vitória", "William")
+SOBRENOMES = ("Almeida", "Barbosa", "Cardoso", "Costa", "Ferreira", "Gomes", "Lima", "Martins",
+              "Oliveira", "Pereira", "Ribeiro", "Rodrigues", "Santos", "Silva", "Souza")
+RUAS = ("Rua das Flores", "Av. Brasil", "Rua São João", "Av. Paulista", "Rua XV de Novembro",
+        "Rua Sete de Setembro", "Av. Getúlio Vargas", "Rua Amazonas")
+TIPOS_TREINO = ("Musculação", "Funcional", "Cardio", "Hipertrofia", "Resistência", "Mobilidade")
+ATIVIDADES = ("Esteira", "Bicicleta", "Supino", "Agachamento", "Leg press", "Remada", "Alongamento",
+              "Catraca")
+VALORES = (89.9, 119.9, 149.9, 199.9)
+STATUS = ("Pago", "Pendente", "Atrasado")
+PESOS_STATUS = (85, 10, 5)
+INICIO_DADOS = datetime.date(2022, 1, 1)
+DIAS_DADOS = 3 * 365
+
+
+def _data(rnd):
+    return (INICIO_DADOS + datetime.timedelta(days=rnd.randrange(DIAS_DADOS))).isoformat()
+
+
+def _nome(rnd):
+    return f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}"
+
+
+def _cpf(numero):
+    # Multiplicar por um primo espalha os números sem repetir (mod 10^11)
+    digitos = f"{numero * 7919 % 10 ** 11:011d}"
+    return f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"
+
+
+def _telefone(rnd):
+    return f"({rnd.randint(11, 99)}) 9{rnd.randint(1000, 9999)}-{rnd.randint(1000, 9999)}"
+
+
+def gerar_membros(rnd, quantidade):
+    for numero in range(1, quantidade + 1):
+        yield (_nome(rnd), _cpf(numero), _telefone(rnd),
+               f"{rnd.choice(RUAS)}, {rnd.randint(1, 3000)}", _data(rnd))
+
+
+def gerar_treinos(rnd, quantidade, membros):
+    for _ in range(quantidade):
+        tipo = rnd.choice(TIPOS_TREINO)
+        yield (rnd.randint(1, membros), tipo, f"Treino de {tipo.lower()} nível {rnd.randint(1, 5)}",
+               rnd.choice((30, 45, 60, 90)), _data(rnd))
+
+
+def gerar_pagamentos(rnd, quantidade, membros):
+    for _ in range(quantidade):
+        yield (rnd.randint(1, membros), rnd.choice(VALORES), _data(rnd),
+               rnd.choices(STATUS, PESOS_STATUS)[0])
+
+
+def gerar_atividades(rnd, quantidade, membros):
+    for _ in range(quantidade):
+        yield (rnd.randint(1, membros), rnd.choice(ATIVIDADES),
+               f"{_data(rnd)} {rnd.randint(6, 22):02d}:{rnd.randrange(60):02d}", rnd.randint(5, 90))
+
+
+def gerar_banco(volumes, semente, tamanho_lote=TAMANHO_LOTE_GERACAO):
+    """
+    Preenche o banco configurado com os volumes pedidos. Cada tabela usa um
+    gerador próprio, então mudar o volume de uma não altera os dados das outras.
+    Retorna o tempo (s) gasto em cada tabela.
+    """
+    def rnd(tabela):
+        return random.Random(f"{semente}-{tabela}")
+
+    membros = volumes["membros"]
+    cargas = (
+        ("membros", lambda: backend.inserir_membros_lote(gerar_membros(rnd("membros"), membros), tamanho_lote)),
+        ("treinos", lambda: backend.inserir_treinos_lote(
+            gerar_treinos(rnd("treinos"), volumes["treinos"], membros), tamanho_lote)),
+        ("pagamentos", lambda: backend.inserir_pagamentos_lote(
+            gerar_pagamentos(rnd("pagamentos"), volumes["pagamentos"], membros), tamanho_lote)),
+        ("atividades", lambda: backend.inserir_atividades_lote(
+            gerar_atividades(rnd("atividades"), volumes["atividades"], membros), tamanho_lote)),
+    )
+    tempos = {}
+    for tabela, carregar in cargas:
+        inicio = time.perf_counter()
+        carregar()
+        tempos[tabela] = time.perf_counter() - inicio
+        print(f"  {tabela}: {volumes[tabela]} linhas em {tempos[tabela]:.1f} s")
+    return tempos
+
+
+def contar_linhas():
+    conn = backend.obter_conexao()
+    return {chave: conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+            for chave, tabela in (("membros", "Membros"), ("treinos", "Treinos"),
+                                  ("pagamentos", "Pagamentos"), ("atividades", "Historico_Atividades"))}
+
+
+# Cada caso sorteia seus argumentos com `argumentos(rnd, volumes)` fora da medição
+Caso = namedtuple("Caso", "nome funcao argumentos pesado")
+
+
+def _membro(rnd, v):
+    return rnd.randint(1, v["membros"])
+
+
+def _cpf_novo(rnd):
+    return f"N{rnd.getrandbits(48):015d}"
+
+
+CASOS = [
+    # Leituras
+    Caso("buscar_membro_id", backend.buscar_membro_id, lambda r, v: (_membro(r, v),), False),
+    Caso("buscar_membros (texto)", backend.buscar_membros, lambda r, v: (r.choice(SOBRENOMES)[:5],), False),
+    Caso("buscar_membros (prefixo)", backend.buscar_membros, lambda r, v: (r.choice(NOMES)[:2],), False),
+    Caso("listar_membros", backend.listar_membros, lambda r, v: (), True),
+    Caso("listar_membros_pagina", backend.listar_membros_pagina, lambda r, v: ((r.choice(NOMES), 0),), False),
+    Caso("listar_membros_pagina (CPF)", backend.listar_membros_pagina,
+         lambda r, v: ((_cpf(_membro(r, v)), 0), None, backend.TAMANHO_PAGINA, "CPF"), False),
+    Caso("buscar_treino_id", backend.buscar_treino_id, lambda r, v: (r.randint(1, v["treinos"]),), False),
+    Caso("listar_treinos (membro)", backend.listar_treinos, lambda r, v: (_membro(r, v),), False),
+    Caso("listar_treinos", backend.listar_treinos, lambda r, v: (), True),
+    Caso("listar_treinos_pagina", backend.listar_treinos_pagina, lambda r, v: (None, (_data(r), 0)), False),
+    Caso("listar_treinos_pagina (membro)", backend.listar_treinos_pagina, lambda r, v: (_membro(r, v),), False),
+    Caso("listar_pagamentos (membro)", backend.listar_pagamentos, lambda r, v: (_membro(r, v),), False),
+    Caso("listar_pagamentos", backend.listar_pagamentos, lambda r, v: (), True),
+    Caso("listar_pagamentos_pagina", backend.listar_pagamentos_pagina, lambda r, v: (None, (_data(r), 0)), False),
+    Caso("listar_atividades", backend.listar_atividades, lambda r, v: (_membro(r, v),), False),
+    Caso("listar_historico_atividades", backend.listar_historico_atividades, lambda r, v: (), True),
+    Caso("listar_historico_pagina", backend.listar_historico_pagina,
+         lambda r, v: ((_data(r) + " 23:59", 0),), False),
+    Caso("contar_historico_atividades", backend.contar_historico_atividades, lambda r, v: (), True),
+    Caso("cursor_historico_posicao", backend.cursor_historico_posicao,
+         lambda r, v: (r.randrange(v["atividades"]),), True),
+    Caso("buscar_funcionario_login", backend.buscar_funcionario_login, lambda r, v: ("admin",), False),
+    Caso("resumo_receita", backend.resumo_receita, lambda r, v: (), False),
+    Caso("resumo_atividades_membro", backend.resumo_atividades_membro, lambda r, v: (_membro(r, v),), False),
+    Caso("resumo_atividades_dia", backend.resumo_atividades_dia, lambda r, v: (_data(r),), False),
+    Caso("versao_alteracoes", backend.versao_alteracoes, lambda r, v: (), False),
+    Caso("alteracoes_desde", backend.alteracoes_desde,
+         lambda r, v: ("Membros", max(0, backend.versao_alteracoes() - 100)), False),
+    # Gravações (rodam depois das leituras, na mesma ordem em toda execução)
+    Caso("inserir_membro", backend.inserir_membro,
+         lambda r, v: (_nome(r), _cpf_novo(r), _telefone(r), r.choice(RUAS), _data(r)), False),
+    Caso("atualizar_membro", backend.atualizar_membro,
+         lambda r, v: (_membro(r, v), _nome(r), _cpf_novo(r), _telefone(r), r.choice(RUAS)), False),
+    Caso("inserir_treino", backend.inserir_treino, lambda r, v: next(gerar_treinos(r, 1, v["membros"])), False),
+    Caso("atualizar_treino", backend.atualizar_treino,
+         lambda r, v: (r.randint(1, v["treinos"]),) + next(gerar_treinos(r, 1, v["membros"])), False),
+    Caso("inserir_pagamento", backend.inserir_pagamento,
+         lambda r, v: next(gerar_pagamentos(r, 1, v["membros"])), False),
+    Caso("inserir_atividade", backend.inserir_atividade,
+         lambda r, v: next(gerar_atividades(r, 1, v["membros"])), False),
+    Caso("inserir_membros_lote (1000)", backend.inserir_membros_lote,
+         lambda r, v: ([(_nome(r), _cpf_novo(r), _telefone(r), r.choice(RUAS), _data(r))
+                        for _ in range(1000)],), False),
+    Caso("inserir_treinos_lote (1000)", backend.inserir_treinos_lote,
+         lambda r, v: (list(gerar_treinos(r, 1000, v["membros"])),), False),
+    Caso("inserir_pagamentos_lote (1000)", backend.inserir_pagamentos_lote,
+         lambda r, v: (list(gerar_pagamentos(r, 1000, v["membros"])),), False),
+    Caso("inserir_atividades_lote (1000)", backend.inserir_atividades_lote,
+         lambda r, v: (list(gerar_atividades(r, 1000, v["membros"])),), False),
+    Caso("excluir_treino", backend.excluir_treino, lambda r, v: (r.randint(1, v["treinos"]),), False),
+    Caso("excluir_membro", backend.excluir_membro, lambda r, v: (_membro(r, v),), False),
+]
+
+
+def _linhas(resultado):
+    if isinstance(resultado, list):
+        return len(resultado)
+    if isinstance(resultado, backend.Pagina):
+        return len(resultado.linhas)
+    return 1 if resultado is not None else 0
+
+
+def medir(caso, volumes, repeticoes, semente):
+    """Roda o caso `repeticoes` vezes (mais um aquecimento) e resume os tempos em ms"""
+    rnd = random.Random(f"{semente}-{caso.nome}")
+    if caso.pesado:
+        repeticoes = min(repeticoes, REPETICOES_PESADAS)
+    backend.cache_membros.limpar()
+    backend.cache_funcionarios.limpar()
+    tempos = []
+    linhas = 0
+    # As funções de CRUD imprimem mensagens para o usuário; aqui elas são descartadas
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(repeticoes + 1):
+            argumentos = caso.argumentos(rnd, volumes)
+            inicio = time.perf_counter()
+            resultado = caso.funcao(*argumentos)
+            decorrido = time.perf_counter() - inicio
+            if i:
+                tempos.append(decorrido * 1000)
+                linhas += _linhas(resultado)
+    tempos.sort()
+    return {
+        "repeticoes": repeticoes,
+        "linhas_media": linhas / repeticoes,
+        "min_ms": tempos[0],
+        "mediana_ms": statistics.median(tempos),
+        "media_ms": statistics.fmean(tempos),
+        "p95_ms": tempos[min(len(tempos) - 1, int(0.95 * len(tempos)))],
+        "max_ms": tempos[-1],
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual, anterior):
+    """Imprime a variação da mediana de cada caso em relação a um resultado anterior"""
+    print(f"\nComparação com {anterior.get('commit') or 'resultado anterior'} (mediana, ms):")
+    for nome, medida in atual["resultados"].items():
+        antes = anterior.get("resultados", {}).get(nome)
+        if not antes:
+            print(f"  {nome:<36} {'—':>10} {medida['mediana_ms']:>10.3f}   (novo)")
+            continue
+        variacao = (medida["mediana_ms"] / antes["mediana_ms"] - 1) * 100 if antes["mediana_ms"] else 0.0
+        print(f"  {nome:<36} {antes['mediana_ms']:>10.3f} {medida['mediana_ms']:>10.3f} {variacao:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o desempenho das funções do backend")
+    parser.add_argument("--escala", choices=ESCALAS, default="pequena", help="volume de dados gerados")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=50, help="execuções medidas por função")
+    parser.add_argument("--filtro", default="", help="mede só as funções cujo nome contém o texto")
+    parser.add_argument("--banco", help="banco de teste gerado uma vez e reaproveitado nas próximas "
+                                        "execuções (padrão: gerado num diretório temporário)")
+    parser.add_argument("--saida", default="desempenho.json", help="arquivo JSON com os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    if args.banco and backend.banco_principal(args.banco):
+        parser.error(f"use um arquivo diferente de {backend.DATABASE_NAME} para as medições")
+
+    diretorio = tempfile.mkdtemp(prefix="academia-desempenho-")
+    base = args.banco or os.path.join(diretorio, "base.db")
+    caminho = os.path.join(diretorio, "desempenho.db")
+    try:
+        tempos_geracao = {}
+        backend.configurar_banco(base)
+        with contextlib.redirect_stdout(io.StringIO()):
+            backend.atualizar_esquema()
+        if not contar_linhas()["membros"]:
+            print(f"Gerando dados ({args.escala}, semente {args.semente}) em {base}")
+            tempos_geracao = gerar_banco(ESCALAS[args.escala], args.semente)
+        volumes = contar_linhas()
+        # As gravações medidas alteram o banco: mede numa cópia, para que a base
+        # gerada continue idêntica entre execuções (fechar aplica o WAL no arquivo)
+        backend.fechar_conexoes()
+        shutil.copyfile(base, caminho)
+        backend.configurar_banco(caminho)
+
+        resultados = {}
+        for caso in CASOS:
+            if args.filtro not in caso.nome:
+                continue
+            resultados[caso.nome] = medida = medir(caso, volumes, args.repeticoes, args.semente)
+            print(f"{caso.nome:<36} mediana {medida['mediana_ms']:>10.3f} ms   p95 {medida['p95_ms']:>10.3f} ms")
+
+        relatorio = {
+            "data": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+            "escala": args.escala,
+            "semente": args.semente,
+            "rastrear_sql": backend.metricas.rastrear_sql,
+            "volumes": volumes,
+            "geracao_s": tempos_geracao,
+            "resultados": resultados,
+        }
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        print(f"Resultados gravados em {args.saida}")
+
+        if args.comparar:
+            with open(args.comparar, encoding="utf-8") as arquivo:
+                comparar(relatorio, json.load(arquivo))
+    finally:
+        backend.fechar_conexoes()
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Teste de estresse de acesso concorrente ao banco por vários terminais.
+
+Inicia vários processos que gravam ao mesmo tempo no mesmo arquivo pelo
+backend (cadastros, pagamentos, atividades, lotes e transações agrupadas),
+cada um anotando o que conseguiu gravar. Ao final confere no banco que
+nenhuma gravação confirmada se perdeu, que nenhuma falhou por bloqueio e que
+os resumos mantidos por gatilhos batem com as tabelas de origem. Termina com
+código 1 se algo não conferir.
+
+`--espera` reduz o tempo que o SQLite aguarda um bloqueio, para forçar o
+caminho das novas tentativas do backend.
+
+Uso:
+    python estresse_concorrencia.py --processos 8 --operacoes 500
+    python estresse_concorrencia.py --espera 0.01
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+import backend
+
+# Membros criados antes do teste, que recebem os pagamentos e atividades
+MEMBROS_INICIAIS = 20
+
+
+def _trabalhador(caminho, numero, operacoes, espera, semente, largada):
+    """Executa as gravações de um terminal e retorna o que foi confirmado"""
+    backend.configurar_banco(caminho, espera=espera)
+    rnd = random.Random(semente * 1000 + numero)
+    feito = {"membros": 0, "pagamentos": 0, "valor": 0, "atividades": 0, "minutos": 0,
+             "erros": [], "repeticoes": 0, "desistencias": 0, "segundos": 0.0}
+    meus_membros = []
+
+    def pagamento():
+        valor = rnd.randint(1, 500)
+        backend.inserir_pagamento(rnd.randint(1, MEMBROS_INICIAIS), valor,
+                                  f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}", "Pago")
+        feito["pagamentos"] += 1
+        feito["valor"] += valor
+
+    def atividade():
+        minutos = rnd.randint(1, 90)
+        backend.inserir_atividade(rnd.randint(1, MEMBROS_INICIAIS), "Estresse",
+                                  f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} 10:00", minutos)
+        feito["atividades"] += 1
+        feito["minutos"] += minutos
+
+    def membro(i):
+        id_membro = backend.inserir_membro(f"Terminal {numero} #{i}", f"T{numero}-{i}", None, None, "2024-01-01")
+        if id_membro is None:
+            raise RuntimeError(f"CPF T{numero}-{i} recusado")
+        meus_membros.append(id_membro)
+        feito["membros"] += 1
+
+    @backend.repetir_se_ocupado
+    def agrupado():
+        # Pagamento e atividade no mesmo commit; a contagem só vale se confirmar
+        valor, minutos = rnd.randint(1, 500), rnd.randint(1, 90)
+        id_membro = rnd.randint(1, MEMBROS_INICIAIS)
+        with backend.transacao():
+            backend.inserir_pagamento(id_membro, valor, "2024-06-15", "Pago")
+            backend.inserir_atividade(id_membro, "Agrupada", "2024-06-15 11:00", minutos)
+        return valor, minutos
+
+    largada.wait()
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(operacoes):
+            sorteio = rnd.random()
+            try:
+                if sorteio < 0.25:
+                    membro(i)
+                elif sorteio < 0.5:
+                    pagamento()
+                elif sorteio < 0.7:
+                    atividade()
+                elif sorteio < 0.8 and meus_membros:
+                    id_membro = rnd.choice(meus_membros)
+                    if not backend.atualizar_membro(id_membro, f"Terminal {numero} alterado", f"T{numero}-a{id_membro}",
+                                                    "0000-0000", None):
+                        raise RuntimeError("CPF recusado na alteração")
+                elif sorteio < 0.9:
+                    valor, minutos = agrupado()
+                    feito["pagamentos"] += 1
+                    feito["valor"] += valor
+                    feito["atividades"] += 1
+                    feito["minutos"] += minutos
+                else:
+                    lote = [(rnd.randint(1, MEMBROS_INICIAIS), "Lote", "2024-07-01 09:00", 10) for _ in range(20)]
+                    feito["atividades"] += backend.inserir_atividades_lote(lote, tamanho_lote=10)
+                    feito["minutos"] += 10 * len(lote)
+            except Exception as erro:
+                feito["erros"].append(f"{type(erro).__name__}: {erro}")
+    feito["segundos"] = time.perf_counter() - inicio
+    feito["repeticoes"] = backend.bloqueios.repeticoes
+    feito["desistencias"] = backend.bloqueios.desistencias
+    backend.fechar_conexoes()
+    return feito
+
+
+def preparar(caminho):
+    backend.configurar_banco(caminho)
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend.atualizar_esquema()
+        backend.inserir_membros_lote(
+            (f"Membro {i}", f"INICIAL-{i}", None, None, "2024-01-01") for i in range(MEMBROS_INICIAIS))
+    backend.fechar_conexoes()
+
+
+def conferir(caminho, resultados):
+    """Retorna a lista de divergências entre o que os processos gravaram e o banco"""
+    esperado = {chave: sum(r[chave] for r in resultados)
+                for chave in ("membros", "pagamentos", "valor", "atividades", "minutos")}
+    backend.configurar_banco(caminho)
+    conn = backend.obter_conexao()
+
+    def um(sql):
+        return conn.execute(sql).fetchone()[0]
+
+    encontrado = {
+        "membros": um("SELECT COUNT(*) FROM Membros WHERE CPF LIKE 'T%'"),
+        "pagamentos": um("SELECT COUNT(*) FROM Pagamentos"),
+        "valor": um("SELECT IFNULL(SUM(Valor), 0) FROM Pagamentos"),
+        "atividades": um("SELECT COUNT(*) FROM Historico_Atividades"),
+        "minutos": um("SELECT IFNULL(SUM(Tempo_Execucao), 0) FROM Historico_Atividades"),
+    }
+    divergencias = [f"{chave}: esperado {esperado[chave]}, encontrado {encontrado[chave]}"
+                    for chave in esperado if esperado[chave] != encontrado[chave]]
+    for resultado in resultados:
+        divergencias += [f"erro num terminal: {erro}" for erro in resultado["erros"]]
+
+    resumos = {
+        "Resumo_Receita": (um("SELECT IFNULL(SUM(Total), 0) FROM Resumo_Receita"),
+                           um("SELECT IFNULL(SUM(Quantidade), 0) FROM Resumo_Receita")),
+        "Resumo_Atividades": (um("SELECT IFNULL(SUM(Minutos), 0) FROM Resumo_Atividades"),
+                              um("SELECT IFNULL(SUM(Quantidade), 0) FROM Resumo_Atividades")),
+    }
+    origem = {
+        "Resumo_Receita": (encontrado["valor"], encontrado["pagamentos"]),
+        "Resumo_Atividades": (encontrado["minutos"], encontrado["atividades"]),
+    }
+    divergencias += [f"{tabela}: {resumos[tabela]} != origem {origem[tabela]}"
+                     for tabela in resumos if resumos[tabela] != origem[tabela]]
+    sem_registro = um("""
+        SELECT COUNT(*) FROM Membros m WHERE NOT EXISTS (
+            SELECT 1 FROM Alteracoes a WHERE a.Tabela = 'Membros' AND a.ID_Registro = m.ID)
+    """)
+    if sem_registro:
+        divergencias.append(f"{sem_registro} membros sem registro de alteração")
+    integridade = um("PRAGMA integrity_check")
+    if integridade != "ok":
+        divergencias.append(f"integrity_check: {integridade}")
+    backend.fechar_conexoes()
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estresse de gravações concorrentes no banco da academia")
+    parser.add_argument("--processos", type=int, default=6)
+    parser.add_argument("--operacoes", type=int, default=300, help="operações por processo")
+    parser.add_argument("--espera", type=float, default=backend.ESPERA_BLOQUEIO,
+                        help="segundos de espera por bloqueio em cada conexão")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--banco", help="arquivo a usar (padrão: temporário; nunca o academia.db)")
+    args = parser.parse_args()
+
+    if args.banco and backend.banco_principal(args.banco):
+        parser.error(f"use um arquivo diferente de {backend.DATABASE_NAME}")
+    with tempfile.TemporaryDirectory(prefix="academia-estresse-") as diretorio:
+        caminho = args.banco or os.path.join(diretorio, "estresse.db")
+        preparar(caminho)
+
+        # "spawn": cada terminal abre as próprias conexões, como um processo independente
+        contexto = multiprocessing.get_context("spawn")
+        with contexto.Manager() as gerente:
+            largada = gerente.Event()
+            with contexto.Pool(args.processos) as pool:
+                pendentes = [pool.apply_async(_trabalhador, (caminho, numero, args.operacoes, args.espera,
+                                                             args.semente, largada))
+                             for numero in range(args.processos)]
+                time.sleep(0.5)
+                inicio = time.perf_counter()
+                largada.set()
+                resultados = [pendente.get() for pendente in pendentes]
+                duracao = time.perf_counter() - inicio
+
+        total = args.processos * args.operacoes
+        print(f"{args.processos} processos x {args.operacoes} operações em {duracao:.2f} s "
+              f"({total / duracao:.0f} operações/s)")
+        print(f"Transações repetidas por bloqueio: {sum(r['repeticoes'] for r in resultados)}, "
+              f"desistências: {sum(r['desistencias'] for r in resultados)}")
+        divergencias = conferir(caminho, resultados)
+
+    for divergencia in divergencias:
+        print(f"  ERRO  {divergencia}")
+    if divergencias:
+        print(f"{len(divergencias)} divergências.")
+        return 1
+    print("Nenhuma gravação perdida; resumos e registro de alterações conferem.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Exportação de pagamentos, treinos e histórico de atividades para CSV ou
+JSON Lines, opcionalmente compactados com gzip. As linhas vêm dos geradores
+iterar_* do backend e são gravadas uma a uma, de modo que o consumo de
+memória não depende do tamanho da tabela.
+
+O arquivo é gravado com o sufixo .parcial e só recebe o nome final ao
+terminar, para que uma exportação interrompida não pareça completa.
+
+Uso:
+    python exportacao.py pagamentos pagamentos_2024.csv --inicio 2024-01-01 --fim 2024-12-31
+    python exportacao.py atividades historico.jsonl.gz
+    python exportacao.py treinos treinos.csv --membro 42
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+
+import backend
+from backend import (
+    TAMANHO_BLOCO, atualizar_esquema, iterar_pagamentos, iterar_treinos, iterar_atividades
+)
+from registros import Pagamento, Treino, Atividade
+
+EXPORTACOES = {
+    "pagamentos": (Pagamento, iterar_pagamentos),
+    "treinos": (Treino, iterar_treinos),
+    "atividades": (Atividade, iterar_atividades),
+}
+
+# Intervalo mínimo (segundos) entre duas chamadas de `progresso`
+INTERVALO_PROGRESSO = 0.5
+# O relógio só é consultado a cada tantas linhas
+LINHAS_POR_VERIFICACAO = 1000
+
+
+def formato_do_arquivo(caminho):
+    """'csv' ou 'jsonl', pela extensão (ignorando um .gz final)"""
+    if caminho.lower().endswith(".gz"):
+        caminho = caminho[:-3]
+    extensao = os.path.splitext(caminho)[1].lower()
+    return "jsonl" if extensao in (".jsonl", ".ndjson", ".json") else "csv"
+
+
+def _abrir(caminho, compactar):
+    if compactar:
+        return gzip.open(caminho, "wt", encoding="utf-8", newline="")
+    return open(caminho, "w", encoding="utf-8", newline="")
+
+
+def exportar(linhas, tipo, destino, formato=None, compactar=None, progresso=None):
+    """
+    Grava os registros de `linhas` (do `tipo` de registros.py) em `destino` e
+    retorna quantos foram gravados. As colunas usam os nomes do banco, como na
+    importação. `progresso(linhas, segundos)` é chamado periodicamente.
+    """
+    formato = formato or formato_do_arquivo(destino)
+    if compactar is None:
+        compactar = destino.lower().endswith(".gz")
+    parcial = destino + ".parcial"
+    inicio = time.monotonic()
+    proximo_aviso = inicio + INTERVALO_PROGRESSO
+    total = 0
+    try:
+        with _abrir(parcial, compactar) as arquivo:
+            if formato == "csv":
+                escritor = csv.writer(arquivo)
+                escritor.writerow(tipo.COLUNAS)
+                gravar = escritor.writerow
+            else:
+                colunas = tipo.COLUNAS
+
+                def gravar(linha):
+                    arquivo.write(json.dumps(dict(zip(colunas, linha)), ensure_ascii=False))
+                    arquivo.write("\n")
+            for linha in linhas:
+                gravar(linha)
+                total += 1
+                if progresso and total % LINHAS_POR_VERIFICACAO == 0:
+                    agora = time.monotonic()
+                    if agora >= proximo_aviso:
+                        progresso(total, agora - inicio)
+                        proximo_aviso = agora + INTERVALO_PROGRESSO
+        os.replace(parcial, destino)
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+    if progresso:
+        progresso(total, time.monotonic() - inicio)
+    return total
+
+
+def _mostrar_progresso(linhas, segundos):
+    taxa = linhas / segundos if segundos else 0
+    print(f"\r  {linhas:>12,} linhas  {segundos:7.1f} s  {taxa:>10,.0f} linhas/s",
+          end="", file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportação de dados da academia")
+    parser.add_argument("tipo", choices=sorted(EXPORTACOES))
+    parser.add_argument("destino", help="arquivo .csv ou .jsonl (acrescente .gz para compactar)")
+    parser.add_argument("--formato", choices=("csv", "jsonl"), help="padrão: pela extensão do destino")
+    parser.add_argument("--gzip", action="store_true", default=None, help="compacta mesmo sem a extensão .gz")
+    parser.add_argument("--membro", type=int, help="só os registros deste membro")
+    parser.add_argument("--inicio", help="data inicial (AAAA-MM-DD, inclusiva)")
+    parser.add_argument("--fim", help="data final (AAAA-MM-DD, inclusiva)")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO, help="linhas lidas do banco por vez")
+    parser.add_argument("--silencioso", action="store_true", help="não mostra o progresso")
+    parser.add_argument("--banco", default=backend.DATABASE_NAME, help="arquivo do banco de dados")
+    args = parser.parse_args()
+
+    backend.configurar_banco(args.banco)
+    atualizar_esquema()
+    tipo, iterar = EXPORTACOES[args.tipo]
+    linhas = iterar(args.membro, args.inicio, args.fim, args.bloco)
+    total = exportar(linhas, tipo, args.destino, args.formato, args.gzip,
+                     None if args.silencioso else _mostrar_progresso)
+    if not args.silencioso:
+        print(file=sys.stderr)
+    print(f"{total} {args.tipo} exportados para {args.destino}")
+
+
+if __name__ == "__main__":
+    main()
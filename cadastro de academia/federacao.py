@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Consultas entre filiais. Cada filial tem o seu banco (ver ACADEMIA_BANCO no
+backend); a federação os anexa (ATTACH) a uma conexão em memória e responde
+listagens, busca por CPF e relatórios de todas as filiais numa só consulta
+UNION ALL. Acima do limite de bancos anexados por conexão, as filiais são
+divididas em grupos consultados em paralelo e os resultados combinados.
+
+Os totais por filial, que não dependem uns dos outros, são calculados em
+paralelo, cada filial na sua própria conexão.
+
+As filiais vêm de um JSON {"nome": "caminho do banco"}; caminhos relativos
+partem da pasta do arquivo. Cada banco deve estar com o esquema em dia (as
+aplicações da filial o atualizam ao abrir). A federação só lê: os bancos são
+abertos com mode=ro e mantêm o modo de journal que a filial escolheu.
+
+Uso:
+    python federacao.py filiais.json totais
+    python federacao.py filiais.json membros
+    python federacao.py filiais.json cpf 123.456.789-00
+    python federacao.py filiais.json receita --inicio 2024-01 --fim 2024-12 --por-filial
+"""
+
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from conexao import GerenciadorConexoes
+from registros import (
+    Membro, MembroLista, Pagamento, MembroFilial, MembroListaFilial,
+    PagamentoFilial, ReceitaFilial, TotaisFilial
+)
+
+# A conexão central só guarda os anexos; os pragmas de WAL e mmap valem por arquivo
+PRAGMAS_CENTRAL = {"temp_store": "MEMORY", "cache_size": -20000}
+# As filiais são abertas só para leitura e sem journal_mode: a federação não
+# deve converter os bancos para WAL nem deixar -wal/-shm ao lado deles (que não
+# funcionam em pastas de rede)
+PRAGMAS_FILIAL = {"cache_size": -20000, "mmap_size": 268435456, "temp_store": "MEMORY"}
+
+_NOME_FILIAL = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+def _esquema(nome):
+    return "filial_" + nome
+
+
+def _somente_leitura(caminho):
+    """URI que abre o banco em `caminho` só para leitura"""
+    return pathlib.Path(caminho).resolve().as_uri() + "?mode=ro"
+
+
+class Federacao:
+    """
+    Conjunto de filiais consultadas em conjunto.
+
+    `filiais` é um dicionário {nome: caminho do banco}; os nomes aparecem na
+    coluna `filial` dos resultados e só podem ter letras, dígitos e "_".
+    """
+
+    def __init__(self, filiais, trabalhadores=None):
+        if not filiais:
+            raise ValueError("Informe ao menos uma filial.")
+        self.filiais = {}
+        for nome, caminho in filiais.items():
+            if not _NOME_FILIAL.match(nome):
+                raise ValueError(f"Nome de filial inválido: {nome!r}")
+            # ATTACH e connect criariam um banco vazio no lugar de um caminho errado
+            if not os.path.exists(caminho):
+                raise FileNotFoundError(f"Banco da filial {nome} não encontrado: {caminho}")
+            self.filiais[nome] = caminho
+        self._uris = {nome: _somente_leitura(caminho) for nome, caminho in self.filiais.items()}
+        self._central = GerenciadorConexoes(":memory:", pragmas=PRAGMAS_CENTRAL, uri=True)
+        self._conexoes = {nome: GerenciadorConexoes(uri, pragmas=PRAGMAS_FILIAL, uri=True)
+                          for nome, uri in self._uris.items()}
+        nomes = list(self.filiais)
+        limite = self._central.limite_anexos
+        self._grupos = [nomes[i:i + limite] for i in range(0, len(nomes), limite)]
+        self._pool = ThreadPoolExecutor(max_workers=trabalhadores or min(8, len(nomes)),
+                                        thread_name_prefix="filial")
+
+    @classmethod
+    def de_arquivo(cls, caminho, trabalhadores=None):
+        """Cria a federação a partir de um JSON {"nome": "caminho do banco"}"""
+        with open(caminho, encoding="utf-8") as arquivo:
+            filiais = json.load(arquivo)
+        base = os.path.dirname(os.path.abspath(caminho))
+        return cls({nome: os.path.join(base, banco) for nome, banco in filiais.items()}, trabalhadores)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def fechar(self):
+        self._pool.shutdown()
+        self._central.fechar()
+        for gerenciador in self._conexoes.values():
+            gerenciador.fechar()
+
+    # --- Consultas unidas (ATTACH) ---
+
+    def _unir(self, modelo, parametros=(), externo="{uniao}", combinar=None):
+        """
+        Executa `modelo` (um SELECT com {esquema} no lugar do banco e o nome da
+        filial como primeiro parâmetro) em todas as filiais, unidas com UNION
+        ALL e colocadas em `externo` no lugar de {uniao} (para ORDER BY, GROUP
+        BY...). Com mais de um grupo de filiais, `combinar(listas)` junta os
+        resultados dos grupos.
+        """
+        def consultar_grupo(nomes):
+            for nome in nomes:
+                conn = self._central.anexar(self._uris[nome], _esquema(nome))
+            uniao = " UNION ALL ".join(modelo.format(esquema=_esquema(nome)) for nome in nomes)
+            valores = [valor for nome in nomes for valor in (nome, *parametros)]
+            return conn.execute(externo.format(uniao=uniao), valores).fetchall()
+
+        if len(self._grupos) == 1:
+            return consultar_grupo(self._grupos[0])
+        resultados = list(self._pool.map(consultar_grupo, self._grupos))
+        if combinar:
+            return combinar(resultados)
+        return [linha for linhas in resultados for linha in linhas]
+
+    def listar_membros(self):
+        """Membros de todas as filiais (MembroListaFilial), por nome"""
+        linhas = self._unir(f"SELECT ? AS Filial, {MembroLista.SELECT} FROM {{esquema}}.Membros",
+                            externo="{uniao} ORDER BY Nome, Filial, ID",
+                            combinar=lambda listas: sorted((l for ls in listas for l in ls),
+                                                           key=lambda l: (l[2], l[0], l[1])))
+        return list(map(MembroListaFilial._make, linhas))
+
+    def buscar_cpf(self, cpf):
+        """Cadastros com o CPF em qualquer filial (lista de MembroFilial)"""
+        linhas = self._unir(f"SELECT ? AS Filial, {Membro.SELECT} FROM {{esquema}}.Membros WHERE CPF = ?",
+                            (cpf,))
+        return list(map(MembroFilial._make, linhas))
+
+    def listar_pagamentos(self, filial=None, id_membro=None):
+        """
+        Pagamentos (PagamentoFilial), mais recentes primeiro, de todas as
+        filiais ou só de `filial`. `id_membro` só faz sentido junto com a
+        filial, já que cada filial numera os seus membros.
+        """
+        if id_membro and not filial:
+            raise ValueError("id_membro exige a filial.")
+        if filial:
+            sql = f"SELECT ? AS Filial, {Pagamento.SELECT} FROM Pagamentos"
+            parametros = [filial]
+            if id_membro:
+                sql += " WHERE ID_Membro = ?"
+                parametros.append(id_membro)
+            conn = self._conexao_filial(filial)
+            return list(map(PagamentoFilial._make,
+                            conn.execute(sql + " ORDER BY Data_Pagamento DESC", parametros)))
+        linhas = self._unir(f"SELECT ? AS Filial, {Pagamento.SELECT} FROM {{esquema}}.Pagamentos",
+                            externo="{uniao} ORDER BY Data_Pagamento DESC",
+                            combinar=lambda listas: sorted((l for ls in listas for l in ls),
+                                                           key=lambda l: l[4] or "", reverse=True))
+        return list(map(PagamentoFilial._make, linhas))
+
+    def receita(self, mes_inicio="", mes_fim="\uffff", por_filial=False):
+        """
+        Receita por mês e status somada entre as filiais (ReceitaFilial com
+        filial None), ou separada por filial com `por_filial`. Lida das
+        tabelas de resumo de cada banco.
+        """
+        modelo = "SELECT ? AS Filial, Mes, Status, Total, Quantidade FROM {esquema}.Resumo_Receita " \
+                 "WHERE Mes BETWEEN ? AND ?"
+        if por_filial:
+            linhas = self._unir(modelo, (mes_inicio, mes_fim),
+                                externo="{uniao} ORDER BY Mes DESC, Filial DESC, Status DESC",
+                                combinar=lambda listas: sorted((l for ls in listas for l in ls),
+                                                               key=lambda l: (l[1], l[0], l[2]), reverse=True))
+            return list(map(ReceitaFilial._make, linhas))
+
+        def somar(listas):
+            totais = {}
+            for _, mes, status, total, quantidade in (l for ls in listas for l in ls):
+                soma = totais.get((mes, status), (0, 0))
+                totais[(mes, status)] = (soma[0] + total, soma[1] + quantidade)
+            return [(None, mes, status, total, quantidade)
+                    for (mes, status), (total, quantidade) in sorted(totais.items(), reverse=True)]
+
+        linhas = self._unir(modelo, (mes_inicio, mes_fim), externo="""
+            SELECT NULL, Mes, Status, SUM(Total), SUM(Quantidade) FROM ({uniao})
+            GROUP BY Mes, Status ORDER BY Mes DESC, Status DESC
+        """, combinar=somar)
+        return list(map(ReceitaFilial._make, linhas))
+
+    # --- Consultas independentes por filial (em paralelo) ---
+
+    def _conexao_filial(self, nome):
+        if nome not in self._conexoes:
+            raise ValueError(f"Filial desconhecida: {nome}")
+        return self._conexoes[nome].conexao()
+
+    def por_filial(self, funcao):
+        """
+        Executa `funcao(conn, nome)` em cada filial, em paralelo e cada uma na
+        sua conexão, e retorna {nome: resultado}.
+        """
+        nomes = list(self.filiais)
+        resultados = self._pool.map(lambda nome: funcao(self._conexao_filial(nome), nome), nomes)
+        return dict(zip(nomes, resultados))
+
+    def totais(self, data=None, mes=None):
+        """
+        TotaisFilial de cada filial: membros, pagamentos e receita do mês
+        (AAAA-MM, padrão o atual) e minutos/atividades do dia (padrão hoje).
+        """
+        hoje = datetime.date.today()
+        data = data or hoje.isoformat()
+        mes = mes or data[:7]
+
+        def calcular(conn, nome):
+            membros = conn.execute("SELECT COUNT(*) FROM Membros").fetchone()[0]
+            pagamentos, receita = conn.execute(
+                "SELECT IFNULL(SUM(Quantidade), 0), IFNULL(SUM(Total), 0) FROM Resumo_Receita WHERE Mes = ?",
+                (mes,)).fetchone()
+            minutos, atividades = conn.execute(
+                "SELECT IFNULL(SUM(Minutos), 0), IFNULL(SUM(Quantidade), 0) FROM Resumo_Atividades WHERE Data = ?",
+                (data,)).fetchone()
+            return TotaisFilial(nome, membros, pagamentos, receita, minutos, atividades)
+
+        return list(self.por_filial(calcular).values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas entre as filiais da academia")
+    parser.add_argument("filiais", help='JSON {"nome": "caminho do banco"}')
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("totais", help="membros, receita do mês e atividades do dia por filial")
+    comandos.add_parser("membros", help="membros de todas as filiais")
+    cpf = comandos.add_parser("cpf", help="procura um CPF em todas as filiais")
+    cpf.add_argument("cpf")
+    receita = comandos.add_parser("receita", help="receita por mês e status")
+    receita.add_argument("--inicio", default="", help="mês inicial (AAAA-MM)")
+    receita.add_argument("--fim", default="\uffff", help="mês final (AAAA-MM)")
+    receita.add_argument("--por-filial", action="store_true")
+    args = parser.parse_args()
+
+    with Federacao.de_arquivo(args.filiais) as federacao:
+        if args.comando == "totais":
+            print(f"{'Filial':<16}{'Membros':>9}{'Pagtos mês':>12}{'Receita mês':>14}{'Min. hoje':>11}{'Ativ. hoje':>11}")
+            for t in federacao.totais():
+                print(f"{t.filial:<16}{t.membros:>9}{t.pagamentos:>12}{t.receita:>14.2f}"
+                      f"{t.minutos_dia:>11}{t.atividades_dia:>11}")
+        elif args.comando == "membros":
+            for m in federacao.listar_membros():
+                print(f"{m.filial} | {m.id} | {m.nome} | {m.cpf} | {m.telefone}")
+        elif args.comando == "cpf":
+            encontrados = federacao.buscar_cpf(args.cpf)
+            for m in encontrados:
+                print(f"{m.filial} | {m.id} | {m.nome} | {m.telefone} | cadastro {m.data_cadastro}")
+            if not encontrados:
+                print("CPF não encontrado em nenhuma filial.")
+        else:
+            for r in federacao.receita(args.inicio, args.fim, args.por_filial):
+                print(f"{r.filial or 'todas':<16}{r.mes:<9}{r.status:<12}{r.total:>12.2f}{r.quantidade:>7}")
+
+
+if __name__ == "__main__":
+    main()
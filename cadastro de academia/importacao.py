@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Importação em massa de membros, treinos e pagamentos a partir de arquivos
+CSV ou JSON. Os arquivos são lidos em fluxo (um registro por vez), de modo
+que o consumo de memória não depende do tamanho da carga.
+
+Uso:
+    python importacao.py membros membros.csv --rejeicoes rejeitados.csv
+    python importacao.py treinos treinos.jsonl --lote 5000
+    python importacao.py pagamentos pagamentos.csv --banco filial.db
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import os
+
+import backend
+from backend import (
+    TAMANHO_LOTE, atualizar_esquema, inserir_membros_lote,
+    inserir_treinos_lote, inserir_pagamentos_lote
+)
+
+# Colunas esperadas em cada tipo de arquivo, na ordem das tuplas do backend
+CAMPOS = {
+    "membros": ("Nome", "CPF", "Telefone", "Endereco", "Data_Cadastro"),
+    "treinos": ("ID_Membro", "Tipo", "Descricao", "Duracao", "Data_Inicio"),
+    "pagamentos": ("ID_Membro", "Valor", "Data_Pagamento", "Status"),
+}
+
+TAMANHO_BLOCO_JSON = 65536
+
+
+def ler_csv(caminho):
+    """Gera um dicionário por linha do CSV (cabeçalho na primeira linha, BOM do Excel ignorado)"""
+    with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+        yield from csv.DictReader(arquivo)
+
+
+def ler_json(caminho):
+    """
+    Gera os objetos de um arquivo JSON Lines (um objeto por linha) ou de um
+    array JSON, decodificando um objeto por vez sem carregar o arquivo inteiro.
+    """
+    decodificador = json.JSONDecoder()
+    separadores = " \t\r\n,[]"
+    with open(caminho, encoding='utf-8-sig') as arquivo:
+        buffer = ""
+        pos = 0
+        fim = False
+        while True:
+            while pos < len(buffer) and buffer[pos] in separadores:
+                pos += 1
+            if pos < len(buffer):
+                try:
+                    objeto, pos = decodificador.raw_decode(buffer, pos)
+                    yield objeto
+                    continue
+                except json.JSONDecodeError:
+                    if fim:
+                        raise
+            elif fim:
+                return
+            bloco = arquivo.read(TAMANHO_BLOCO_JSON)
+            fim = not bloco
+            buffer = buffer[pos:] + bloco
+            pos = 0
+
+
+def ler_registros(caminho):
+    """Escolhe o leitor pela extensão do arquivo"""
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao in (".json", ".jsonl", ".ndjson"):
+        return ler_json(caminho)
+    return ler_csv(caminho)
+
+
+def _normalizar(registro, campos):
+    """Converte um dicionário do arquivo na tupla esperada pelo backend"""
+    por_nome = {str(chave).strip().lower(): valor for chave, valor in registro.items()}
+    return tuple(por_nome.get(campo.lower()) for campo in campos)
+
+
+def _membros(registros):
+    hoje = datetime.date.today().isoformat()
+    for registro in registros:
+        nome, cpf, telefone, endereco, data_cadastro = _normalizar(registro, CAMPOS["membros"])
+        yield (nome, cpf, telefone, endereco, data_cadastro or hoje)
+
+
+def _treinos(registros, rejeitados):
+    for registro in registros:
+        campos = _normalizar(registro, CAMPOS["treinos"])
+        id_membro, tipo, descricao, duracao, data_inicio = campos
+        try:
+            yield (int(id_membro), tipo, descricao, int(duracao) if duracao not in (None, "") else None,
+                   data_inicio)
+        except (TypeError, ValueError):
+            rejeitados.append((campos, "ID_Membro ou Duracao inválido"))
+
+
+def _pagamentos(registros, rejeitados):
+    for registro in registros:
+        campos = _normalizar(registro, CAMPOS["pagamentos"])
+        id_membro, valor, data_pagamento, status = campos
+        try:
+            yield (int(id_membro), float(valor), data_pagamento, status)
+        except (TypeError, ValueError):
+            rejeitados.append((campos, "ID_Membro ou Valor inválido"))
+
+
+class RelatorioImportacao:
+    """Resultado de uma importação: total gravado e registros rejeitados"""
+
+    def __init__(self, tipo, inseridos, rejeitados=None):
+        self.tipo = tipo
+        self.inseridos = inseridos
+        self.rejeitados = rejeitados or []
+
+    def salvar_rejeicoes(self, caminho):
+        """Grava os registros rejeitados em CSV, com o motivo na última coluna"""
+        with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(CAMPOS[self.tipo] + ("Motivo",))
+            for registro, motivo in self.rejeitados:
+                escritor.writerow(tuple(registro) + (motivo,))
+
+    def __str__(self):
+        return f"{self.inseridos} {self.tipo} importados, {len(self.rejeitados)} rejeitados"
+
+
+def importar_membros(caminho, tamanho_lote=TAMANHO_LOTE):
+    inseridos, rejeitados = inserir_membros_lote(_membros(ler_registros(caminho)), tamanho_lote)
+    return RelatorioImportacao("membros", inseridos, rejeitados)
+
+
+def importar_treinos(caminho, tamanho_lote=TAMANHO_LOTE):
+    rejeitados = []
+    inseridos = inserir_treinos_lote(_treinos(ler_registros(caminho), rejeitados), tamanho_lote)
+    return RelatorioImportacao("treinos", inseridos, rejeitados)
+
+
+def importar_pagamentos(caminho, tamanho_lote=TAMANHO_LOTE):
+    rejeitados = []
+    inseridos = inserir_pagamentos_lote(_pagamentos(ler_registros(caminho), rejeitados), tamanho_lote)
+    return RelatorioImportacao("pagamentos", inseridos, rejeitados)
+
+
+IMPORTADORES = {
+    "membros": importar_membros,
+    "treinos": importar_treinos,
+    "pagamentos": importar_pagamentos,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação em massa para o banco da academia")
+    parser.add_argument("tipo", choices=sorted(IMPORTADORES))
+    parser.add_argument("arquivo", help="arquivo CSV, JSON ou JSON Lines")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="registros por transação")
+    parser.add_argument("--rejeicoes", help="CSV onde gravar os registros rejeitados")
+    parser.add_argument("--banco", default=backend.DATABASE_NAME, help="arquivo do banco de dados")
+    args = parser.parse_args()
+
+    backend.configurar_banco(args.banco)
+    atualizar_esquema()
+    relatorio = IMPORTADORES[args.tipo](args.arquivo, args.lote)
+    print(relatorio)
+    if args.rejeicoes and relatorio.rejeitados:
+        relatorio.salvar_rejeicoes(args.rejeicoes)
+        print(f"Rejeições gravadas em {args.rejeicoes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# coding: utf-8
+
+"""
+Ingestão de check-ins (catracas, equipamentos) no Historico_Atividades.
+
+Os eventos entram numa fila em memória e uma única thread escritora os grava
+em lotes: um commit por lote, fechado quando o lote atinge `tamanho_lote`
+eventos ou quando passa `janela` segundos desde o primeiro evento do lote.
+Assim centenas de eventos por segundo custam poucos commits (fsyncs).
+
+Se um lote falha por causa de um evento inválido, ele é dividido ao meio e
+regravado até isolar os eventos com problema; só esses são recusados. Os
+recusados ficam em `rejeitados` (e vão para `ao_rejeitar`, se informado) e
+cada falha é enviada ao logger "academia.ingestao".
+
+Uso:
+    with IngestorAtividades() as ingestor:
+        ingestor.registrar(id_membro, "Catraca", agora, 0)
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from backend import inserir_atividades_lote
+
+# Quantidade de latências de commit guardadas para as estatísticas
+AMOSTRAS_LATENCIA = 1000
+# Quantidade de eventos recusados mantidos em memória
+MAX_REJEITADOS = 10000
+
+log_ingestao = logging.getLogger("academia.ingestao")
+log_ingestao.addHandler(logging.NullHandler())
+
+
+class IngestorAtividades:
+    """
+    Fila de atividades drenada por uma thread escritora com group commit.
+
+    Quando a fila está cheia, `registrar` bloqueia (ou levanta queue.Full se
+    `bloquear=False` ou o `timeout` esgotar), aplicando contrapressão a quem
+    produz os eventos. `encerrar()` grava o que ainda estiver na fila; depois
+    dele, `registrar` levanta RuntimeError.
+
+    `ao_rejeitar(eventos, erro)` é chamado na thread escritora com os eventos
+    que não puderam ser gravados; eles também ficam em `rejeitados` como
+    (evento, erro), até MAX_REJEITADOS.
+    """
+
+    def __init__(self, tamanho_lote=500, janela=0.05, capacidade=10000, ao_rejeitar=None):
+        self.tamanho_lote = tamanho_lote
+        self.janela = janela
+        self.ao_rejeitar = ao_rejeitar
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._parar = threading.Event()
+        self._thread = None
+        self._trava = threading.Lock()
+        # Registros em andamento: encerrar() espera por eles antes de esvaziar a fila
+        self._entradas = threading.Condition()
+        self._registrando = 0
+        self._latencias = deque(maxlen=AMOSTRAS_LATENCIA)
+        self._inicio = None
+        self.rejeitados = deque(maxlen=MAX_REJEITADOS)
+        self.gravados = 0
+        self.lotes = 0
+        self.falhas = 0
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.encerrar()
+
+    def iniciar(self):
+        if self._thread is None:
+            self._inicio = time.monotonic()
+            self._thread = threading.Thread(target=self._escritor, name="ingestao-atividades", daemon=True)
+            self._thread.start()
+
+    def registrar(self, id_membro, atividade, data, tempo_execucao, bloquear=True, timeout=None):
+        """Enfileira uma atividade; retorna assim que ela estiver na fila"""
+        with self._entradas:
+            if self._parar.is_set():
+                raise RuntimeError("Ingestor encerrado.")
+            self._registrando += 1
+        try:
+            self._fila.put((id_membro, atividade, data, tempo_execucao), block=bloquear, timeout=timeout)
+        finally:
+            with self._entradas:
+                self._registrando -= 1
+                self._entradas.notify_all()
+
+    def encerrar(self, timeout=None):
+        """Para de aceitar eventos, grava os pendentes e finaliza a thread"""
+        with self._entradas:
+            self._parar.set()
+            self._entradas.wait_for(lambda: not self._registrando, timeout)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return
+            self._thread = None
+        # Eventos enfileirados durante o encerramento
+        restantes = []
+        while True:
+            try:
+                restantes.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        if restantes:
+            self._gravar(restantes)
+
+    def _proximo_lote(self):
+        """Bloqueia até o primeiro evento e junta os seguintes até o tamanho ou a janela"""
+        try:
+            lote = [self._fila.get(timeout=self.janela)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.janela
+        while len(lote) < self.tamanho_lote:
+            restante = limite - time.monotonic()
+            try:
+                if restante > 0:
+                    lote.append(self._fila.get(timeout=restante))
+                else:
+                    lote.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _escritor(self):
+        while not (self._parar.is_set() and self._fila.empty()):
+            lote = self._proximo_lote()
+            if lote:
+                self._gravar(lote)
+
+    def _gravar(self, lote):
+        inicio = time.perf_counter()
+        try:
+            inserir_atividades_lote(lote, len(lote))
+        except sqlite3.OperationalError as erro:
+            # Banco indisponível (bloqueado além das tentativas, disco cheio):
+            # dividir o lote não resolveria, então ele é recusado inteiro
+            self._rejeitar(lote, erro)
+            return
+        except Exception as erro:
+            if len(lote) == 1:
+                self._rejeitar(lote, erro)
+                return
+            meio = len(lote) // 2
+            self._gravar(lote[:meio])
+            self._gravar(lote[meio:])
+            return
+        latencia = time.perf_counter() - inicio
+        with self._trava:
+            self.gravados += len(lote)
+            self.lotes += 1
+            self._latencias.append(latencia)
+
+    def _rejeitar(self, eventos, erro):
+        with self._trava:
+            self.falhas += len(eventos)
+            self.rejeitados.extend((evento, erro) for evento in eventos)
+        log_ingestao.error("%d atividade(s) recusada(s): %s", len(eventos), erro)
+        if self.ao_rejeitar:
+            try:
+                self.ao_rejeitar(eventos, erro)
+            except Exception:
+                log_ingestao.exception("Erro no callback ao_rejeitar")
+
+    def retirar_rejeitados(self):
+        """Devolve e esvazia a lista de (evento, erro) recusados"""
+        with self._trava:
+            rejeitados = list(self.rejeitados)
+            self.rejeitados.clear()
+        return rejeitados
+
+    def estatisticas(self):
+        """Vazão e latência de commit desde o início (latências em milissegundos)"""
+        with self._trava:
+            latencias = sorted(self._latencias)
+            gravados, lotes, falhas = self.gravados, self.lotes, self.falhas
+        decorrido = time.monotonic() - self._inicio if self._inicio else 0.0
+
+        def percentil(p):
+            if not latencias:
+                return 0.0
+            return latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000
+
+        return {
+            "gravados": gravados,
+            "falhas": falhas,
+            "rejeitados_em_memoria": len(self.rejeitados),
+            "lotes": lotes,
+            "na_fila": self._fila.qsize(),
+            "eventos_por_segundo": gravados / decorrido if decorrido else 0.0,
+            "eventos_por_lote": gravados / lotes if lotes else 0.0,
+            "latencia_commit_media_ms": sum(latencias) / len(latencias) * 1000 if latencias else 0.0,
+            "latencia_commit_p50_ms": percentil(0.50),
+            "latencia_commit_p95_ms": percentil(0.95),
+            "latencia_commit_max_ms": latencias[-1] * 1000 if latencias else 0.0,
+        }
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Comandos de manutenção do banco da academia.
+
+Uso:
+    python manutencao.py migracoes
+    python manutencao.py migrar
+    python manutencao.py reconstruir-resumos
+    python manutencao.py arquivar-atividades --dias 365 --compactar
+    python manutencao.py meses-arquivados
+    python manutencao.py cobranca --carencia 35 --listar
+    python manutencao.py excluir-membros 12 15 40
+    python manutencao.py limpar-orfaos --simular
+
+`cobranca` recalcula a lista de inadimplentes lida pelas telas; agende-o
+(cron, Agendador de Tarefas do Windows) para rodar uma vez por dia, fora do
+horário de atendimento.
+"""
+
+import argparse
+
+import backend
+
+
+def cmd_migracoes(args):
+    versao = backend.versao_esquema()
+    print(f"Esquema na versão {versao} (atual: {backend.VERSAO_ESQUEMA})")
+    for numero, descricao, _ in backend.MIGRACOES:
+        print(f"  {numero:>3}  {'aplicada' if numero <= versao else 'pendente':<9} {descricao}")
+
+
+def cmd_migrar(args):
+    aplicadas = backend.atualizar_esquema()
+    for numero, descricao in aplicadas:
+        print(f"Aplicada a migração {numero}: {descricao}")
+    if not aplicadas:
+        print("Nenhuma migração pendente.")
+
+
+def cmd_reconstruir_resumos(args):
+    backend.reconstruir_resumos()
+    print("Resumos de receita e atividades recalculados.")
+
+
+def cmd_arquivar_atividades(args):
+    movidas = backend.arquivar_atividades(args.dias)
+    for mes, linhas in movidas.items():
+        print(f"{mes}: {linhas} atividades arquivadas")
+    if not movidas:
+        print("Nenhuma atividade anterior ao horizonte.")
+    elif args.compactar:
+        # Sem VACUUM as páginas liberadas só são reaproveitadas por novas gravações
+        backend.obter_conexao().execute("VACUUM")
+        print("Banco principal compactado.")
+
+
+def cmd_meses_arquivados(args):
+    meses = backend.listar_meses_arquivados()
+    for mes, arquivo, linhas in meses:
+        print(f"{mes}  {linhas:>10}  {arquivo}")
+    print(f"{len(meses)} meses em {backend.diretorio_arquivo()}")
+
+
+def cmd_cobranca(args):
+    total = backend.atualizar_inadimplentes(args.carencia)
+    print(f"{total} membros sem pagamento quitado há mais de {args.carencia} dias.")
+    if args.listar:
+        for membro in backend.listar_inadimplentes():
+            atraso = f"{membro.dias_atraso} dias" if membro.dias_atraso is not None else "sem datas"
+            print(f"  {membro.id:>6} | {membro.nome} | {membro.telefone or '-'} | "
+                  f"último pagamento {membro.ultimo_pagamento or 'nenhum'} | {atraso}")
+
+
+def cmd_excluir_membros(args):
+    excluidas = backend.excluir_membros(args.ids)
+    print(f"{excluidas.pop('Membros')} membros excluídos.")
+    for tabela, linhas in excluidas.items():
+        print(f"  {tabela}: {linhas} linhas")
+
+
+def cmd_limpar_orfaos(args):
+    orfas = backend.limpar_orfaos(remover=not args.simular)
+    for tabela, linhas in orfas.items():
+        print(f"{tabela}: {linhas} linhas de membros inexistentes")
+    total = sum(orfas.values())
+    if args.simular or not total:
+        print(f"{total} linhas órfãs; nada foi removido.")
+        return
+    print(f"{total} linhas órfãs removidas.")
+    if args.compactar:
+        backend.obter_conexao().execute("VACUUM")
+        print("Banco principal compactado.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção do banco da academia")
+    parser.add_argument("--banco", default=backend.DATABASE_NAME, help="arquivo do banco de dados")
+    # Os comandos migram o banco antes de rodar, exceto os de migração
+    parser.set_defaults(migrar=True)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    comandos.add_parser("migracoes", help="lista as migrações aplicadas e pendentes") \
+        .set_defaults(funcao=cmd_migracoes, migrar=False)
+    comandos.add_parser("migrar", help="aplica as migrações pendentes") \
+        .set_defaults(funcao=cmd_migrar, migrar=False)
+
+    comandos.add_parser("reconstruir-resumos", help="recalcula as tabelas de resumo") \
+        .set_defaults(funcao=cmd_reconstruir_resumos)
+
+    arquivar = comandos.add_parser("arquivar-atividades",
+                                   help="move meses antigos do histórico para os bancos de arquivo")
+    arquivar.add_argument("--dias", type=int, default=backend.HORIZONTE_ARQUIVO_DIAS,
+                          help="mantém na tabela principal os meses dos últimos N dias")
+    arquivar.add_argument("--compactar", action="store_true", help="executa VACUUM ao final")
+    arquivar.set_defaults(funcao=cmd_arquivar_atividades)
+
+    comandos.add_parser("meses-arquivados", help="lista os meses já arquivados") \
+        .set_defaults(funcao=cmd_meses_arquivados)
+
+    cobranca = comandos.add_parser("cobranca", help="recalcula a lista de inadimplentes")
+    cobranca.add_argument("--carencia", type=int, default=backend.CARENCIA_DIAS,
+                          help="dias desde o último pagamento quitado")
+    cobranca.add_argument("--listar", action="store_true", help="mostra os inadimplentes encontrados")
+    cobranca.set_defaults(funcao=cmd_cobranca)
+
+    excluir = comandos.add_parser("excluir-membros",
+                                  help="exclui membros com os seus treinos, pagamentos e atividades")
+    excluir.add_argument("ids", type=int, nargs="+", metavar="ID")
+    excluir.set_defaults(funcao=cmd_excluir_membros)
+
+    orfaos = comandos.add_parser("limpar-orfaos", help="remove linhas de membros que não existem mais")
+    orfaos.add_argument("--simular", action="store_true", help="só conta, sem remover")
+    orfaos.add_argument("--compactar", action="store_true", help="executa VACUUM ao final")
+    orfaos.set_defaults(funcao=cmd_limpar_orfaos)
+
+    args = parser.parse_args()
+    backend.configurar_banco(args.banco)
+    if args.migrar:
+        backend.atualizar_esquema()
+    args.funcao(args)
+    backend.fechar_conexoes()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Métricas do backend: chamadas, latência e linhas devolvidas por função e os
+comandos SQL que cada uma emite (capturados pelos callbacks de trace e de
+progresso do sqlite3).
+
+Comandos mais lentos que `limite_lento_ms` entram no log de consultas lentas,
+com o plano de execução: as últimas ficam em memória e cada uma é enviada ao
+logger "academia.consultas_lentas".
+
+Variáveis de ambiente:
+    ACADEMIA_LIMITE_LENTO_MS  limite do log de consultas lentas (padrão 100)
+    ACADEMIA_RASTREAR_SQL     0 desliga a captura de SQL (mantém as métricas por função)
+    ACADEMIA_METRICAS         arquivo JSON onde as métricas são gravadas ao sair
+
+Uso:
+    python metricas.py metricas.json     # imprime o relatório de um arquivo gravado
+"""
+
+import atexit
+import bisect
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+
+# Limites superiores (ms) das faixas do histograma de latência
+FAIXAS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, float("inf"))
+# Instruções da VM do SQLite entre duas chamadas do callback de progresso
+INSTRUCOES_POR_PASSO = 1000
+LIMITE_LENTO_MS = float(os.environ.get("ACADEMIA_LIMITE_LENTO_MS", 100))
+RASTREAR_SQL = os.environ.get("ACADEMIA_RASTREAR_SQL", "1") != "0"
+ARQUIVO_METRICAS = os.environ.get("ACADEMIA_METRICAS")
+# Quantidade de consultas lentas mantidas em memória
+MAX_LENTAS = 100
+COMANDOS_COM_PLANO = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+log_lentas = logging.getLogger("academia.consultas_lentas")
+log_lentas.addHandler(logging.NullHandler())
+
+# Literais de texto e números, trocados por ? para agrupar comandos iguais
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalizar_sql(sql):
+    return " ".join(_LITERAIS.sub("?", sql).split())
+
+
+def _contar_linhas(resultado):
+    if hasattr(resultado, "linhas"):      # Pagina, Delta
+        return len(resultado.linhas)
+    if hasattr(resultado, "_fields"):     # um registro
+        return 1
+    if isinstance(resultado, list):
+        return len(resultado)
+    return 0
+
+
+def _faixa(i):
+    if FAIXAS_MS[i] == float("inf"):
+        return f">{FAIXAS_MS[i - 1]:g}ms"
+    return f"<={FAIXAS_MS[i]:g}ms"
+
+
+class Estatistica:
+    """Contadores e histograma de latência de uma função ou comando SQL"""
+
+    __slots__ = ("chamadas", "erros", "total_ms", "max_ms", "linhas", "comandos", "passos", "faixas")
+
+    def __init__(self):
+        self.chamadas = self.erros = self.linhas = self.comandos = self.passos = 0
+        self.total_ms = self.max_ms = 0.0
+        self.faixas = [0] * len(FAIXAS_MS)
+
+    def registrar(self, duracao_ms, linhas=0, comandos=0, passos=0, erro=False):
+        self.chamadas += 1
+        self.erros += erro
+        self.total_ms += duracao_ms
+        self.max_ms = max(self.max_ms, duracao_ms)
+        self.linhas += linhas
+        self.comandos += comandos
+        self.passos += passos
+        self.faixas[bisect.bisect_left(FAIXAS_MS, duracao_ms)] += 1
+
+    def _percentil(self, p):
+        # Aproximado pelo limite superior da faixa em que o percentil cai
+        alvo = p * self.chamadas
+        acumulado = 0
+        for limite, quantidade in zip(FAIXAS_MS, self.faixas):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                return min(limite, self.max_ms)
+        return self.max_ms
+
+    def como_dict(self):
+        return {
+            "chamadas": self.chamadas,
+            "erros": self.erros,
+            "total_ms": self.total_ms,
+            "media_ms": self.total_ms / self.chamadas if self.chamadas else 0.0,
+            "p50_ms": self._percentil(0.50),
+            "p95_ms": self._percentil(0.95),
+            "max_ms": self.max_ms,
+            "linhas": self.linhas,
+            "comandos_sql": self.comandos,
+            "passos_vm": self.passos * INSTRUCOES_POR_PASSO,
+            "histograma": {_faixa(i): quantidade for i, quantidade in enumerate(self.faixas) if quantidade},
+        }
+
+
+class _Quadro:
+    """Chamada instrumentada em andamento na thread atual"""
+
+    __slots__ = ("nome", "comandos", "aberto", "lentos")
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.comandos = 0
+        self.aberto = None     # (conexão, sql, início, passos no início)
+        self.lentos = []
+
+
+class Metricas:
+    """
+    Registro das métricas do processo.
+
+    `instrumentar` decora as funções do backend e `instalar` liga os callbacks
+    numa conexão nova. O tempo de um comando SQL vai do seu início até o início
+    do próximo (ou o fim da função), o que inclui a leitura das linhas.
+    """
+
+    def __init__(self, limite_lento_ms=LIMITE_LENTO_MS, rastrear_sql=RASTREAR_SQL, arquivo=None):
+        self.limite_lento_ms = limite_lento_ms
+        self.rastrear_sql = rastrear_sql
+        self._trava = threading.Lock()
+        self._local = threading.local()
+        self.zerar()
+        if arquivo:
+            atexit.register(self.salvar, arquivo)
+
+    def zerar(self):
+        with self._trava:
+            self._funcoes = {}
+            self._comandos = {}
+            self.lentas = deque(maxlen=MAX_LENTAS)
+            self._inicio = time.time()
+
+    def configurar(self, limite_lento_ms=None, rastrear_sql=None):
+        """`rastrear_sql` só vale para as conexões abertas depois da chamada"""
+        if limite_lento_ms is not None:
+            self.limite_lento_ms = limite_lento_ms
+        if rastrear_sql is not None:
+            self.rastrear_sql = rastrear_sql
+
+    def instalar(self, conn):
+        """Liga os callbacks de trace e de progresso na conexão"""
+        if not self.rastrear_sql:
+            return
+        conn.set_trace_callback(lambda sql: self._comando(conn, sql))
+        conn.set_progress_handler(self._passo, INSTRUCOES_POR_PASSO)
+
+    def _pilha(self):
+        local = self._local
+        if not hasattr(local, "pilha"):
+            local.pilha = []
+            local.passos = 0
+            local.explicando = False
+        return local.pilha
+
+    def _passo(self):
+        # Não pode levantar exceção: um retorno verdadeiro interromperia a consulta
+        local = self._local
+        local.passos = getattr(local, "passos", 0) + 1
+
+    def _comando(self, conn, sql):
+        local = self._local
+        pilha = getattr(local, "pilha", None)
+        # Fora de uma função instrumentada não há onde atribuir o comando
+        if not pilha or local.explicando or sql.startswith("--"):  # "--": comando interno do SQLite
+            return
+        quadro = pilha[-1]
+        aberto = quadro.aberto
+        if aberto is not None and aberto[1] == sql:
+            # Cada passo de gatilho é reportado com o texto do comando que o disparou
+            return
+        agora = time.perf_counter()
+        self._fechar_comando(quadro, agora)
+        quadro.aberto = (conn, sql, agora, local.passos)
+        quadro.comandos += 1
+
+    def _fechar_comando(self, quadro, fim):
+        if quadro.aberto is None:
+            return
+        conn, sql, inicio, passos = quadro.aberto
+        quadro.aberto = None
+        duracao = (fim - inicio) * 1000
+        passos = self._local.passos - passos
+        chave = normalizar_sql(sql)
+        with self._trava:
+            estatistica = self._comandos.get(chave)
+            if estatistica is None:
+                estatistica = self._comandos[chave] = Estatistica()
+            estatistica.registrar(duracao, passos=passos)
+        if duracao >= self.limite_lento_ms:
+            quadro.lentos.append((conn, sql, duracao, passos))
+
+    def instrumentar(self, funcao):
+        """Decorador que mede cada chamada de `funcao`"""
+        nome = funcao.__name__
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            pilha = self._pilha()
+            inicio = time.perf_counter()
+            if pilha:
+                # O comando em aberto da função externa termina aqui
+                self._fechar_comando(pilha[-1], inicio)
+            quadro = _Quadro(nome)
+            passos = self._local.passos
+            pilha.append(quadro)
+            resultado, erro = None, True
+            try:
+                resultado = funcao(*args, **kwargs)
+                erro = False
+                return resultado
+            finally:
+                fim = time.perf_counter()
+                self._fechar_comando(quadro, fim)
+                pilha.pop()
+                with self._trava:
+                    estatistica = self._funcoes.get(nome)
+                    if estatistica is None:
+                        estatistica = self._funcoes[nome] = Estatistica()
+                    estatistica.registrar((fim - inicio) * 1000, _contar_linhas(resultado),
+                                          quadro.comandos, self._local.passos - passos, erro)
+                if quadro.lentos:
+                    self._registrar_lentas(quadro)
+
+        return medida
+
+    def _plano(self, conn, sql):
+        if not sql.lstrip().upper().startswith(COMANDOS_COM_PLANO):
+            return []
+        self._local.explicando = True
+        try:
+            return [linha[3] for linha in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+        except sqlite3.Error as erro:
+            return [f"(plano indisponível: {erro})"]
+        finally:
+            self._local.explicando = False
+
+    def _registrar_lentas(self, quadro):
+        for conn, sql, duracao, passos in quadro.lentos:
+            entrada = {
+                "quando": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "funcao": quadro.nome,
+                "duracao_ms": duracao,
+                "passos_vm": passos * INSTRUCOES_POR_PASSO,
+                "sql": " ".join(sql.split())[:2000],
+                "plano": self._plano(conn, sql),
+            }
+            with self._trava:
+                self.lentas.append(entrada)
+            log_lentas.warning("%.1f ms em %s: %s | plano: %s", duracao, quadro.nome,
+                               entrada["sql"], "; ".join(entrada["plano"]))
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                "desde": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self._inicio)),
+                "limite_lento_ms": self.limite_lento_ms,
+                "funcoes": {nome: e.como_dict() for nome, e in self._funcoes.items()},
+                "comandos": {sql: e.como_dict() for sql, e in self._comandos.items()},
+                "lentas": list(self.lentas),
+            }
+
+    def salvar(self, caminho):
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(self.estatisticas(), arquivo, ensure_ascii=False, indent=2)
+
+    def relatorio(self):
+        return relatorio(self.estatisticas())
+
+
+def relatorio(dados, comandos=15):
+    """Formata as métricas (de estatisticas() ou de um JSON salvo) como texto"""
+    saida = [f"Métricas desde {dados['desde']}", "",
+             f"{'Função':<32}{'Chamadas':>9}{'Média ms':>10}{'p95 ms':>9}{'Máx ms':>10}"
+             f"{'Total ms':>11}{'Linhas':>10}{'SQL':>8}"]
+    funcoes = sorted(dados["funcoes"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    for nome, f in funcoes:
+        saida.append(f"{nome:<32}{f['chamadas']:>9}{f['media_ms']:>10.2f}{f['p95_ms']:>9.1f}{f['max_ms']:>10.1f}"
+                     f"{f['total_ms']:>11.1f}{f['linhas']:>10}{f['comandos_sql']:>8}")
+
+    saida += ["", f"Comandos SQL com maior tempo total (top {comandos}):"]
+    mais_caros = sorted(dados["comandos"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    for sql, c in mais_caros[:comandos]:
+        saida.append(f"  {c['total_ms']:>10.1f} ms {c['chamadas']:>7}x  média {c['media_ms']:.2f} ms  {sql[:120]}")
+
+    saida += ["", f"Consultas lentas (>= {dados['limite_lento_ms']:g} ms): {len(dados['lentas'])}"]
+    for lenta in reversed(dados["lentas"]):
+        saida.append(f"  {lenta['quando']}  {lenta['duracao_ms']:.1f} ms  {lenta['funcao']}")
+        saida.append(f"    {lenta['sql'][:200]}")
+        for detalhe in lenta["plano"]:
+            saida.append(f"    -> {detalhe}")
+    return "\n".join(saida)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__)
+        return 2
+    with open(sys.argv[1], encoding="utf-8") as arquivo:
+        print(relatorio(json.load(arquivo)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
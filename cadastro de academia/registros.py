@@ -0,0 +1,73 @@
+# coding: utf-8
+
+"""
+Tipos de registro devolvidos pelo backend.
+
+Cada tabela tem uma única lista de colunas, usada tanto para montar os SELECTs
+do backend quanto para criar o tipo do registro. Os registros são namedtuples
+(sem __dict__ por instância): ocupam o mesmo que uma tupla, continuam servindo
+como `values` de uma Treeview e permitem acesso por nome (membro.nome, treino.duracao).
+"""
+
+from collections import namedtuple
+
+
+def registro(nome, tabela, colunas):
+    """Cria o tipo de registro de `tabela`; os atributos são as colunas em minúsculas"""
+    tipo = namedtuple(nome, [coluna.lower() for coluna in colunas])
+    tipo.TABELA = tabela
+    tipo.COLUNAS = tuple(colunas)
+    tipo.SELECT = ", ".join(colunas)
+    return tipo
+
+
+Membro = registro("Membro", "Membros",
+                  ("ID", "Nome", "CPF", "Telefone", "Endereco", "Data_Cadastro"))
+# Colunas exibidas nas listagens de membros
+MembroLista = registro("MembroLista", "Membros", ("ID", "Nome", "CPF", "Telefone"))
+Treino = registro("Treino", "Treinos",
+                  ("ID", "ID_Membro", "Tipo", "Descricao", "Duracao", "Data_Inicio"))
+Pagamento = registro("Pagamento", "Pagamentos",
+                     ("ID", "ID_Membro", "Valor", "Data_Pagamento", "Status"))
+Atividade = registro("Atividade", "Historico_Atividades",
+                     ("ID", "ID_Membro", "Atividade", "Data", "Tempo_Execucao"))
+Funcionario = registro("Funcionario", "Funcionarios",
+                       ("ID", "Nome", "Cargo", "Login", "Senha"))
+ResumoReceita = registro("ResumoReceita", "Resumo_Receita",
+                         ("Mes", "Status", "Total", "Quantidade"))
+ResumoAtividade = registro("ResumoAtividade", "Resumo_Atividades",
+                           ("ID_Membro", "Data", "Minutos", "Quantidade"))
+# Agregado calculado (não corresponde a uma tabela)
+TotaisDia = namedtuple("TotaisDia", "membros minutos quantidade")
+# Alterações de uma tabela desde uma versão (ver backend.alteracoes_desde)
+Delta = namedtuple("Delta", "versao linhas excluidos")
+# Membro em atraso (ver backend.buscar_inadimplentes): colunas da listagem de
+# membros, último pagamento quitado, data de referência do atraso e dias
+Inadimplente = namedtuple("Inadimplente", MembroLista._fields + ("ultimo_pagamento", "referencia", "dias_atraso"))
+# Registros da federação de filiais (federacao.py): o nome da filial seguido
+# das colunas do registro de origem
+MembroFilial = namedtuple("MembroFilial", ("filial",) + Membro._fields)
+MembroListaFilial = namedtuple("MembroListaFilial", ("filial",) + MembroLista._fields)
+PagamentoFilial = namedtuple("PagamentoFilial", ("filial",) + Pagamento._fields)
+ReceitaFilial = namedtuple("ReceitaFilial", ("filial",) + ResumoReceita._fields)
+TotaisFilial = namedtuple("TotaisFilial", "filial membros pagamentos receita minutos_dia atividades_dia")
+
+TIPOS = (Membro, MembroLista, Treino, Pagamento, Atividade, Funcionario,
+         ResumoReceita, ResumoAtividade)
+
+
+def verificar_esquema(conn):
+    """
+    Confere se as colunas de cada tipo existem na tabela correspondente.
+    Retorna a lista de divergências (vazia quando tudo confere).
+    """
+    divergencias = []
+    for tipo in TIPOS:
+        existentes = {linha[1] for linha in conn.execute(f"PRAGMA table_info({tipo.TABELA})")}
+        if not existentes:
+            divergencias.append(f"{tipo.__name__}: tabela {tipo.TABELA} não existe")
+            continue
+        for coluna in tipo.COLUNAS:
+            if coluna not in existentes:
+                divergencias.append(f"{tipo.__name__}: coluna {tipo.TABELA}.{coluna} não existe")
+    return divergencias
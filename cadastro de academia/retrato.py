@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Retrato colunar do histórico de atividades, lido por mapeamento em memória.
+
+O histórico (tabela principal e meses arquivados) é gravado em arquivos
+binários de largura fixa, um por coluna: ID (int64), membro, dia desde
+1970-01-01 e minutos (int32), little-endian, cada um com um cabeçalho de
+CABECALHO_COLUNA bytes. As linhas ficam agrupadas por mês e o arquivo de
+índice guarda, além do total de linhas e do último ID exportado, onde começa
+e termina cada mês. O leitor mapeia as colunas com numpy.memmap: uma consulta
+por período devolve fatias dos mapas, sem copiar nem reler o banco.
+
+atualizar() traz só as atividades com ID maior que o último exportado. Se
+todas caem no último mês do retrato ou depois, são acrescentadas ao fim dos
+arquivos; se alguma é de um mês anterior, as colunas são regravadas numa nova
+geração de arquivos. Nos dois casos o índice é trocado por último (os.replace),
+então um leitor nunca vê linhas pela metade e uma atualização interrompida
+só precisa ser repetida. Só um processo deve atualizar o retrato por vez.
+As linhas lidas do banco passam por arquivos temporários, um por mês, e são
+ordenadas e gravadas mês a mês: a memória usada depende do maior mês.
+
+Atividades sem data válida ficam de fora (contadas no índice). Atividades de
+membros excluídos continuam no retrato até uma atualização --completo.
+
+Uso:
+    python retrato.py atualizar
+    python retrato.py info
+    python retrato.py periodo --inicio 2024-01-01 --fim 2024-03-31
+    python retrato.py membro 42 --inicio 2024-01-01
+"""
+
+import argparse
+import datetime
+import glob
+import os
+import shutil
+import struct
+import tempfile
+import time
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("retrato.py precisa do NumPy (pip install numpy)") from None
+
+import backend
+from backend import SEM_DATA, TAMANHO_BLOCO
+
+COLUNAS = (("id", "<i8"), ("membro", "<i4"), ("dia", "<i4"), ("minutos", "<i4"))
+
+# Cabeçalho de cada coluna: assinatura, tipo NumPy e nome (completado com \0)
+CABECALHO_COLUNA = 32
+_COLUNA = struct.Struct("<8s8s16s")
+_ASSINATURA_COLUNA = b"ACADCOL1"
+
+# Índice: assinatura, geração dos arquivos, meses, linhas, último ID exportado,
+# atividades sem data e hora da gravação; depois um registro por mês
+_INDICE = struct.Struct("<8sIIqqqd")
+_ASSINATURA_INDICE = b"ACADIDX1"
+_MES = np.dtype([("mes", "<i4"), ("reservado", "<i4"), ("inicio", "<i8"), ("fim", "<i8")])
+ARQUIVO_INDICE = "atividades.idx"
+
+Indice = namedtuple("Indice", "geracao linhas ultimo_id sem_data gerado_em meses")
+# Colunas de um trecho do retrato (arrays NumPy de mesmo tamanho)
+Fatia = namedtuple("Fatia", [nome for nome, _ in COLUNAS])
+
+
+def diretorio_padrao():
+    """Diretório do retrato, ao lado do banco principal"""
+    base, _ = os.path.splitext(os.path.abspath(backend.DATABASE_NAME))
+    return base + "_colunas"
+
+
+def _caminho_coluna(diretorio, nome, geracao):
+    return os.path.join(diretorio, f"{nome}.{geracao}.col")
+
+
+def _dia(data):
+    if isinstance(data, str):
+        data = datetime.date.fromisoformat(data[:10])
+    return (data - datetime.date(1970, 1, 1)).days
+
+
+def _mes_do_dia(dias):
+    """Mês (contado desde 1970-01) de cada dia"""
+    return np.asarray(dias, dtype="int64").astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def _texto_mes(mes):
+    return str(np.datetime64(int(mes), "M"))
+
+
+# --- Arquivos ---
+
+def ler_indice(diretorio):
+    """Indice do retrato em `diretorio` (None se ainda não existe)"""
+    caminho = os.path.join(diretorio, ARQUIVO_INDICE)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, "rb") as arquivo:
+        dados = arquivo.read()
+    assinatura, geracao, quantidade, linhas, ultimo_id, sem_data, gerado_em = _INDICE.unpack_from(dados)
+    if assinatura != _ASSINATURA_INDICE:
+        raise ValueError(f"{caminho} não é um índice de retrato")
+    meses = np.frombuffer(dados, dtype=_MES, count=quantidade, offset=_INDICE.size).copy()
+    return Indice(geracao, linhas, ultimo_id, sem_data, gerado_em, meses)
+
+
+def _gravar_indice(diretorio, indice):
+    caminho = os.path.join(diretorio, ARQUIVO_INDICE)
+    with open(caminho + ".parcial", "wb") as arquivo:
+        arquivo.write(_INDICE.pack(_ASSINATURA_INDICE, indice.geracao, len(indice.meses), indice.linhas,
+                                   indice.ultimo_id, indice.sem_data, indice.gerado_em))
+        arquivo.write(indice.meses.astype(_MES).tobytes())
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(caminho + ".parcial", caminho)
+
+
+class _Colunas:
+    """
+    Arquivos de coluna de uma geração abertos para gravação: novos (sem
+    `inicio`) ou continuando a partir da linha `inicio` dos existentes, com o
+    que houver depois dela descartado (sobra de uma atualização interrompida).
+    """
+
+    def __init__(self, diretorio, geracao, inicio=None):
+        self.linhas = inicio or 0
+        self._arquivos = []
+        for nome, tipo in COLUNAS:
+            arquivo = open(_caminho_coluna(diretorio, nome, geracao), "wb" if inicio is None else "r+b")
+            if inicio is None:
+                arquivo.write(_COLUNA.pack(_ASSINATURA_COLUNA, tipo.encode(), nome.encode()))
+            else:
+                arquivo.truncate(CABECALHO_COLUNA + inicio * np.dtype(tipo).itemsize)
+                arquivo.seek(0, os.SEEK_END)
+            self._arquivos.append(arquivo)
+
+    def gravar(self, linhas):
+        """Acrescenta linhas (matriz int64 de colunas id, membro, dia, minutos)"""
+        for posicao, ((_, tipo), arquivo) in enumerate(zip(COLUNAS, self._arquivos)):
+            arquivo.write(np.ascontiguousarray(linhas[:, posicao], dtype=tipo).tobytes())
+        self.linhas += len(linhas)
+
+    def fechar(self):
+        for arquivo in self._arquivos:
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+            arquivo.close()
+
+
+def _limpar_geracoes(diretorio, geracao):
+    """Apaga colunas de outras gerações (no Windows, só as que nenhum leitor mapeia)"""
+    atuais = {_caminho_coluna(diretorio, nome, geracao) for nome, _ in COLUNAS}
+    for caminho in glob.glob(os.path.join(diretorio, "*.col")):
+        if caminho not in atuais:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+
+# --- Exportação ---
+
+class _Particao:
+    """
+    Atividades novas separadas por mês em arquivos temporários (linhas int64
+    id, membro, dia, minutos), para que a exportação ordene e grave um mês
+    por vez em vez de juntar tudo em memória.
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.linhas = {}
+
+    def _caminho(self, mes):
+        return os.path.join(self.pasta, f"{mes}.bin")
+
+    def carregar(self, apos_id, tamanho_bloco):
+        """Distribui as atividades depois de `apos_id`; retorna (último ID visto, sem data)"""
+        ultimo_id, sem_data = apos_id, 0
+        for bloco in backend.iterar_duracoes("Historico_Atividades", apos_id, True, tamanho_bloco):
+            linhas = np.asarray(bloco, dtype=np.int64)
+            ultimo_id = max(ultimo_id, int(linhas[:, 0].max()))
+            validas = linhas[:, 2] != SEM_DATA
+            sem_data += int((~validas).sum())
+            linhas = linhas[validas]
+            mes = _mes_do_dia(linhas[:, 2])
+            ordem = np.argsort(mes, kind="stable")
+            linhas, mes = linhas[ordem], mes[ordem]
+            distintos, inicios = np.unique(mes, return_index=True)
+            for numero, inicio, fim in zip(distintos, inicios, list(inicios[1:]) + [len(mes)]):
+                with open(self._caminho(int(numero)), "ab") as arquivo:
+                    arquivo.write(linhas[inicio:fim].tobytes())
+                self.linhas[int(numero)] = self.linhas.get(int(numero), 0) + int(fim - inicio)
+        return ultimo_id, sem_data
+
+    def meses(self):
+        return sorted(self.linhas)
+
+    def ler(self, mes):
+        """Linhas do mês (matriz int64), ou uma matriz vazia"""
+        if mes not in self.linhas:
+            return np.empty((0, len(COLUNAS)), np.int64)
+        return np.fromfile(self._caminho(mes), dtype=np.int64).reshape(-1, len(COLUNAS))
+
+
+def _ordenar(linhas):
+    """Linhas ordenadas por dia e ID"""
+    return linhas[np.lexsort((linhas[:, 0], linhas[:, 2]))]
+
+
+def atualizar(diretorio=None, completo=False, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Cria ou atualiza o retrato e retorna (linhas exportadas agora, regravado),
+    onde `regravado` indica se as colunas foram reescritas numa nova geração.
+    `completo` descarta o retrato atual e exporta tudo de novo.
+
+    As atividades novas são lidas em blocos e separadas por mês em arquivos
+    temporários; depois cada mês é ordenado e gravado, então a memória usada
+    depende do maior mês, não do histórico inteiro.
+    """
+    diretorio = diretorio or diretorio_padrao()
+    os.makedirs(diretorio, exist_ok=True)
+    # Sobras de uma atualização interrompida
+    for pasta in glob.glob(os.path.join(diretorio, "particao-*")):
+        shutil.rmtree(pasta, ignore_errors=True)
+    indice = None if completo else ler_indice(diretorio)
+    with tempfile.TemporaryDirectory(prefix="particao-", dir=diretorio) as pasta:
+        particao = _Particao(pasta)
+        ultimo_id, sem_data = particao.carregar(indice.ultimo_id if indice else 0, tamanho_bloco)
+        novos = particao.meses()
+        exportadas = sum(particao.linhas.values())
+        agora = time.time()
+
+        if indice is not None and (not novos or not len(indice.meses) or novos[0] >= indice.meses["mes"][-1]):
+            # Tudo no último mês do retrato ou depois: acrescenta ao fim das colunas
+            meses = [tuple(registro) for registro in indice.meses]
+            colunas = _Colunas(diretorio, indice.geracao, inicio=indice.linhas)
+            try:
+                for mes in novos:
+                    inicio = colunas.linhas
+                    colunas.gravar(_ordenar(particao.ler(mes)))
+                    if meses and meses[-1][0] == mes:
+                        # Linhas do último mês do retrato vêm logo depois dele no arquivo
+                        meses[-1] = (mes, 0, meses[-1][2], colunas.linhas)
+                    else:
+                        meses.append((mes, 0, inicio, colunas.linhas))
+            finally:
+                colunas.fechar()
+            _gravar_indice(diretorio, Indice(indice.geracao, colunas.linhas, ultimo_id,
+                                             indice.sem_data + sem_data, agora, np.array(meses, dtype=_MES)))
+            return exportadas, False
+
+        # Primeira exportação, --completo ou atividades de meses já gravados:
+        # grava uma nova geração, mês a mês, juntando o retrato atual com as novas
+        if indice is not None:
+            geracao = indice.geracao + 1
+            atual = Retrato(diretorio)
+            antigos = {int(registro["mes"]): (int(registro["inicio"]), int(registro["fim"]))
+                       for registro in indice.meses}
+            sem_data += indice.sem_data
+        else:
+            geracao = max([1] + [int(caminho.rsplit(".", 2)[1]) + 1 for caminho in
+                                 glob.glob(os.path.join(diretorio, "*.col"))])
+            atual, antigos = None, {}
+        meses = []
+        colunas = _Colunas(diretorio, geracao)
+        try:
+            for mes in sorted(set(antigos) | set(novos)):
+                linhas = particao.ler(mes)
+                if mes in antigos:
+                    inicio, fim = antigos[mes]
+                    linhas = np.concatenate((np.column_stack([coluna[inicio:fim].astype(np.int64)
+                                                              for coluna in atual.colunas]), linhas))
+                inicio = colunas.linhas
+                colunas.gravar(_ordenar(linhas))
+                meses.append((mes, 0, inicio, colunas.linhas))
+        finally:
+            colunas.fechar()
+            if atual is not None:
+                atual.fechar()
+        _gravar_indice(diretorio, Indice(geracao, colunas.linhas, ultimo_id, sem_data, agora,
+                                         np.array(meses, dtype=_MES)))
+    _limpar_geracoes(diretorio, geracao)
+    return exportadas, True
+
+
+# --- Leitura ---
+
+class Retrato:
+    """
+    Leitor do retrato: as colunas ficam mapeadas em memória e as consultas
+    devolvem Fatias. Trechos de meses inteiros são fatias dos próprios mapas
+    (sem cópia); filtros por dia ou membro copiam só as linhas selecionadas.
+    """
+
+    def __init__(self, diretorio=None):
+        self.diretorio = diretorio or diretorio_padrao()
+        self.indice = ler_indice(self.diretorio)
+        if self.indice is None:
+            raise FileNotFoundError(f"Nenhum retrato em {self.diretorio}; rode 'python retrato.py atualizar'")
+        self.colunas = Fatia(*(self._mapear(nome, tipo) for nome, tipo in COLUNAS))
+
+    def _mapear(self, nome, tipo):
+        caminho = _caminho_coluna(self.diretorio, nome, self.indice.geracao)
+        with open(caminho, "rb") as arquivo:
+            assinatura, gravado, _ = _COLUNA.unpack(arquivo.read(_COLUNA.size))
+        if assinatura != _ASSINATURA_COLUNA or gravado.rstrip(b"\0").decode() != tipo:
+            raise ValueError(f"{caminho} não é a coluna {nome} ({tipo}) de um retrato")
+        if not self.indice.linhas:
+            return np.empty(0, tipo)
+        # Linhas além das do índice (atualização em andamento) ficam de fora
+        return np.memmap(caminho, dtype=tipo, mode="r", offset=CABECALHO_COLUNA, shape=(self.indice.linhas,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def fechar(self):
+        """Libera os mapas (necessário no Windows antes de regravar o retrato)"""
+        self.colunas = None
+
+    def __len__(self):
+        return self.indice.linhas
+
+    def meses(self):
+        """{"AAAA-MM": linhas} dos meses do retrato"""
+        return {_texto_mes(registro["mes"]): int(registro["fim"] - registro["inicio"])
+                for registro in self.indice.meses}
+
+    def _linhas_dos_meses(self, inicio, fim):
+        """Intervalo [primeira, última) das linhas dos meses que cobrem o período"""
+        meses = self.indice.meses
+        primeiro = 0 if inicio is None else np.searchsorted(meses["mes"], _mes_do_dia([inicio])[0], "left")
+        ultimo = len(meses) if fim is None else np.searchsorted(meses["mes"], _mes_do_dia([fim])[0], "right")
+        if primeiro >= ultimo:
+            return 0, 0
+        return int(meses["inicio"][primeiro]), int(meses["fim"][ultimo - 1])
+
+    def periodo(self, inicio=None, fim=None):
+        """Atividades do período (datas inclusivas; date ou AAAA-MM-DD)"""
+        return self._consultar(None, inicio, fim)
+
+    def membro(self, id_membro, inicio=None, fim=None):
+        """Atividades do membro no período; só a coluna de membros é lida por inteiro"""
+        return self._consultar(id_membro, inicio, fim)
+
+    def _consultar(self, id_membro, inicio, fim):
+        inicio = _dia(inicio) if inicio is not None else None
+        fim = _dia(fim) if fim is not None else None
+        primeira, ultima = self._linhas_dos_meses(inicio, fim)
+        trecho = Fatia(*(coluna[primeira:ultima] for coluna in self.colunas))
+        selecao = None
+        if id_membro is not None:
+            selecao = trecho.membro == id_membro
+        # Os meses das pontas podem ter dias fora do período
+        for limite, comparar in ((inicio, np.greater_equal), (fim, np.less_equal)):
+            if limite is None:
+                continue
+            ponta = comparar(trecho.dia, limite)
+            if selecao is None and ponta.all():
+                continue
+            selecao = ponta if selecao is None else selecao & ponta
+        if selecao is None:
+            return trecho
+        posicoes = np.flatnonzero(selecao)
+        return Fatia(*(coluna[posicoes] for coluna in trecho))
+
+
+def main():
+    comuns = argparse.ArgumentParser(add_help=False)
+    comuns.add_argument("--banco", default=backend.DATABASE_NAME, help="arquivo do banco de dados")
+    comuns.add_argument("--diretorio", help="pasta do retrato (padrão: <banco>_colunas)")
+    datas = argparse.ArgumentParser(add_help=False)
+    datas.add_argument("--inicio", help="data inicial (AAAA-MM-DD, inclusiva)")
+    datas.add_argument("--fim", help="data final (AAAA-MM-DD, inclusiva)")
+    parser = argparse.ArgumentParser(description="Retrato colunar do histórico de atividades")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    exportar = comandos.add_parser("atualizar", parents=[comuns], help="exporta as atividades novas")
+    exportar.add_argument("--completo", action="store_true", help="regrava o retrato inteiro")
+    comandos.add_parser("info", parents=[comuns], help="linhas, último ID e meses do retrato")
+    comandos.add_parser("periodo", parents=[comuns, datas], help="totais do período")
+    membro = comandos.add_parser("membro", parents=[comuns, datas], help="atividades de um membro")
+    membro.add_argument("id_membro", type=int)
+    args = parser.parse_args()
+
+    backend.configurar_banco(args.banco)
+    if args.comando == "atualizar":
+        backend.atualizar_esquema()
+        inicio = time.perf_counter()
+        linhas, regravado = atualizar(args.diretorio, args.completo)
+        print(f"{linhas} atividades exportadas em {time.perf_counter() - inicio:.2f} s"
+              + (" (colunas regravadas)" if regravado else ""))
+        backend.fechar_conexoes()
+        return
+    with Retrato(args.diretorio) as retrato:
+        if args.comando == "info":
+            indice = retrato.indice
+            print(f"{indice.linhas} atividades até o ID {indice.ultimo_id}, geração {indice.geracao}, "
+                  f"{indice.sem_data} sem data; gravado em "
+                  f"{datetime.datetime.fromtimestamp(indice.gerado_em):%Y-%m-%d %H:%M:%S}")
+            for mes, linhas in retrato.meses().items():
+                print(f"  {mes}  {linhas:>10}")
+        elif args.comando == "periodo":
+            fatia = retrato.periodo(args.inicio, args.fim)
+            print(f"{len(fatia.id)} atividades, {int(fatia.minutos.sum())} minutos, "
+                  f"{len(np.unique(fatia.membro))} membros")
+        else:
+            fatia = retrato.membro(args.id_membro, args.inicio, args.fim)
+            for id_atividade, dia, minutos in zip(fatia.id, fatia.dia, fatia.minutos):
+                print(f"{id_atividade:>10}  {np.datetime64(int(dia), 'D')}  {minutos:>5} min")
+            print(f"{len(fatia.id)} atividades, {int(fatia.minutos.sum())} minutos")
+
+
+if __name__ == "__main__":
+    main()
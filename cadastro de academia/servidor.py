@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Servidor HTTP/JSON do backend, para terminais que não acessam o academia.db
+diretamente. Usa só a biblioteca padrão.
+
+As requisições são atendidas por um pool fixo de threads; como o backend
+mantém uma conexão por thread, o pool é também o pool de conexões. As
+gravações passam por uma trava única (o SQLite aceita um escritor por vez).
+
+Listagens são paginadas por cursor (`apos`/`antes` vêm de `cursor_fim`/
+`cursor_inicio` da resposta anterior) e todo GET devolve um ETag: com
+If-None-Match igual, a resposta é 304 sem corpo. Para membros, treinos e
+pagamentos o ETag é a versão da tabela no registro de alterações, então o
+304 sai sem executar a consulta.
+
+Rotas (todas exigem "Authorization: Bearer <token>", exceto /login e /saude):
+    POST /login                       {"login", "senha"} -> {"token", "funcionario"}
+    GET  /membros?busca=&apos=&antes=&limite=&ordem=&desc=
+    GET|PUT|DELETE /membros/<id>      POST /membros
+    POST /membros/exclusao            {"ids": [...]} -> linhas excluídas por tabela
+    GET  /treinos?id_membro=&...      GET|PUT|DELETE /treinos/<id>      POST /treinos
+    GET  /pagamentos?id_membro=&...   POST /pagamentos
+    GET  /atividades?id_membro=&...   POST /atividades
+    GET  /resumos/receita?inicio=&fim=
+    GET  /resumos/atividades?data=    GET /resumos/atividades?id_membro=&inicio=&fim=
+
+Uso:
+    python servidor.py --porta 8080 --trabalhadores 16
+"""
+
+import argparse
+import base64
+import hashlib
+import http.server
+import json
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import backend
+
+LIMITE_MAXIMO = 500
+TAMANHO_MAXIMO_CORPO = 1024 * 1024
+DURACAO_SESSAO = 8 * 3600
+
+
+class ErroHttp(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+# --- Conversões ---
+
+def _registro(registro):
+    return registro._asdict() if registro is not None else None
+
+
+def _codificar_cursor(cursor):
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode().rstrip("=")
+
+
+def _decodificar_cursor(texto):
+    """Cursor (valor_ordem, ID) de uma listagem; qualquer outra forma é um 400"""
+    if not texto:
+        return None
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4)))
+    except ValueError:
+        raise ErroHttp(400, "Cursor inválido.")
+    if not (isinstance(cursor, list) and len(cursor) == 2
+            and (cursor[0] is None or type(cursor[0]) in (str, int, float))
+            and type(cursor[1]) is int):
+        raise ErroHttp(400, "Cursor inválido.")
+    return tuple(cursor)
+
+
+def _pagina(pagina):
+    return {
+        "itens": [_registro(linha) for linha in pagina.linhas],
+        "cursor_inicio": _codificar_cursor(pagina.cursor_inicio),
+        "cursor_fim": _codificar_cursor(pagina.cursor_fim),
+        "tem_anterior": pagina.tem_anterior,
+        "tem_proxima": pagina.tem_proxima,
+    }
+
+
+def _inteiro(valor, nome):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ErroHttp(400, f"{nome} deve ser um número inteiro.")
+
+
+def _limite(consulta, padrao):
+    """Parâmetro `limite` da query string, entre 1 e LIMITE_MAXIMO"""
+    limite = _inteiro(consulta.get("limite", padrao), "limite")
+    if limite < 1:
+        raise ErroHttp(400, "limite deve ser maior que zero.")
+    return min(LIMITE_MAXIMO, limite)
+
+
+def _campos(corpo, *nomes):
+    faltando = [nome for nome in nomes if corpo.get(nome) in (None, "")]
+    if faltando:
+        raise ErroHttp(400, "Campos obrigatórios: " + ", ".join(faltando))
+    return [corpo[nome] for nome in nomes]
+
+
+def _paginacao(consulta, ordem_padrao, descendente_padrao):
+    """Argumentos das funções *_pagina a partir da query string"""
+    return dict(
+        apos=_decodificar_cursor(consulta.get("apos")),
+        antes=_decodificar_cursor(consulta.get("antes")),
+        limite=_limite(consulta, backend.TAMANHO_PAGINA),
+        ordem=consulta.get("ordem", ordem_padrao),
+        descendente=consulta["desc"] == "1" if "desc" in consulta else descendente_padrao,
+    )
+
+
+# --- Sessões ---
+
+class Sessoes:
+    """Tokens emitidos no /login, válidos por DURACAO_SESSAO segundos"""
+
+    def __init__(self):
+        self._tokens = {}
+        self._trava = threading.Lock()
+
+    def criar(self, funcionario):
+        token = secrets.token_urlsafe(24)
+        with self._trava:
+            agora = time.monotonic()
+            # Aproveita o login para descartar sessões vencidas
+            self._tokens = {t: s for t, s in self._tokens.items() if s[1] > agora}
+            self._tokens[token] = (funcionario, agora + DURACAO_SESSAO)
+        return token
+
+    def validar(self, token):
+        with self._trava:
+            sessao = self._tokens.get(token)
+        if sessao is None or sessao[1] <= time.monotonic():
+            return None
+        return sessao[0]
+
+
+sessoes = Sessoes()
+_trava_escrita = threading.Lock()
+
+
+def escrita(funcao, *args):
+    with _trava_escrita:
+        return funcao(*args)
+
+
+# --- Rotas ---
+# Cada rota recebe (grupos da URL, query string, corpo JSON) e devolve
+# (status, objeto). `tabela` indica o ETag pela versão da tabela.
+
+def login(_, __, corpo):
+    login, senha = _campos(corpo, "login", "senha")
+    funcionario = backend.buscar_funcionario_login(login)
+    if not funcionario or not backend.verificar_senha(senha, funcionario.senha):
+        raise ErroHttp(401, "Login ou senha inválido.")
+    dados = {"id": funcionario.id, "nome": funcionario.nome, "cargo": funcionario.cargo,
+             "login": funcionario.login}
+    return 200, {"token": sessoes.criar(dados), "funcionario": dados}
+
+
+def saude(_, __, ___):
+    return 200, {"ok": True}
+
+
+def listar_membros(_, consulta, __):
+    if consulta.get("busca"):
+        limite = _limite(consulta, 20)
+        return 200, {"itens": [_registro(m) for m in backend.buscar_membros(consulta["busca"], limite)]}
+    return 200, _pagina(backend.listar_membros_pagina(**_paginacao(consulta, "Nome", False)))
+
+
+def obter_membro(grupos, _, __):
+    membro = backend.buscar_membro_id(_inteiro(grupos[0], "id"))
+    if membro is None:
+        raise ErroHttp(404, "Membro não encontrado.")
+    return 200, _registro(membro)
+
+
+def criar_membro(_, __, corpo):
+    nome, cpf = _campos(corpo, "nome", "cpf")
+    id_membro = escrita(backend.inserir_membro, nome, cpf, corpo.get("telefone"), corpo.get("endereco"),
+                        corpo.get("data_cadastro") or time.strftime("%Y-%m-%d"))
+    if id_membro is None:
+        raise ErroHttp(409, "CPF já cadastrado.")
+    return 201, _registro(backend.buscar_membro_id(id_membro))
+
+
+def alterar_membro(grupos, consulta, corpo):
+    id_membro = _inteiro(grupos[0], "id")
+    obter_membro(grupos, consulta, corpo)
+    nome, cpf = _campos(corpo, "nome", "cpf")
+    if not escrita(backend.atualizar_membro, id_membro, nome, cpf, corpo.get("telefone"), corpo.get("endereco")):
+        raise ErroHttp(409, "CPF já cadastrado em outro membro.")
+    return 200, _registro(backend.buscar_membro_id(id_membro))
+
+
+def remover_membro(grupos, _, __):
+    escrita(backend.excluir_membro, _inteiro(grupos[0], "id"))
+    return 204, None
+
+
+def remover_membros(_, __, corpo):
+    ids, = _campos(corpo, "ids")
+    if not isinstance(ids, list):
+        raise ErroHttp(400, "ids deve ser uma lista.")
+    excluidas = escrita(backend.excluir_membros, [_inteiro(i, "ids") for i in ids])
+    return 200, {"excluidas": excluidas}
+
+
+def listar_treinos(_, consulta, __):
+    id_membro = _inteiro(consulta["id_membro"], "id_membro") if "id_membro" in consulta else None
+    return 200, _pagina(backend.listar_treinos_pagina(id_membro, **_paginacao(consulta, "Data_Inicio", True)))
+
+
+def obter_treino(grupos, _, __):
+    treino = backend.buscar_treino_id(_inteiro(grupos[0], "id"))
+    if treino is None:
+        raise ErroHttp(404, "Treino não encontrado.")
+    return 200, _registro(treino)
+
+
+def _dados_treino(corpo):
+    id_membro, tipo, data_inicio = _campos(corpo, "id_membro", "tipo", "data_inicio")
+    duracao = corpo.get("duracao")
+    return (_inteiro(id_membro, "id_membro"), tipo, corpo.get("descricao"),
+            _inteiro(duracao, "duracao") if duracao not in (None, "") else None, data_inicio)
+
+
+def criar_treino(_, __, corpo):
+    id_treino = escrita(backend.inserir_treino, *_dados_treino(corpo))
+    return 201, _registro(backend.buscar_treino_id(id_treino))
+
+
+def alterar_treino(grupos, consulta, corpo):
+    id_treino = _inteiro(grupos[0], "id")
+    obter_treino(grupos, consulta, corpo)
+    escrita(backend.atualizar_treino, id_treino, *_dados_treino(corpo))
+    return 200, _registro(backend.buscar_treino_id(id_treino))
+
+
+def remover_treino(grupos, _, __):
+    escrita(backend.excluir_treino, _inteiro(grupos[0], "id"))
+    return 204, None
+
+
+def listar_pagamentos(_, consulta, __):
+    id_membro = _inteiro(consulta["id_membro"], "id_membro") if "id_membro" in consulta else None
+    return 200, _pagina(backend.listar_pagamentos_pagina(
+        id_membro, **_paginacao(consulta, "Data_Pagamento", True)))
+
+
+def criar_pagamento(_, __, corpo):
+    id_membro, valor = _campos(corpo, "id_membro", "valor")
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        raise ErroHttp(400, "valor deve ser numérico.")
+    id_pagamento = escrita(backend.inserir_pagamento, _inteiro(id_membro, "id_membro"), valor,
+                           corpo.get("data_pagamento") or time.strftime("%Y-%m-%d"),
+                           corpo.get("status") or "Pago")
+    return 201, {"id": id_pagamento}
+
+
+def listar_atividades(_, consulta, __):
+    if "id_membro" in consulta:
+        atividades = backend.listar_atividades(_inteiro(consulta["id_membro"], "id_membro"))
+        return 200, {"itens": [_registro(a) for a in atividades]}
+    return 200, _pagina(backend.listar_historico_pagina(**_paginacao(consulta, "Data", True)))
+
+
+def criar_atividade(_, __, corpo):
+    id_membro, atividade = _campos(corpo, "id_membro", "atividade")
+    tempo = corpo.get("tempo_execucao")
+    id_atividade = escrita(backend.inserir_atividade, _inteiro(id_membro, "id_membro"), atividade,
+                           corpo.get("data") or time.strftime("%Y-%m-%d %H:%M"),
+                           _inteiro(tempo, "tempo_execucao") if tempo not in (None, "") else 0)
+    return 201, {"id": id_atividade}
+
+
+def resumo_receita(_, consulta, __):
+    linhas = backend.resumo_receita(consulta.get("inicio", ""), consulta.get("fim", "\uffff"))
+    return 200, {"itens": [_registro(r) for r in linhas]}
+
+
+def resumo_atividades(_, consulta, __):
+    if "id_membro" in consulta:
+        linhas = backend.resumo_atividades_membro(_inteiro(consulta["id_membro"], "id_membro"),
+                                                  consulta.get("inicio", ""), consulta.get("fim", "\uffff"))
+        return 200, {"itens": [_registro(r) for r in linhas]}
+    return 200, _registro(backend.resumo_atividades_dia(consulta.get("data") or time.strftime("%Y-%m-%d")))
+
+
+# (método, caminho, função, tabela versionada, exige login)
+ROTAS = [
+    ("POST", r"/login", login, None, False),
+    ("GET", r"/saude", saude, None, False),
+    ("GET", r"/membros", listar_membros, "Membros", True),
+    ("POST", r"/membros", criar_membro, None, True),
+    ("GET", r"/membros/(\d+)", obter_membro, "Membros", True),
+    ("PUT", r"/membros/(\d+)", alterar_membro, None, True),
+    ("DELETE", r"/membros/(\d+)", remover_membro, None, True),
+    ("POST", r"/membros/exclusao", remover_membros, None, True),
+    ("GET", r"/treinos", listar_treinos, "Treinos", True),
+    ("POST", r"/treinos", criar_treino, None, True),
+    ("GET", r"/treinos/(\d+)", obter_treino, "Treinos", True),
+    ("PUT", r"/treinos/(\d+)", alterar_treino, None, True),
+    ("DELETE", r"/treinos/(\d+)", remover_treino, None, True),
+    ("GET", r"/pagamentos", listar_pagamentos, "Pagamentos", True),
+    ("POST", r"/pagamentos", criar_pagamento, None, True),
+    ("GET", r"/atividades", listar_atividades, None, True),
+    ("POST", r"/atividades", criar_atividade, None, True),
+    ("GET", r"/resumos/receita", resumo_receita, None, True),
+    ("GET", r"/resumos/atividades", resumo_atividades, None, True),
+]
+ROTAS = [(metodo, re.compile(caminho + "/?$"), funcao, tabela, protegida)
+         for metodo, caminho, funcao, tabela, protegida in ROTAS]
+
+
+class Manipulador(http.server.BaseHTTPRequestHandler):
+    server_version = "Academia/1.0"
+    # HTTP/1.0: cada conexão atende uma requisição e libera a thread do pool
+    protocol_version = "HTTP/1.0"
+
+    def do_GET(self):
+        self._atender("GET")
+
+    def do_POST(self):
+        self._atender("POST")
+
+    def do_PUT(self):
+        self._atender("PUT")
+
+    def do_DELETE(self):
+        self._atender("DELETE")
+
+    def log_message(self, formato, *args):
+        if not self.server.silencioso:
+            super().log_message(formato, *args)
+
+    def _rota(self, metodo, caminho):
+        metodos = []
+        for metodo_rota, padrao, funcao, tabela, protegida in ROTAS:
+            encontrado = padrao.match(caminho)
+            if encontrado:
+                if metodo_rota == metodo:
+                    return encontrado.groups(), funcao, tabela, protegida
+                metodos.append(metodo_rota)
+        if metodos:
+            raise ErroHttp(405, "Método não permitido.")
+        raise ErroHttp(404, "Rota não encontrada.")
+
+    def _corpo(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if tamanho > TAMANHO_MAXIMO_CORPO:
+            raise ErroHttp(413, "Corpo da requisição grande demais.")
+        if not tamanho:
+            return {}
+        try:
+            corpo = json.loads(self.rfile.read(tamanho))
+        except ValueError:
+            raise ErroHttp(400, "JSON inválido.")
+        if not isinstance(corpo, dict):
+            raise ErroHttp(400, "O corpo deve ser um objeto JSON.")
+        return corpo
+
+    def _atender(self, metodo):
+        url = urlsplit(self.path)
+        consulta = {chave: valores[-1] for chave, valores in parse_qs(url.query).items()}
+        try:
+            grupos, funcao, tabela, protegida = self._rota(metodo, url.path)
+            if protegida:
+                autorizacao = self.headers.get("Authorization", "")
+                if not autorizacao.startswith("Bearer ") or sessoes.validar(autorizacao[7:]) is None:
+                    raise ErroHttp(401, "Faça login para continuar.")
+            corpo = self._corpo() if metodo in ("POST", "PUT") else {}
+
+            etag = None
+            if tabela:
+                # A versão é lida antes da consulta: se algo mudar no meio, a
+                # próxima requisição recebe um ETag novo de qualquer forma
+                etag = f'"{tabela.lower()}-{backend.versao_alteracoes(tabela)}"'
+                if self._nao_modificado(etag):
+                    return
+            status, objeto = funcao(grupos, consulta, corpo)
+        except ErroHttp as erro:
+            status, objeto, etag = erro.status, {"erro": erro.mensagem}, None
+        except ValueError as erro:
+            status, objeto, etag = 400, {"erro": str(erro)}, None
+        except sqlite3.IntegrityError as erro:
+            status, objeto, etag = 409, {"erro": str(erro)}, None
+        except Exception as erro:
+            self.log_error("Erro em %s %s: %r", metodo, self.path, erro)
+            status, objeto, etag = 500, {"erro": "Erro interno."}, None
+
+        dados = b"" if objeto is None else json.dumps(objeto, ensure_ascii=False).encode("utf-8")
+        if metodo == "GET" and status == 200 and etag is None:
+            etag = '"' + hashlib.sha1(dados).hexdigest()[:20] + '"'
+            if self._nao_modificado(etag):
+                return
+        self.send_response(status)
+        if dados:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        if etag and status == 200:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _nao_modificado(self, etag):
+        pedidos = self.headers.get("If-None-Match")
+        if pedidos and (pedidos.strip() == "*" or etag in [p.strip() for p in pedidos.split(",")]):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return True
+        return False
+
+
+class ServidorAcademia(http.server.HTTPServer):
+    """HTTPServer que atende cada conexão num pool fixo de threads"""
+
+    # Fila de conexões aguardando accept; o padrão (5) recusa picos de terminais
+    request_queue_size = 128
+
+    def __init__(self, endereco, trabalhadores=16, silencioso=False):
+        super().__init__(endereco, Manipulador)
+        self.silencioso = silencioso
+        self._pool = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="http")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._atender, request, client_address)
+
+    def _atender(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP/JSON da academia")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8080)
+    parser.add_argument("--trabalhadores", type=int, default=16, help="threads (e conexões) do pool")
+    parser.add_argument("--banco", default=backend.DATABASE_NAME, help="arquivo do banco de dados")
+    parser.add_argument("--silencioso", action="store_true", help="não registra cada requisição")
+    args = parser.parse_args()
+
+    backend.configurar_banco(args.banco)
+    backend.atualizar_esquema()
+    servidor = ServidorAcademia((args.host, args.porta), args.trabalhadores, args.silencioso)
+    print(f"Servidor da academia em http://{args.host}:{args.porta}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        backend.fechar_conexoes()
+
+
+if __name__ == "__main__":
+    main()
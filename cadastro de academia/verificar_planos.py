@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Verificação dos planos de consulta do backend.
+
+Executa as funções de leitura do backend contra um banco temporário (as
+listagens paginadas em todas as combinações de parâmetros), captura cada
+SELECT emitido e roda EXPLAIN QUERY PLAN sobre ele. O
+script termina com código 1 se alguma consulta fizer varredura completa
+de tabela (SCAN sem índice) ou ordenação em B-tree temporária, ou se algum
+tipo de registro (registros.py) citar uma coluna que não existe no esquema.
+
+Uso:
+    python verificar_planos.py
+"""
+
+import contextlib
+import datetime
+import functools
+import io
+import itertools
+import os
+import re
+import sys
+import tempfile
+
+import backend
+from registros import verificar_esquema
+
+# Funções do backend que leem o banco e os argumentos usados para exercitá-las
+CHAMADAS = [
+    (backend.listar_membros, ()),
+    (backend.buscar_membro_id, (1,)),
+    (backend.listar_treinos, ()),
+    (backend.listar_treinos, (1,)),
+    (backend.buscar_treino_id, (1,)),
+    (backend.listar_pagamentos, ()),
+    (backend.listar_pagamentos, (1,)),
+    (backend.listar_atividades, (1,)),
+    (backend.listar_historico_atividades, ()),
+    (backend.listar_atividades, (1, "2024-01-01", "2024-12-31")),
+    (backend.buscar_funcionario_login, ("admin",)),
+    (backend.buscar_membros, ("ana",)),
+    (backend.buscar_membros, ("an",)),
+    (backend.contar_historico_atividades, ()),
+    (backend.cursor_historico_posicao, (10,)),
+    (backend.resumo_receita, ()),
+    (backend.resumo_receita, ("2024-01", "2024-12")),
+    (backend.resumo_atividades_membro, (1,)),
+    (backend.resumo_atividades_dia, ("2024-01-01",)),
+    (backend.inserir_membros_lote, ([("Plano", "000.000.000-00", "", "", "2024-01-01")],)),
+    (backend.versao_alteracoes, ()),
+    (backend.versao_alteracoes, ("Membros",)),
+    (backend.alteracoes_desde, ("Membros", 0)),
+    (backend.buscar_inadimplentes, ()),
+    (backend.listar_inadimplentes, ()),
+    (backend.ids_inadimplentes, ()),
+    # Leituras em fluxo: o gerador só executa a consulta ao ser consumido
+    (lambda *args: list(backend.iterar_pagamentos(*args)), ()),
+    (lambda *args: list(backend.iterar_pagamentos(*args)), (1, "2024-01-01", "2024-12-31")),
+    (lambda *args: list(backend.iterar_treinos(*args)), (None, "2024-01-01", "2024-12-31")),
+    (lambda *args: list(backend.iterar_atividades(*args)), ()),
+    (lambda *args: list(backend.iterar_atividades(*args)), (1, "2024-01-01")),
+    (lambda *args: list(backend.iterar_duracoes(*args)), ("Treinos",)),
+    (lambda *args: list(backend.iterar_duracoes(*args)), ("Historico_Atividades", 100)),
+    (backend.ler_duracoes, ("Treinos", [1, 2])),
+    # Com MESES_ARQUIVADOS meses no arquivo, mais que os anexos de uma conexão
+    (lambda *args: list(backend.iterar_duracoes(*args)), ("Historico_Atividades", 0, True)),
+    (lambda *args: list(backend.iterar_atividades(*args)), ()),
+]
+
+# Listagens paginadas: (função, tabela, aceita id_membro). São exercitadas em
+# todas as combinações de ordenação, direção, filtro por membro e cursor,
+# inclusive cursores sobre linhas sem valor na coluna de ordenação (NULL)
+PAGINADAS = (
+    (backend.listar_membros_pagina, "Membros", False),
+    (backend.listar_treinos_pagina, "Treinos", True),
+    (backend.listar_pagamentos_pagina, "Pagamentos", True),
+    (backend.listar_historico_pagina, "Historico_Atividades", False),
+)
+CURSORES = ({}, {"apos": ("2024-01-01", 1)}, {"antes": ("2024-01-01", 1)},
+            {"apos": (None, 1)}, {"antes": (None, 1)})
+
+# Consultas aceitas apesar do SCAN: a primeira página em ordem de ID percorre
+# a tabela na ordem do rowid e para no LIMIT; o catálogo do arquivo (uma linha
+# por mês, WITHOUT ROWID) é lido inteiro na ordem da chave primária
+PERMITIDAS = (
+    re.compile(r"^SELECT [\w, ]+ FROM (\w+) ORDER BY ID (ASC|DESC) LIMIT \d+$"),
+    re.compile(r"^SELECT Mes, Arquivo, Linhas FROM Atividades_Arquivadas ORDER BY Mes$"),
+)
+
+
+def chamadas_paginadas():
+    """Uma chamada para cada combinação de parâmetros das listagens paginadas"""
+    chamadas = []
+    for funcao, tabela, por_membro in PAGINADAS:
+        filtros = ({}, {"id_membro": 1}) if por_membro else ({},)
+        for ordem, descendente, filtro, cursor in itertools.product(
+                backend.ORDENACOES[tabela], (False, True), filtros, CURSORES):
+            chamadas.append((functools.partial(funcao, ordem=ordem, descendente=descendente,
+                                               **filtro, **cursor), ()))
+    return chamadas
+
+
+# Meses arquivados no banco de teste: acima de LIMITE_ANEXOS, para que as
+# leituras do arquivo precisem desanexar e reanexar meses
+MESES_ARQUIVADOS = 12
+_MES_ANEXADO = re.compile(r"\barq_(\d{4}_\d{2})\.")
+
+
+def arquivar_meses(quantidade=MESES_ARQUIVADOS):
+    """Cria `quantidade` meses de atividades (a partir de 2020-01) e os arquiva"""
+    backend.inserir_membros_lote([("Arquivo", "arquivo", "", "", "2020-01-01")])
+    backend.inserir_atividades_lote([(1, "Plano", f"{2020 + mes // 12}-{mes % 12 + 1:02d}-15", 30)
+                                     for mes in range(quantidade)])
+    with contextlib.redirect_stdout(io.StringIO()):
+        return backend.arquivar_atividades(hoje=datetime.date(2020 + quantidade // 12 + 2, 1, 1))
+
+
+def capturar_consultas(chamadas=None):
+    """Executa as chamadas e devolve os SELECTs emitidos, na ordem, sem repetição"""
+    if chamadas is None:
+        chamadas = CHAMADAS + chamadas_paginadas()
+    consultas = []
+    conn = backend.obter_conexao()
+
+    def registrar(sql):
+        sql = sql.strip()
+        if sql.upper().startswith("SELECT") and sql not in consultas:
+            consultas.append(sql)
+
+    conn.set_trace_callback(registrar)
+    try:
+        for funcao, args in chamadas:
+            funcao(*args)
+    finally:
+        conn.set_trace_callback(None)
+        backend.metricas.instalar(conn)
+    return consultas
+
+
+def plano(sql):
+    """Retorna as linhas de detalhe de EXPLAIN QUERY PLAN para a consulta"""
+    # Meses arquivados citados pela consulta podem ter sido desanexados depois dela
+    arquivos = {mes: arquivo for mes, arquivo, _ in backend.listar_meses_arquivados()}
+    for mes in set(_MES_ANEXADO.findall(sql)):
+        backend._anexar_mes(mes.replace("_", "-"), arquivos[mes.replace("_", "-")])
+    conn = backend.obter_conexao()
+    return [linha[3] for linha in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+
+
+def problemas(detalhes):
+    """Filtra os passos do plano que indicam varredura completa ou ordenação temporária"""
+    encontrados = []
+    for detalhe in detalhes:
+        # SCAN (subquery-N) percorre o resultado de uma subconsulta, não uma tabela
+        if detalhe.startswith("SCAN ") and "USING" not in detalhe \
+                and "VIRTUAL TABLE" not in detalhe and "CONSTANT ROW" not in detalhe \
+                and not detalhe.startswith("SCAN (subquery-"):
+            encontrados.append(detalhe)
+        elif "USE TEMP B-TREE" in detalhe:
+            encontrados.append(detalhe)
+    return encontrados
+
+
+def verificar():
+    """Retorna a lista de (consulta, problemas) das consultas que regrediram"""
+    regressoes = []
+    for sql in capturar_consultas():
+        encontrados = problemas(plano(sql))
+        if encontrados and not any(padrao.match(" ".join(sql.split())) for padrao in PERMITIDAS):
+            regressoes.append((sql, encontrados))
+    return regressoes
+
+
+def main():
+    with tempfile.TemporaryDirectory() as pasta:
+        backend.configurar_banco(os.path.join(pasta, "planos.db"))
+        backend.atualizar_esquema()
+        arquivar_meses()
+        regressoes = verificar()
+        total = len(capturar_consultas())
+        divergencias = verificar_esquema(backend.obter_conexao())
+        backend.fechar_conexoes()
+
+    for divergencia in divergencias:
+        print("Esquema:", divergencia)
+
+    for sql, encontrados in regressoes:
+        print("Consulta sem índice adequado:")
+        print("   ", " ".join(sql.split()))
+        for detalhe in encontrados:
+            print("    ->", detalhe)
+    print(f"{total} consultas verificadas, {len(regressoes)} com problemas.")
+    sys.exit(1 if regressoes or divergencias else 0)
+
+
+if __name__ == "__main__":
+    main()